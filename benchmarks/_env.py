@@ -0,0 +1,38 @@
+"""
+基准测试公共环境
+
+用假配置初始化 nonebot 并加载 wows_core, WG API 数据来自 tests/factories (与测试共用)。
+在仓库根目录运行: python benchmarks/bench_xxx.py
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+os.chdir(ROOT)
+
+import nonebot
+from factories import SHIP_IDS, make_full_player, make_player, play
+
+nonebot.init(
+    driver="~none",
+    wows_api={"application_id": ["benchmark"]},
+    db_config={"conn": "sqlite://:memory:"},
+)
+nonebot.load_plugin("wows_core")
+
+__all__ = ["ROOT", "SHIP_IDS", "make_full_player", "make_player", "play", "timeit"]
+
+
+def timeit(func, repeat: int = 20) -> float:
+    """
+    返回单次调用的平均耗时 (毫秒)
+    """
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
@@ -0,0 +1,210 @@
+"""
+每日快照: 整个区服一次请求、全部攒在内存里最后一次写库 (旧实现), 对比分块流水线
+
+本地假 WG 服务器每个请求延迟 20 ms, 数据库默认是内存中的 sqlite。
+分别统计账号数增长时的总耗时和 Python 对象内存峰值 (tracemalloc), 以及流水线各阶段的统计。
+假服务器不限制单次的 id 数 (真实接口最多 100 个), 旧实现要到 URL 超长时才失败。
+最后模拟中途退出和部分账号请求失败, 看重跑时只处理未完成的账号。
+用法: python benchmarks/bench_daily_pipeline.py [最大账号数] [每个账号的船数] [数据库地址]
+"""
+
+import asyncio
+import datetime
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from _env import make_player
+from aiohttp import web
+from tortoise import Tortoise
+
+from wows_core.config import DailyConfig, HttpConfig, WowsApiConfig
+from wows_core.daily_pipeline import DailyPipeline
+from wows_core.expected import expected_store
+from wows_core.models.account import Account
+from wows_core.models.daily_run import DONE, DailyRun, DailyRunAccount
+from wows_core.models.daily_statistic import PlayerDailyHeartbeat, PlayerDailyStatistic
+from wows_core.wg_client import REGIONS, WGClient
+from wows_core.wg_fields import DAILY_FIELDS
+from wows_core.wows_models import User as Player
+
+
+PLACEHOLDER = 987654321
+
+
+class FakeWG:
+    def __init__(self, n_ships: int) -> None:
+        detail, ships = make_player(account_id=PLACEHOLDER, n_ships=n_ships)
+        self.detail = json.dumps(detail)
+        self.ships = json.dumps(ships)
+        self.requests = 0
+        self.broken = set()  # 这些账号的船只请求返回 500
+        self.stalled = set()  # 这些账号的船只请求一直不返回, 直到 unstall
+        self.unstall = asyncio.Event()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(0.02)
+        ids = request.query["account_id"].split(",")
+        if request.path == "/wows/ships/stats/" and ids[0] in self.broken:
+            raise web.HTTPInternalServerError()
+        if request.path == "/wows/ships/stats/" and ids[0] in self.stalled:
+            await self.unstall.wait()
+        if request.path == "/wows/account/info/":
+            data = ",".join(f'"{aid}": {self.detail.replace(str(PLACEHOLDER), aid)}' for aid in ids)
+        else:
+            data = ",".join(f'"{aid}": {self.ships}' for aid in ids)
+        body = f'{{"status": "ok", "data": {{{data}}}}}'
+        return web.Response(body=body.encode(), content_type="application/json")
+
+
+async def all_at_once(client: WGClient, date: datetime.date) -> int:
+    """
+    旧实现: 每个区服把所有 id 交给一次 personal_data 和 statistics, 全部构建完再一次写库
+    """
+    accounts = await Account.all().values("id", "account_id", "server")
+    server2ids = defaultdict(list)
+    pks = {}
+    for account in accounts:
+        server2ids[REGIONS[account["server"]]].append(account["account_id"])
+        pks[account["account_id"]] = account["id"]
+    rows = []
+    for server, ids in server2ids.items():
+        details, stats = await asyncio.gather(
+            client.player.personal_data(server, ids, fields=DAILY_FIELDS.personal_data),
+            client.warships.statistics(server, ids, fields=DAILY_FIELDS.statistics),
+        )
+        for detail, ships in zip(details, stats):
+            player = Player()
+            player.init_user(detail, ships, -1, None, "")
+            await player.async_init(ships)
+            rows.extend(PlayerDailyStatistic.rows_from_player(player, pks[detail.account_id], date))
+    await PlayerDailyStatistic.bulk_create(rows)
+    return len(rows)
+
+
+async def measure(func) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+async def resume(fake: FakeWG, date: datetime.date) -> None:
+    client = WGClient(WowsApiConfig(application_id=["benchmark"]), HttpConfig(rate=100000))
+    config = DailyConfig(chunk_retries=0)
+    accounts = await Account.all().count()
+    # 后一半账号的请求卡住, 前一半写完后进程退出
+    fake.stalled = {str(1000 + i) for i in range(accounts // 2, accounts)}
+    task = asyncio.create_task(DailyPipeline(client, config, date).run())
+    while await DailyRunAccount.filter(run__date=date, status=DONE).count() < accounts // 2:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    fake.stalled = set()
+    fake.unstall.set()
+    rows = await PlayerDailyStatistic.filter(date=date).count()
+    print(f"resume: interrupted after {rows} rows")
+    # 重启后再跑, 其中 10 个账号的船只请求失败
+    fake.broken = {str(1000 + i) for i in range(0, accounts, accounts // 10)}
+    for label in ("restart", "retry"):
+        # 按客户端发出的请求计数, 被取消的那次运行卡在服务器上的请求不算
+        sent = client.stats()[REGIONS[0]]["requests"]
+        result = await DailyPipeline(client, config, date).run()
+        sent = client.stats()[REGIONS[0]]["requests"] - sent
+        summary = result["summary"]
+        print(
+            f"resume: {label:>7}, {sent} WG requests, fetched {result['fetch']['accounts']} "
+            f"accounts, done {summary['done']}, failed {summary['failed']}, "
+            f"resumed {summary['resumed']}, rows {await PlayerDailyStatistic.filter(date=date).count()}"
+        )
+        fake.broken = set()
+    await client.close()
+
+
+async def main():
+    max_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    n_ships = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    db_url = sys.argv[3] if len(sys.argv) > 3 else "sqlite://:memory:"
+    fake = FakeWG(n_ships)
+    app = web.Application()
+    app.router.add_get("/{path:.*}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    import wows_core.daily_pipeline as daily_pipeline
+    import wows_core.wg_client as wg_client_module
+
+    # 所有账号都放在第一个区服, 指向假服务器
+    for module in (daily_pipeline, wg_client_module, sys.modules[__name__]):
+        module.REGIONS = (server,)
+    await Tortoise.init(
+        db_url=db_url,
+        modules={
+            "models": [
+                "wows_core.models.account",
+                "wows_core.models.daily_statistic",
+                "wows_core.models.daily_run",
+            ]
+        },
+    )
+    await Tortoise.generate_schemas()
+    await DailyRun.all().delete()
+    await PlayerDailyHeartbeat.all().delete()
+    await PlayerDailyStatistic.all().delete()
+    await Account.all().delete()
+    await expected_store.get()
+
+    sizes = [max_accounts // 8, max_accounts // 2, max_accounts]
+    created = 0
+    date = datetime.date(2024, 1, 1)
+    for size in sizes:
+        await Account.bulk_create(
+            Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(created, size)
+        )
+        created = size
+        for label, run in (
+            ("all at once", lambda: all_at_once(client, date)),
+            ("pipeline", lambda: DailyPipeline(client, DailyConfig(), date).run()),
+        ):
+            # 限速放开, 只比较内存和流水线本身的开销
+            client = WGClient(
+                WowsApiConfig(application_id=["benchmark"]), HttpConfig(rate=100000)
+            )
+            fake.requests = 0
+            try:
+                result, elapsed, peak = await measure(run)
+            except Exception as e:
+                tracemalloc.stop()
+                print(f"{size:>6} accounts, {label:>11}: failed, {e!r:.80}")
+                continue
+            finally:
+                await client.close()
+            rows = result if isinstance(result, int) else result["write"]["rows"]
+            print(
+                f"{size:>6} accounts, {label:>11}: {rows} rows, {fake.requests} WG requests, "
+                f"{elapsed:.2f} s, peak {peak / 2**20:.1f} MB"
+            )
+            if not isinstance(result, int):
+                for name in ("fetch", "decode", "rows", "write"):
+                    print(f"{'':>26}{name:>7}: {result[name]}")
+            await PlayerDailyHeartbeat.all().delete()
+            await PlayerDailyStatistic.all().delete()
+            await DailyRun.all().delete()
+    await resume(fake, date)
+    await Tortoise.close_connections()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+WG 响应解码: json.loads 成字典树 vs msgspec 直接解码成只含用到字段的结构
+
+用 _env.make_full_player 生成与真实响应大小相当的 personal_data / warships statistics 响应字节, 分别比较解码耗时、解码结果的内存占用以及到构建完 User 为止的总耗时。
+"""
+
+import asyncio
+import json
+import tracemalloc
+
+import msgspec
+from _env import make_full_player, timeit
+
+from wows_core.expected import expected_store
+from wows_core.wg_decode import (
+    as_player_detail,
+    as_ship_stats,
+    decode_personal_data_response,
+    decode_statistics_response,
+)
+from wows_core.wows_models import User, read_ship_index
+
+def real_size_payload(n_ships: int = 500) -> tuple[bytes, bytes]:
+    detail, ships = make_full_player(n_ships=n_ships)
+    account_id = str(detail["account_id"])
+    personal = {"status": "ok", "meta": {"count": 1, "hidden": None}, "data": {account_id: detail}}
+    stats = {"status": "ok", "meta": {"count": 1, "hidden": None}, "data": {account_id: ships}}
+    return json.dumps(personal).encode(), json.dumps(stats).encode()
+
+
+def retained(func) -> int:
+    tracemalloc.start()
+    result = func()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return current
+
+
+async def main():
+    await read_ship_index()
+    expected = await expected_store.get()
+    personal_raw, stats_raw = real_size_payload()
+    print(f"payload: personal_data {len(personal_raw)} bytes, statistics {len(stats_raw)} bytes")
+
+    def dict_path():
+        detail = next(iter(json.loads(personal_raw)["data"].values()))
+        ships = next(iter(json.loads(stats_raw)["data"].values()))
+        return as_player_detail(detail), as_ship_stats(ships)
+
+    def typed_path():
+        detail = next(iter(decode_personal_data_response(personal_raw).values()))
+        ships = next(iter(decode_statistics_response(stats_raw).values()))
+        return detail, ships
+
+    assert msgspec.to_builtins(dict_path()) == msgspec.to_builtins(typed_path())
+
+    loads = timeit(lambda: (json.loads(personal_raw), json.loads(stats_raw)), 50)
+    tree = retained(lambda: json.loads(stats_raw))
+    print(f"json.loads dict tree: {loads:.2f} ms, retained {tree / 1024:.0f} KB")
+    print(f"json.loads + convert: {timeit(dict_path, 50):.2f} ms")
+    print(
+        f"typed decode:         {timeit(typed_path, 50):.2f} ms, "
+        f"retained {retained(lambda: decode_statistics_response(stats_raw)) / 1024:.0f} KB"
+    )
+
+    async def build(decode) -> User:
+        detail, ships = decode()
+        user = User()
+        user.init_user(detail, ships, 0, None, "TAG")
+        await user.async_init(ships, expected)
+        return user
+
+    def dict_tree():
+        # 旧路径: 模型直接读字典树 (init_user/async_init 内部转换)
+        detail = next(iter(json.loads(personal_raw)["data"].values()))
+        ships = next(iter(json.loads(stats_raw)["data"].values()))
+        return detail, ships
+
+    loop = asyncio.get_running_loop()
+    for label, decode in (("dict tree", dict_tree), ("typed", typed_path)):
+        start = loop.time()
+        for _ in range(50):
+            await build(decode)
+        print(f"bytes -> User ({label}): {(loop.time() - start) / 50 * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,187 @@
+"""
+每日快照: 每天写全部船只 (旧实现) 对比只写场次有变化的船 + 每个账号一条心跳
+
+模拟若干天的快照, 每天只有一部分账号打了几艘船。分别统计:
+全量写入后的记录数和占用空间, snapshot_migrate 迁移旧数据的耗时和结果,
+直接按变化写入的记录数、空间和写入耗时, 以及读取某天完整船队的耗时 (按日期直接查 / 取每艘船的最新记录)。
+迁移和按变化写入后, 抽样检查取回的船队与全量快照中那天的记录完全相同。
+用法: python benchmarks/bench_delta_snapshots.py [数据库地址] [账号数] [每个账号的船数] [天数]
+例如: python benchmarks/bench_delta_snapshots.py asyncpg://postgres:@127.0.0.1:5432/postgres 200 100 30
+"""
+
+import asyncio
+import datetime
+import random
+import sys
+import time
+
+from _env import SHIP_IDS
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from wows_core.models.account import Account
+from wows_core.models.daily_statistic import (
+    SNAPSHOT_COLUMNS,
+    PlayerDailyHeartbeat,
+    PlayerDailyStatistic,
+)
+from wows_core.snapshot_ingest import write_heartbeats, write_snapshots
+from wows_core.snapshot_migrate import migrate_to_delta, pending_accounts
+
+ACTIVE = 0.3  # 每天打过战斗的账号比例
+START = datetime.date(2024, 1, 1)
+
+
+def simulate(account_pks: list, n_ships: int, days: int):
+    """
+    逐天产出 (日期, 当天所有账号的完整船队记录); 同样的参数每次产出相同的数据
+    """
+    rng = random.Random(0)
+    fleets = {}
+    for pk in account_pks:
+        ships = random.Random(pk).sample(SHIP_IDS, min(n_ships, len(SHIP_IDS)))
+        fleets[pk] = {}
+        for ship_id in ships:
+            battles = rng.randint(1, 300)
+            fleets[pk][ship_id] = [
+                battles,
+                rng.randint(0, battles),
+                rng.randint(0, battles * 200),
+                rng.randint(0, battles * 60),
+                rng.randint(0, battles * 100000),
+                rng.randint(0, battles * 2),
+                rng.randint(0, battles),
+                rng.randint(0, battles * 1500),
+                1700000000 - rng.randint(0, 10**8),
+            ]
+    for day in range(days):
+        date = START + datetime.timedelta(days=day)
+        values = []
+        for pk, fleet in fleets.items():
+            if day and rng.random() < ACTIVE:
+                for ship_id in rng.sample(list(fleet), rng.randint(1, 4)):
+                    stats = fleet[ship_id]
+                    battles = rng.randint(1, 8)
+                    stats[0] += battles
+                    for i in range(1, 8):
+                        stats[i] += rng.randint(0, battles * 1000)
+                    stats[8] = 1700000000 + day * 86400 + rng.randint(0, 86399)
+            for ship_id, stats in fleet.items():
+                values.append(
+                    (pk, ship_id, date, *stats[:8], datetime.datetime.fromtimestamp(stats[8]))
+                )
+        yield date, values
+
+
+def heartbeat_values(values: list) -> list:
+    heartbeats = {}
+    for row in values:
+        ships, battles = heartbeats.get((row[0], row[2]), (0, 0))
+        heartbeats[(row[0], row[2])] = (ships + 1, battles + row[3])
+    return [(pk, date, ships, battles) for (pk, date), (ships, battles) in heartbeats.items()]
+
+
+async def storage(db_url: str) -> str:
+    statistics = await PlayerDailyStatistic.all().count()
+    heartbeats = await PlayerDailyHeartbeat.all().count()
+    connection = Tortoise.get_connection("default")
+    if db_url.startswith("sqlite"):
+        await connection.execute_script("VACUUM")
+        page_size = (await connection.execute_query_dict("PRAGMA page_size"))[0]["page_size"]
+        pages = (await connection.execute_query_dict("PRAGMA page_count"))[0]["page_count"]
+        size = page_size * pages
+    else:
+        tables = (PlayerDailyStatistic._meta.db_table, PlayerDailyHeartbeat._meta.db_table)
+        await connection.execute_script(f"VACUUM FULL {', '.join(tables)}")
+        size = (
+            await connection.execute_query_dict(
+                "SELECT "
+                + " + ".join(f"pg_total_relation_size('{table}')" for table in tables)
+                + " AS size"
+            )
+        )[0]["size"]
+    return f"{statistics} rows + {heartbeats} heartbeats, {size / 2**20:.1f} MB"
+
+
+def fleet(rows) -> list:
+    return sorted(
+        (row.ship_id, *(getattr(row, column) for column in SNAPSHOT_COLUMNS[3:])) for row in rows
+    )
+
+
+async def read_time(samples: list, read) -> float:
+    start = time.perf_counter()
+    for pk, date in samples:
+        await read(pk, date)
+    return (time.perf_counter() - start) / len(samples) * 1000
+
+
+async def main():
+    db_url = sys.argv[1] if len(sys.argv) > 1 else "sqlite://:memory:"
+    n_accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    n_ships = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    days = int(sys.argv[4]) if len(sys.argv) > 4 else 30
+    await Tortoise.init(
+        db_url=db_url,
+        modules={"models": ["wows_core.models.account", "wows_core.models.daily_statistic"]},
+    )
+    await Tortoise.generate_schemas()
+    await PlayerDailyHeartbeat.all().delete()
+    await PlayerDailyStatistic.all().delete()
+    await Account.all().delete()
+    await Account.bulk_create(
+        Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(n_accounts)
+    )
+    pks = list(await Account.all().order_by("id").values_list("id", flat=True))
+    rng = random.Random(1)
+    samples = [
+        (rng.choice(pks), START + datetime.timedelta(days=rng.randrange(days))) for _ in range(50)
+    ]
+
+    # 旧实现: 每天写全部船只, 没有心跳
+    start = time.perf_counter()
+    for date, values in simulate(pks, n_ships, days):
+        async with in_transaction() as connection:
+            await write_snapshots(values, connection)
+    print(f"      full: write {time.perf_counter() - start:.2f} s, {await storage(db_url)}")
+    expected = {}
+    for pk, date in samples:
+        expected[pk, date] = fleet(await PlayerDailyStatistic.filter(account_id=pk, date=date))
+    by_date = await read_time(
+        samples, lambda pk, date: PlayerDailyStatistic.filter(account_id=pk, date=date)
+    )
+    latest = await read_time(samples, PlayerDailyStatistic.latest_rows)
+    print(f"      full: read one day {by_date:.2f} ms by date, {latest:.2f} ms latest per ship")
+
+    result = await migrate_to_delta()
+    print(f"   migrate: {result}, {await storage(db_url)}")
+    for key, rows in expected.items():
+        assert fleet(await PlayerDailyStatistic.latest_rows(*key)) == rows, key
+    assert not await pending_accounts()
+    assert (await migrate_to_delta())["deleted"] == 0
+    migrated = await PlayerDailyStatistic.all().count()
+
+    # 新实现: 只写变化的船和心跳
+    await PlayerDailyHeartbeat.all().delete()
+    await PlayerDailyStatistic.all().delete()
+    start = time.perf_counter()
+    for date, values in simulate(pks, n_ships, days):
+        async with in_transaction() as connection:
+            rows = await PlayerDailyStatistic.changed_values(values, date, connection)
+            await write_snapshots(rows, connection)
+            await write_heartbeats(heartbeat_values(values), connection)
+    print(f"     delta: write {time.perf_counter() - start:.2f} s, {await storage(db_url)}")
+    for key, rows in expected.items():
+        assert fleet(await PlayerDailyStatistic.latest_rows(*key)) == rows, key
+    assert await PlayerDailyStatistic.all().count() == migrated
+    latest = await read_time(samples, PlayerDailyStatistic.latest_rows)
+    print(f"     delta: read one day {latest:.2f} ms latest per ship")
+
+    await PlayerDailyHeartbeat.all().delete()
+    await PlayerDailyStatistic.all().delete()
+    await Account.all().delete()
+    await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
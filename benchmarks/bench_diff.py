@@ -0,0 +1,82 @@
+"""
+wows me recent 的快照差分: 逐船字典查询 + Ship 相减 vs 按船 id 对齐的按列差分
+
+同时校验两者得到的行和顺序一致。
+"""
+
+import asyncio
+
+from _env import make_player, play, timeit
+
+from wows_core.fleet import COUNTERS
+from wows_core.expected import expected_store
+from wows_core.wows_models import User
+
+
+def legacy_sub(now: User, past: User) -> list:
+    # 旧实现: 逐船查 ship_dic, 变化的船相减后按最后战斗时间排序
+    ship_list = []
+    for ship_now in now.ship_list:
+        ship_past = past.ship_dic.get(str(ship_now.ship_id), None)
+        if ship_past is None:
+            ship_list.append(ship_now)
+        elif ship_now.battles != ship_past.battles:
+            ship_list.append(ship_now - ship_past)
+    return sorted(ship_list, reverse=True)
+
+
+def rows_of(ships: list) -> list:
+    return [
+        (ship.ship_id, ship.last_battle_ts, *(getattr(ship, name) for name in COUNTERS))
+        for ship in ships
+    ]
+
+
+async def build(detail, ships) -> User:
+    user = User()
+    user.init_user(detail, ships, 0, None, "TAG")
+    await user.async_init(ships)
+    return user
+
+
+async def main():
+    detail, ships = make_player(n_ships=500)
+    past = await build(detail, ships)
+    # 60 艘船打了新的对局, 另外有几艘快照之后才有的新船
+    recent_ships = play(ships, 60)
+    new_detail, extra = make_player(n_ships=520, seed=7)
+    known = {ship["ship_id"] for ship in recent_ships}
+    recent_ships += [ship for ship in extra if ship["ship_id"] not in known][:5]
+    new_detail = dict(detail)
+    new_detail["statistics"] = {"pvp": dict(detail["statistics"]["pvp"])}
+    new_detail["statistics"]["pvp"]["battles"] += 100
+    now = await build(new_detail, recent_ships)
+
+    diff = now - past
+    assert rows_of(diff.ship_list) == rows_of(legacy_sub(now, past))
+    assert not (past - past).ship_list
+
+    expected = await expected_store.get()
+
+    def legacy():
+        # 旧流程: 相减后再从 Ship 对象里取列算 PR
+        user = User()
+        user.ship_list = legacy_sub(now, past)
+        user.init_fleet_pr(expected)
+
+    def columnar():
+        # 当前和快照的列在 async_init 算 PR 时已经提取过
+        (now - past).init_fleet_pr(expected)
+
+    before = timeit(legacy, 50)
+    after = timeit(columnar, 50)
+    print(
+        f"{len(now.ship_list)} ships, {len(diff.ship_list)} changed, diff + PR: "
+        f"per ship {before:.2f} ms, columnar {after:.2f} ms"
+    )
+    after = timeit(lambda: past - past, 200)
+    print(f"no new battles: {after:.4f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+输出编码: 各编码参数的字节数和耗时, 以及原来 BGR 画布整图反转再编码的耗时
+"""
+
+import asyncio
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from _env import make_player, play, timeit
+
+from wows_core.encoder import configure_encoder, encode_image
+from wows_core.wows_img import get_image_and_font
+from wows_core.wows_models import User, wows_recent, wows_user
+
+PRESETS = {
+    "jpeg q75 baseline": {"format": "JPEG", "quality": 75, "progressive": False},
+    "jpeg q85 baseline": {"format": "JPEG", "quality": 85, "progressive": False},
+    "jpeg q85 progressive": {"format": "JPEG", "quality": 85, "progressive": True},
+    "webp q80 method 2": {"format": "WEBP", "quality": 80, "webp_method": 2},
+    "webp q80 method 0": {"format": "WEBP", "quality": 80, "webp_method": 0},
+}
+
+
+async def canvases():
+    detail, ships = make_player()
+    old = User()
+    old.init_user(detail, ships, 0, None, "BENCH")
+    await old.async_init(ships)
+    old.date = "2025-01-01"
+    new_ships = play(ships, 50)
+    new = User()
+    new.init_user(detail, new_ships, 0, None, "BENCH")
+    await new.async_init(new_ships)
+    new.battles += 1
+    recent = new - old
+    await recent.init_pr_sub()
+
+    base_img, fonts = await get_image_and_font()
+    # 先用无损格式渲染, 再解码得到与渲染结果完全一致的画布
+    configure_encoder(format="PNG")
+    result = {
+        "user card": wows_user(new, base_img, fonts),
+        "recent 50 rows": wows_recent(recent, base_img, fonts),
+    }
+    configure_encoder(format="JPEG")
+    return {k: np.asarray(Image.open(BytesIO(v)).convert("RGB")) for k, v in result.items()}
+
+
+def old_path(bgr: np.ndarray) -> bytes:
+    bytes_io = BytesIO()
+    Image.fromarray(bgr[..., ::-1]).save(bytes_io, format="JPEG")
+    return bytes_io.getvalue()
+
+
+def main():
+    for name, img in asyncio.run(canvases()).items():
+        print(f"{name} {img.shape[1]}x{img.shape[0]}")
+        bgr = np.ascontiguousarray(img[..., ::-1])
+        size = len(old_path(bgr))
+        cost = timeit(lambda: old_path(bgr), 5)
+        print(f"  {'old bgr->rgb + jpeg q75':<24}{size:>10} B {cost:>9.1f} ms")
+        for preset, params in PRESETS.items():
+            size = len(encode_image(img, **params))
+            cost = timeit(lambda: encode_image(img, **params), 5)
+            print(f"  {preset:<24}{size:>10} B {cost:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
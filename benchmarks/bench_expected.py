@@ -0,0 +1,56 @@
+"""
+期望值查询: 原始 JSON 字典 (str 船 id + .get 链) vs int 键索引, 以及更新时构建新版本的耗时
+"""
+
+import asyncio
+import json
+
+from _env import make_player, timeit
+
+from wows_core.expected import EXP_PATH, ExpectedValues, expected_store
+
+
+def legacy_lookup(data: dict, ship_ids: list) -> list:
+    # 旧实现: 每艘船一次 str() 和三次 .get
+    result = []
+    for ship_id in ship_ids:
+        ship_data = data["data"].get(str(ship_id), {})
+        if ship_data:
+            result.append(
+                (
+                    ship_data.get("average_damage_dealt", 0.1),
+                    ship_data.get("average_frags", 0.1),
+                    ship_data.get("win_rate", 0.1),
+                )
+            )
+        else:
+            result.append(None)
+    return result
+
+
+def indexed_lookup(expected: ExpectedValues, ship_ids: list) -> list:
+    return [expected.get(ship_id) for ship_id in ship_ids]
+
+
+async def main():
+    with open(EXP_PATH, "r") as f:
+        data = json.load(f)
+    expected = await expected_store.get()
+    _, ships = make_player(n_ships=500)
+    ship_ids = [ship["ship_id"] for ship in ships]
+    assert legacy_lookup(data, ship_ids) == indexed_lookup(expected, ship_ids)
+
+    before = timeit(lambda: legacy_lookup(data, ship_ids), 200)
+    after = timeit(lambda: indexed_lookup(expected, ship_ids), 200)
+    print(f"{len(ship_ids)} lookups: json dict {before:.3f} ms, int index {after:.3f} ms")
+
+    parse = timeit(lambda: ExpectedValues.load(EXP_PATH), 20)
+    build = timeit(lambda: ExpectedValues(data), 20)
+    print(
+        f"version {expected.version}, {len(expected)} ships: "
+        f"load from file {parse:.2f} ms, build from downloaded data {build:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+字段投影: 每个功能请求的响应大小, 不带 fields vs 带 wg_fields 中声明的投影
+
+服务端的投影在这里按 WG 的规则在本地模拟 (只保留列出的路径), 测量每个账号的响应字节数 (原始和 gzip 后)
+以及解码成 wg_decode 结构的耗时。用法: python benchmarks/bench_fields.py [每个账号的船数]
+"""
+
+import gzip
+import json
+import sys
+
+from _env import make_full_player, timeit
+
+from wows_core.wg_decode import decode_personal_data_response, decode_statistics_response
+from wows_core.wg_fields import DAILY_FIELDS, RECENT_FIELDS, USER_FIELDS
+
+
+def project(obj, fields: tuple[str, ...]):
+    """
+    模拟 WG 的 fields: 只保留列出的 (点号分隔的) 路径
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+
+    def keep(value, node):
+        if not node or not isinstance(value, dict):
+            return value
+        return {key: keep(value[key], sub) for key, sub in node.items() if key in value}
+
+    if isinstance(obj, list):
+        return [keep(item, tree) for item in obj]
+    return keep(obj, tree)
+
+
+def response(account_id: int, data) -> bytes:
+    payload = {"status": "ok", "meta": {"count": 1, "hidden": None}, "data": {str(account_id): data}}
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:.1f} KB"
+
+
+def main():
+    n_ships = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    detail, ships = make_full_player(n_ships=n_ships)
+    account_id = detail["account_id"]
+    full_personal = response(account_id, detail)
+    full_stats = response(account_id, ships)
+    full = len(full_personal) + len(full_stats)
+    full_gz = len(gzip.compress(full_personal)) + len(gzip.compress(full_stats))
+    decode_full = timeit(
+        lambda: (decode_personal_data_response(full_personal), decode_statistics_response(full_stats)),
+        50,
+    )
+    print(
+        f"{n_ships} ships, no fields: {_kb(full)} per account "
+        f"(gzip {_kb(full_gz)}), decode {decode_full:.2f} ms"
+    )
+
+    for label, fields in (("user", USER_FIELDS), ("recent", RECENT_FIELDS), ("daily", DAILY_FIELDS)):
+        personal = response(account_id, project(detail, fields.personal_data))
+        stats = response(account_id, project(ships, fields.statistics))
+        size = len(personal) + len(stats)
+        size_gz = len(gzip.compress(personal)) + len(gzip.compress(stats))
+        decode = timeit(
+            lambda: (decode_personal_data_response(personal), decode_statistics_response(stats)),
+            50,
+        )
+        print(
+            f"{label:>7}: {_kb(size)} per account (gzip {_kb(size_gz)}), "
+            f"{full / size:.1f}x smaller, decode {decode:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+application_id 调度: 单个 id (每日任务原来整轮只用一个 WPIClient) vs 按令牌桶余量分配的 id 池
+
+本地假 WG 服务器对每个 id 单独限流, 超过时返回 407 REQUEST_LIMIT_EXCEEDED。
+客户端的限速故意设得比服务器略高, 让限流错误和暂停逻辑也被覆盖到。
+用法: python benchmarks/bench_key_pool.py [请求数] [服务器对每个 id 的限速]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from _env import make_player
+from aiohttp import web
+from aiolimiter import AsyncLimiter
+
+from wows_core.config import HttpConfig, WowsApiConfig
+from wows_core.wg_client import WGClient
+from wows_core.wg_fields import USER_FIELDS
+
+LIMITED = json.dumps(
+    {
+        "status": "error",
+        "error": {"code": 407, "message": "REQUEST_LIMIT_EXCEEDED", "field": None, "value": None},
+    }
+).encode()
+
+
+class FakeWG:
+    def __init__(self, rate: float) -> None:
+        self.detail, _ = make_player(n_ships=1)
+        self.account_id = self.detail["account_id"]
+        self.rate = rate
+        self.limiters: dict[str, AsyncLimiter] = {}
+        self.served: dict[str, int] = {}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        key = request.query["application_id"]
+        limiter = self.limiters.setdefault(key, AsyncLimiter(self.rate, 1))
+        if not limiter.has_capacity():
+            return web.Response(body=LIMITED, content_type="application/json")
+        await limiter.acquire()
+        self.served[key] = self.served.get(key, 0) + 1
+        account_id = request.query["account_id"]
+        body = json.dumps({"status": "ok", "data": {account_id: self.detail}}).encode()
+        return web.Response(body=body, content_type="application/json")
+
+
+async def run(server: str, fake: FakeWG, keys: list, n: int, rate: float) -> None:
+    fake.limiters.clear()
+    fake.served.clear()
+    client = WGClient(WowsApiConfig(application_id=keys), HttpConfig(rate=rate * 1.1))
+    start = time.perf_counter()
+    async with asyncio.TaskGroup() as tg:
+        # 每个请求查不同的账号, 避免被合并成一个请求
+        for i in range(n):
+            tg.create_task(
+                client.player.personal_data(
+                    server, fake.account_id + i, fields=USER_FIELDS.personal_data
+                )
+            )
+    elapsed = time.perf_counter() - start
+    stats = client.stats()
+    await client.close()
+    print(
+        f"{len(keys)} key(s): {n} requests in {elapsed:.2f} s, {n / elapsed:.0f} req/s, "
+        f"limited {stats[server]['limited']}, per key {sorted(fake.served.values())}"
+    )
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    fake = FakeWG(rate)
+    app = web.Application()
+    app.router.add_get("/{path:.*}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    for count in (1, 2, 4):
+        await run(server, fake, [f"key-{i}" for i in range(count)], n, rate)
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
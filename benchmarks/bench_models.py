@@ -0,0 +1,71 @@
+"""
+Ship/User/Pr 模型的内存占用: 单个 500 船玩家, 以及每日任务一次构建 10k 个账号
+
+用法: python benchmarks/bench_models.py [账号数] [每个账号的船数]
+"""
+
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+
+from _env import make_player
+
+from wows_core.expected import expected_store
+from wows_core.wows_models import User, read_ship_index
+
+
+async def build(detail: dict, ships: list) -> User:
+    user = User()
+    user.init_user(detail, ships, 0, None, "TAG")
+    await user.async_init(ships)
+    return user
+
+
+async def measure(payloads: list) -> tuple:
+    """
+    构建并保留所有 User, 返回 (保留的字节数, 峰值字节数, 耗时秒)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    users = [await build(detail, ships) for detail, ships in payloads]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del users
+    return current, peak, elapsed
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+async def main():
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_ships = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    # 船表和期望值先读进缓存, 不计入模型占用
+    await read_ship_index()
+    await expected_store.get()
+
+    detail, ships = make_player(n_ships=500)
+    current, peak, elapsed = await measure([(detail, ships)])
+    print(
+        f"500-ship player: retained {current / 1024:.0f} KB, "
+        f"peak {peak / 1024:.0f} KB, build {elapsed * 1000:.1f} ms"
+    )
+
+    # API 返回的原始数据本身不计入, 这里循环使用 100 份, 每个账号各自构建模型
+    pool = [make_player(2000000000 + i, n_ships, seed=i) for i in range(100)]
+    payloads = [pool[i % len(pool)] for i in range(accounts)]
+    current, peak, elapsed = await measure(payloads)
+    print(
+        f"{accounts} accounts x {n_ships} ships: retained {_mb(current)}, "
+        f"peak {_mb(peak)}, build {elapsed:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
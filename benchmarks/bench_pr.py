@@ -0,0 +1,91 @@
+"""
+PR 计算: 原来的逐船计算 (Pr.init_pr_ship + init_pr_user) vs 按列的 fleet_pr
+
+同时校验两者逐位一致。
+"""
+
+import asyncio
+import math
+
+import numpy as np
+from _env import make_player, timeit
+
+from wows_core.expected import expected_store
+from wows_core.pr_engine import fleet_pr
+from wows_core.wows_models import Pr, User
+
+COLUMNS = ("battles", "damage_dealt", "frags", "wins", "ship_id")
+
+
+def init_pr_ship(ship, expected) -> Pr:
+    # 原来的 Pr.init_pr_ship
+    battles = ship.battles
+    ship_data = expected.get(int(ship.ship_id))
+    if ship_data is None:
+        return Pr(-1)
+    exp_damage, exp_frags, exp_winrate = ship_data
+
+    damage = ship.damage_dealt / ship.battles
+    frags = ship.frags / ship.battles
+    winrate = abs((ship.wins / ship.battles) * 100)
+
+    r_dmg = damage / exp_damage
+    r_frags = frags / exp_frags
+    r_winrate = winrate / exp_winrate
+
+    w1 = 1 / (1 + math.exp(-0.7 * (battles - 3)))
+    w2 = 1 / (1 + math.exp(-20 * (winrate - 0.50)))
+
+    w_wins = (1000 * w1) - ((1000 * w1 * 0.35) * w2)
+    w_dmg = (1000 * (1 - w1)) + ((1000 * w1 * 0.35) * w2)
+    w_frags = 150
+
+    n_dmg = max(0, (r_dmg - 0.4) / (1 - 0.4))
+    n_frags = max(0, (r_frags - 0.1) / (1 - 0.1))
+    n_wins = max(0, (r_winrate - 0.7) / (1 - 0.7))
+
+    return Pr(round((w_dmg * n_dmg) + (w_frags * n_frags) + (w_wins * n_wins)))
+
+
+def init_pr_user(ships) -> Pr:
+    # 原来的 Pr.init_pr_user
+    total_pr = 0
+    total_battles = 0
+    for ship in ships:
+        total_pr += ship.pr.pr_number * ship.battles
+        total_battles += ship.battles
+    return Pr(round(total_pr / total_battles) if total_battles > 0 else 0)
+
+
+def per_ship(ships, exps):
+    for ship in ships:
+        ship.pr = init_pr_ship(ship, exps)
+    return init_pr_user(ships)
+
+
+def columns_of(ships):
+    return [np.array([getattr(ship, name) for ship in ships]) for name in COLUMNS]
+
+
+async def main():
+    exps = await expected_store.get()
+
+    detail, ships = make_player(n_ships=500)
+    user = User()
+    user.init_user(detail, ships, 0, None, "TAG")
+    await user.async_init(ships)
+    fleet = user.ship_list
+
+    expected = per_ship(fleet, exps)
+    pr, bands, total = fleet_pr(*columns_of(fleet), exps.index)
+    assert total == expected.pr_number
+    assert pr.tolist() == [ship.pr.pr_number for ship in fleet]
+    assert bands.tolist() == [ship.pr.band for ship in fleet]
+
+    before = timeit(lambda: per_ship(fleet, exps), 50)
+    after = timeit(lambda: user.init_fleet_pr(exps), 50)
+    print(f"{len(fleet)}-ship fleet: per ship {before:.2f} ms, vectorized {after:.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+响应缓存: 同一个玩家的卡片请求在冷缓存、新鲜期内、过期但在 stale 窗口内, 以及不存在的账号
+
+本地假 WG 服务器每个请求延迟 50 ms。为了在几秒内跑完, 把各接口的有效期缩短成 0.2 秒, stale 窗口 5 秒。
+"""
+
+import asyncio
+import json
+import time
+
+from _env import make_player
+from aiohttp import web
+
+from wows_core.config import HttpConfig, WowsApiConfig
+from wows_core.wg_client import CACHE_POLICIES, WGClient
+from wows_core.wg_fields import CLAN_DETAIL_FIELDS, CLAN_MEMBER_FIELDS, USER_FIELDS
+
+MISSING = 2999999999
+
+
+class FakeWG:
+    def __init__(self) -> None:
+        detail, ships = make_player(n_ships=300)
+        self.account_id = detail["account_id"]
+        aid = str(self.account_id)
+        bodies = {
+            "/wows/account/info/": {aid: detail},
+            "/wows/ships/stats/": {aid: ships},
+            "/wows/clans/accountinfo/": {aid: {"clan_id": 1, "account_name": detail["nickname"]}},
+            "/wows/clans/info/": {"1": {"tag": "TAG"}},
+        }
+        self.bodies = bodies
+        self.hits = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.hits += 1
+        await asyncio.sleep(0.05)
+        data = self.bodies[request.path]
+        account_id = request.query.get("account_id", None)
+        if account_id is not None:
+            data = {account_id: data.get(account_id, None)}
+        return web.Response(
+            body=json.dumps({"status": "ok", "data": data}).encode(),
+            content_type="application/json",
+        )
+
+
+async def card(client: WGClient, server: str, account_id: int):
+    # 与 gen_player_image_by_account_id 的请求顺序一致
+    async with asyncio.TaskGroup() as tg:
+        detail = tg.create_task(
+            client.player.personal_data(server, account_id, fields=USER_FIELDS.personal_data, cached=True)
+        )
+        clan = tg.create_task(
+            client.clans.account_info(server, account_id, fields=CLAN_MEMBER_FIELDS, cached=True)
+        )
+    if (detail := detail.result()[0]) is None:
+        return
+    if member := clan.result()[0]:
+        await client.clans.details(server, member["clan_id"], fields=CLAN_DETAIL_FIELDS, cached=True)
+    await client.warships.statistics(
+        server, account_id, fields=USER_FIELDS.statistics, last_battle_time=detail.last_battle_time
+    )
+
+
+async def measure(label: str, fake: FakeWG, call) -> None:
+    fake.hits = 0
+    start = time.perf_counter()
+    await call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>22}: {elapsed * 1000:6.1f} ms, {fake.hits} WG requests")
+
+
+async def main():
+    for path, policy in CACHE_POLICIES.items():
+        CACHE_POLICIES[path] = policy._replace(ttl=0.2, stale=5, negative_ttl=5)
+    fake = FakeWG()
+    app = web.Application()
+    app.router.add_get("/{path:.*}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    client = WGClient(WowsApiConfig(application_id=["benchmark"]), HttpConfig())
+    account_id = fake.account_id
+
+    await measure("cold", fake, lambda: card(client, server, account_id))
+    await measure("fresh", fake, lambda: card(client, server, account_id))
+    await asyncio.sleep(0.3)
+    await measure("stale (refresh in bg)", fake, lambda: card(client, server, account_id))
+    await asyncio.sleep(0.1)
+    print(f"{'background refreshes':>22}: {fake.hits} WG requests")
+    await measure("missing account, cold", fake, lambda: card(client, server, MISSING))
+    await measure("missing account, again", fake, lambda: card(client, server, MISSING))
+    print(client.cache.stats())
+    await client.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+船只图鉴: 解析 wows_ship_list.json 成字典 vs mmap 打开二进制索引
+
+每种方式在单独的子进程里测量, 报告加载耗时、Python 堆占用和常驻内存 (RSS) 增量。
+load_index 是启动时实际走的路径 (检查索引是否过期再 mmap); 另外对比旧的检查方式
+(每次读取并哈希整个 JSON) 和新的 (只 stat JSON, 与头部记录的大小和修改时间比较)。
+"""
+
+import json
+import subprocess
+import sys
+
+from _env import ROOT, SHIP_IDS, timeit
+
+from wows_core.ship_index import (
+    SHIP_INDEX_PATH,
+    SHIP_LIST_PATH,
+    ShipIndex,
+    build_index,
+    load_index,
+    source_digest,
+)
+
+CHILD = """
+import json, sys, time, tracemalloc
+sys.path.insert(0, "wows_core")
+import numpy
+from ship_index import ShipIndex, load_index
+
+def rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+ids = json.loads(sys.argv[2])
+before = rss()
+tracemalloc.start()
+start = time.perf_counter()
+if sys.argv[1] == "json":
+    with open("wows_core/src/wows_ship_list.json") as f:
+        ships = json.load(f)
+    names = [ships[str(i)]["name"] for i in ids]
+elif sys.argv[1] == "index":
+    ships = ShipIndex.open("wows_core/src/wows_ship_list.bin")
+    names = [ships.name(i) for i in ids]
+else:
+    ships = load_index("wows_core/src/wows_ship_list.json", "wows_core/src/wows_ship_list.bin")
+    names = [ships.name(i) for i in ids]
+elapsed = time.perf_counter() - start
+heap = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+print(json.dumps({"ms": elapsed * 1000, "heap": heap, "rss": rss() - before}))
+"""
+
+
+def measure(mode: str, ids: list) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, json.dumps(ids)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    data = build_index(SHIP_LIST_PATH, SHIP_INDEX_PATH)
+    ids = SHIP_IDS[:500]  # 一个 500 船玩家需要的名字
+    for mode, label in (("json", "json dict"), ("index", "mmap index"), ("load", "load_index")):
+        result = measure(mode, ids)
+        print(
+            f"{label:>10}: load + 500 names {result['ms']:.2f} ms, "
+            f"heap {result['heap'] / 1024:.0f} KB, rss +{result['rss'] / 1024:.0f} KB"
+        )
+    print(f"index file {len(data)} bytes, json {len(open(SHIP_LIST_PATH, 'rb').read())} bytes")
+
+    def hashed_load():
+        # 旧的 load_index: 每次读取并哈希整个 JSON 再与索引头部的摘要比较
+        with open(SHIP_LIST_PATH, "rb") as f:
+            digest = source_digest(f.read())
+        index = ShipIndex.open(SHIP_INDEX_PATH)
+        assert index.digest == digest
+        return index
+
+    hashed = timeit(hashed_load, 50)
+    stat = timeit(load_index, 50)
+    print(f"load_index (warm): hash json {hashed:.3f} ms, stat json {stat:.3f} ms")
+
+    index = ShipIndex.open(SHIP_INDEX_PATH)
+    lookup = timeit(lambda: [index.name(i) for i in ids], 200)
+    print(f"500 name lookups (warm): {lookup:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+船只图鉴同步: 用离线的假图鉴接口 (带固定延迟) 跑一遍增量同步
+
+假接口按当前 wows_ship_list.json 分页, 改名 3 艘船、新增 2 艘船,
+在临时目录里的副本上同步, 校验只写入了变化的条目, 并比较不同并发数的耗时。
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from _env import ROOT
+
+from wows_core.ship_index import SHIP_LIST_PATH, ShipIndex, build_index
+from wows_core.ship_sync import PAGE_LIMIT, SHIP_FIELDS, sync_ship_index
+
+
+class FakeEncyclopedia:
+    def __init__(self, ships: dict, latency: float = 0.05) -> None:
+        items = [
+            (ship_id, {"ship_id": int(ship_id), **{f: ship[f] for f in SHIP_FIELDS}})
+            for ship_id, ship in ships.items()
+        ]
+        self.pages = [
+            dict(items[i : i + PAGE_LIMIT]) for i in range(0, len(items), PAGE_LIMIT)
+        ]
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, page_no: int) -> tuple[int, dict]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return len(self.pages), self.pages[page_no - 1]
+
+
+async def run(concurrency: int, tmp: str) -> None:
+    json_path = os.path.join(tmp, "ships.json")
+    index_path = os.path.join(tmp, "ships.bin")
+    shutil.copy(os.path.join(ROOT, SHIP_LIST_PATH), json_path)
+    build_index(json_path, index_path)
+    with open(json_path, "r") as f:
+        ships = json.load(f)
+
+    remote = json.loads(json.dumps(ships))
+    renamed = list(remote)[:3]
+    for ship_id in renamed:
+        remote[ship_id]["name"] += " (改)"
+    for new_id in ("4000000001", "4000000002"):
+        remote[new_id] = {**remote[renamed[0]], "name": f"新船 {new_id}"}
+    fake = FakeEncyclopedia(remote)
+
+    start = time.perf_counter()
+    result = await sync_ship_index(fake, concurrency, json_path, index_path, install=False)
+    elapsed = time.perf_counter() - start
+    assert (result.added, result.updated) == (2, 3), str(result)
+
+    index = ShipIndex.open(index_path)
+    assert index.name(4000000001) == "新船 4000000001"
+    assert index.name(int(renamed[0])).endswith("(改)")
+    assert len(index) == len(ships) + 2
+    print(f"concurrency {concurrency}: {fake.calls} pages, {elapsed * 1000:.0f} ms, {result}")
+
+    again = await sync_ship_index(fake, concurrency, json_path, index_path, install=False)
+    assert not again.changed
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in (1, 4):
+            await run(concurrency, tmp)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
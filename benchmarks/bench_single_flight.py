@@ -0,0 +1,91 @@
+"""
+请求合并: 一群人同时 `wows @同一个人` 时, 每个处理流程都会查 personal_data、公会和船只数据
+
+本地假 WG 服务器每个请求延迟 50 ms, 比较不合并和合并时服务器收到的请求数和总耗时。
+用法: python benchmarks/bench_single_flight.py [同时的指令数]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from _env import make_player
+from aiohttp import web
+
+from wows_core.config import HttpConfig, WowsApiConfig
+from wows_core.single_flight import SingleFlight
+from wows_core.wg_client import WGClient
+from wows_core.wg_fields import CLAN_DETAIL_FIELDS, CLAN_MEMBER_FIELDS, USER_FIELDS
+
+
+class NoSingleFlight(SingleFlight):
+    async def do(self, key, func):
+        self.calls += 1
+        self.executed += 1
+        return await func()
+
+
+class FakeWG:
+    def __init__(self) -> None:
+        detail, ships = make_player(n_ships=300)
+        self.account_id = detail["account_id"]
+        aid = str(self.account_id)
+        self.bodies = {
+            "/wows/account/info/": {aid: detail},
+            "/wows/ships/stats/": {aid: ships},
+            "/wows/clans/accountinfo/": {aid: {"clan_id": 1, "account_name": detail["nickname"]}},
+            "/wows/clans/info/": {"1": {"tag": "TAG"}},
+        }
+        self.bodies = {
+            path: json.dumps({"status": "ok", "data": data}).encode()
+            for path, data in self.bodies.items()
+        }
+        self.hits = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.hits += 1
+        await asyncio.sleep(0.05)
+        return web.Response(body=self.bodies[request.path], content_type="application/json")
+
+
+async def command(client: WGClient, server: str, account_id: int) -> None:
+    # 与 gen_player_image_by_account_id 的请求顺序一致
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(client.player.personal_data(server, account_id, fields=USER_FIELDS.personal_data))
+        clan = tg.create_task(client.clans.account_info(server, account_id, fields=CLAN_MEMBER_FIELDS))
+    await client.clans.details(server, clan.result()[0]["clan_id"], fields=CLAN_DETAIL_FIELDS)
+    await client.warships.statistics(server, account_id, fields=USER_FIELDS.statistics)
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    fake = FakeWG()
+    app = web.Application()
+    app.router.add_get("/{path:.*}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    for label, single_flight in (("no coalescing", NoSingleFlight()), ("single-flight", SingleFlight())):
+        # 默认的每个 id 10 次/秒限速
+        client = WGClient(WowsApiConfig(application_id=["benchmark"]), HttpConfig())
+        client.single_flight = single_flight
+        fake.hits = 0
+        start = time.perf_counter()
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(users):
+                tg.create_task(command(client, server, fake.account_id))
+        elapsed = time.perf_counter() - start
+        await client.close()
+        print(
+            f"{label:>13}: {users} commands, {fake.hits} WG requests, {elapsed * 1000:.0f} ms, "
+            f"{client.single_flight.stats()}"
+        )
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
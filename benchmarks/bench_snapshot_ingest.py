@@ -0,0 +1,121 @@
+"""
+每日快照写库: 每条记录一个 Tortoise 模型实例再 bulk_create, 对比 snapshot_ingest.write_snapshots
+
+每种方式先写入一天的快照, 再把同一天重写一遍 (upsert), 统计每秒写入的记录数,
+以及一批记录在内存中的大小 (元组, 以及在元组之外再建模型实例的额外开销)。
+默认用内存中的 SQLite (走分批 INSERT); 传入 Postgres 地址时走 COPY:
+用法: python benchmarks/bench_snapshot_ingest.py [数据库地址] [账号数] [每个账号的船数]
+例如: python benchmarks/bench_snapshot_ingest.py asyncpg://postgres:@127.0.0.1:5432/postgres 200 300
+"""
+
+import asyncio
+import datetime
+import random
+import sys
+import time
+import tracemalloc
+
+from _env import SHIP_IDS
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from wows_core.models.account import Account
+from wows_core.models.daily_statistic import (
+    SNAPSHOT_COLUMNS,
+    SNAPSHOT_KEY,
+    PlayerDailyStatistic,
+)
+from wows_core.snapshot_ingest import write_snapshots
+
+
+def make_rows(account_pks: list, n_ships: int, date: datetime.date, seed: int) -> list:
+    # 船只只由账号决定, seed 只影响数据, 同一天用不同的 seed 重写时覆盖同一批记录
+    rng = random.Random(seed)
+    rows = []
+    for pk in account_pks:
+        for ship_id in random.Random(pk).sample(SHIP_IDS, min(n_ships, len(SHIP_IDS))):
+            battles = rng.randint(1, 400)
+            rows.append(
+                (
+                    pk, ship_id, date, battles, rng.randint(0, battles), rng.randint(0, 10**5),
+                    rng.randint(0, 10**4), rng.randint(0, 10**7), rng.randint(0, 10**3),
+                    rng.randint(0, battles), rng.randint(0, 10**6),
+                    datetime.datetime.fromtimestamp(1700000000 + rng.randint(0, 10**7)),
+                )
+            )
+    return rows
+
+
+async def model_bulk_create(rows: list, connection) -> str:
+    # 改动前的写法: 每条记录一个模型实例
+    models = [PlayerDailyStatistic(**dict(zip(SNAPSHOT_COLUMNS, values))) for values in rows]
+    await PlayerDailyStatistic.bulk_create(
+        models,
+        batch_size=1000,
+        on_conflict=SNAPSHOT_KEY,
+        update_fields=[column for column in SNAPSHOT_COLUMNS if column not in SNAPSHOT_KEY],
+        using_db=connection,
+    )
+    return "models"
+
+
+def size_of(build) -> float:
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return current / 2**20
+
+
+async def main():
+    db_url = sys.argv[1] if len(sys.argv) > 1 else "sqlite://:memory:"
+    n_accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    n_ships = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    await Tortoise.init(
+        db_url=db_url,
+        modules={"models": ["wows_core.models.account", "wows_core.models.daily_statistic"]},
+    )
+    await Tortoise.generate_schemas()
+    await PlayerDailyStatistic.all().delete()
+    await Account.all().delete()
+    await Account.bulk_create(
+        Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(n_accounts)
+    )
+    pks = await Account.all().order_by("id").values_list("id", flat=True)
+
+    sample = make_rows(pks[:20], n_ships, datetime.date(2024, 1, 1), 0)
+    models = size_of(
+        lambda: [PlayerDailyStatistic(**dict(zip(SNAPSHOT_COLUMNS, v))) for v in sample]
+    )
+    tuples = size_of(lambda: make_rows(pks[:20], n_ships, datetime.date(2024, 1, 1), 0))
+    print(f"{len(sample)} rows in memory: tuples {tuples:.1f} MB, model instances +{models:.1f} MB")
+
+    for day, (label, write) in enumerate(
+        (("bulk_create", model_bulk_create), ("write_snapshots", write_snapshots)), start=1
+    ):
+        date = datetime.date(2024, 1, day)
+        for phase, seed in (("insert", 1), ("upsert", 2)):
+            rows = make_rows(pks, n_ships, date, seed)
+            start = time.perf_counter()
+            async with in_transaction() as connection:
+                method = await write(rows, connection)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:>15} ({method}), {phase}: {len(rows)} rows, {elapsed:.2f} s, "
+                f"{len(rows) / elapsed:,.0f} rows/s"
+            )
+        stored = await PlayerDailyStatistic.filter(date=date).count()
+        check = await PlayerDailyStatistic.filter(date=date, account_id=pks[0]).order_by(
+            "ship_id"
+        ).values_list("battles", flat=True)
+        expected = sorted(row[:4] for row in rows if row[0] == pks[0])
+        assert stored == len(rows), (stored, len(rows))
+        assert list(check) == [row[3] for row in expected]
+    await PlayerDailyStatistic.all().delete()
+    await Account.all().delete()
+    await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+每日快照存储方式: rows (每艘船一行, 只写变化的船) 对比 packed (每个账号每天一行打包的完整船队, 只在有变化时写)
+
+用 bench_delta_snapshots 的模拟数据分别按两种方式写入若干天, 统计写入耗时、记录数和占用空间,
+再抽样读取某天的完整船队 (PlayerDailyStatistic.fleet) 和整个 get_player_from_db 的耗时,
+并检查两种方式读出的船队相同、migrate_to_packed 从 rows 数据转换的结果与直接写入的相同。
+用法: python benchmarks/bench_snapshot_storage.py [数据库地址] [账号数] [每个账号的船数] [天数]
+例如: python benchmarks/bench_snapshot_storage.py asyncpg://postgres:@127.0.0.1:5432/postgres 200 300 30
+"""
+
+import asyncio
+import datetime
+import random
+import sys
+import time
+
+from bench_delta_snapshots import START, heartbeat_values, simulate
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from wows_core.expected import expected_store
+from wows_core.models.account import Account
+from wows_core.models.daily_statistic import (
+    PACKED,
+    ROWS,
+    PlayerDailyHeartbeat,
+    PlayerDailySnapshot,
+    PlayerDailyStatistic,
+)
+from wows_core.snapshot_ingest import write_heartbeats, write_snapshots
+from wows_core.snapshot_migrate import migrate_to_packed
+
+MODELS = (PlayerDailyStatistic, PlayerDailySnapshot, PlayerDailyHeartbeat)
+
+
+async def clear() -> None:
+    for model in MODELS:
+        await model.all().delete()
+
+
+async def storage(db_url: str) -> str:
+    counts = [await model.all().count() for model in MODELS]
+    connection = Tortoise.get_connection("default")
+    if db_url.startswith("sqlite"):
+        await connection.execute_script("VACUUM")
+        page_size = (await connection.execute_query_dict("PRAGMA page_size"))[0]["page_size"]
+        pages = (await connection.execute_query_dict("PRAGMA page_count"))[0]["page_count"]
+        size = page_size * pages
+    else:
+        tables = [model._meta.db_table for model in MODELS]
+        await connection.execute_script(f"VACUUM FULL {', '.join(tables)}")
+        size = (
+            await connection.execute_query_dict(
+                "SELECT "
+                + " + ".join(f"pg_total_relation_size('{table}')" for table in tables)
+                + " AS size"
+            )
+        )[0]["size"]
+    return (
+        f"{counts[0]} rows + {counts[1]} packed + {counts[2]} heartbeats, {size / 2**20:.1f} MB"
+    )
+
+
+async def write(pks: list, n_ships: int, days: int) -> float:
+    start = time.perf_counter()
+    for date, values in simulate(pks, n_ships, days):
+        async with in_transaction() as connection:
+            rows = await PlayerDailyStatistic.changed_values(values, date, connection)
+            await write_snapshots(rows, connection)
+            await write_heartbeats(heartbeat_values(values), connection)
+    return time.perf_counter() - start
+
+
+async def read_ms(samples: list, read) -> float:
+    start = time.perf_counter()
+    for sample in samples:
+        await read(*sample)
+    return (time.perf_counter() - start) / len(samples) * 1000
+
+
+async def main():
+    db_url = sys.argv[1] if len(sys.argv) > 1 else "sqlite://:memory:"
+    n_accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    n_ships = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    days = int(sys.argv[4]) if len(sys.argv) > 4 else 30
+    await Tortoise.init(
+        db_url=db_url,
+        modules={"models": ["wows_core.models.account", "wows_core.models.daily_statistic"]},
+    )
+    await Tortoise.generate_schemas()
+    await clear()
+    await Account.all().delete()
+    await Account.bulk_create(
+        Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(n_accounts)
+    )
+    accounts = await Account.all().order_by("id").values_list("id", "account_id")
+    pks = [pk for pk, _ in accounts]
+    await expected_store.get()
+    rng = random.Random(1)
+    samples = [
+        (*rng.choice(accounts), START + datetime.timedelta(days=rng.randrange(days)))
+        for _ in range(100)
+    ]
+
+    fleets = {}
+    for storage_name in (ROWS, PACKED):
+        PlayerDailyStatistic.configure_storage(storage_name)
+        await clear()
+        elapsed = await write(pks, n_ships, days)
+        print(f"{storage_name:>8}: write {elapsed:.2f} s, {await storage(db_url)}")
+        fleet = await read_ms(
+            [(pk, date) for pk, _, date in samples], PlayerDailyStatistic.fleet
+        )
+        player = await read_ms(
+            [(account_id, date) for _, account_id, date in samples],
+            PlayerDailyStatistic.get_player_from_db,
+        )
+        print(f"{storage_name:>8}: read fleet {fleet:.2f} ms, get_player_from_db {player:.2f} ms")
+        fleets[storage_name] = [
+            [(*ship[:-1], int(ship[-1])) for ship in await PlayerDailyStatistic.fleet(pk, date)]
+            for pk, _, date in samples
+        ]
+        if storage_name == PACKED:
+            sizes = await PlayerDailySnapshot.all().values_list("data", flat=True)
+            print(f"{'':>8}  packed blob avg {sum(map(len, sizes)) / len(sizes):,.0f} bytes")
+    assert [sorted(f) for f in fleets[ROWS]] == fleets[PACKED]
+
+    # 已有 rows 数据的部署切换到 packed
+    packed = await PlayerDailySnapshot.all().count()
+    await clear()
+    PlayerDailyStatistic.configure_storage(ROWS)
+    await write(pks, n_ships, days)
+    PlayerDailyStatistic.configure_storage(PACKED)
+    result = await migrate_to_packed()
+    print(f" migrate: {result}")
+    assert result["snapshots"] == packed
+    assert [
+        list(await PlayerDailyStatistic.fleet(pk, date)) for pk, _, date in samples
+    ] == fleets[PACKED]
+
+    await clear()
+    await Account.all().delete()
+    await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+模板着色: 每次渲染都做六次整图掩码 vs 按 PR 分段缓存的着色模板
+"""
+
+from _env import timeit
+
+from wows_core.templates import TemplateSet, tint
+from wows_core.wows_img import _load_base_images
+from wows_core.wows_models import PR_BANDS
+
+
+def masked(images, color_pr, color_bg):
+    # 旧实现: 每次复制模板再逐通道替换
+    pr_bar_img = images[1].copy()
+    main_data_img = images[0].copy()
+    max_data_img = images[2].copy()
+    for c in range(3):
+        pr_bar_img[:, :, c][pr_bar_img[:, :, c] == 222] = color_pr[c]
+        main_data_img[:, :, c][main_data_img[:, :, c] == 222] = color_bg[c]
+        max_data_img[:, :, c][max_data_img[:, :, c] == 222] = color_bg[c]
+    return pr_bar_img, main_data_img, max_data_img
+
+
+def cached(images: TemplateSet, color_pr, color_bg):
+    return (
+        images.tinted(1, color_pr),
+        images.tinted(0, color_bg),
+        images.tinted(2, color_bg),
+    )
+
+
+def main():
+    images = _load_base_images()
+    _, color_pr, color_bg, _ = PR_BANDS[3]
+
+    for a, b in zip(masked(images, color_pr, color_bg), cached(images, color_pr, color_bg)):
+        assert (a == b).all()
+    assert (tint(images[3], color_bg) == images.tinted(3, color_bg)).all()
+
+    before = timeit(lambda: masked(images, color_pr, color_bg), 50)
+    after = timeit(lambda: cached(images, color_pr, color_bg), 50)
+    print(f"template prep per render: masked {before:.3f} ms, cached {after:.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
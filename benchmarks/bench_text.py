@@ -0,0 +1,91 @@
+"""
+近期表格 50 行的文字绘制: 原来的 Hershey 数字 (cv.putText) + PIL 逐个画船名, 对比字形图集
+
+只比较画表格各行文字本身, 模板和其他部分不计。原实现每行 6 次 cv.putText,
+再把整张画布转成 PIL 图片逐行画船名; 字形图集实现直接在 numpy 画布上混合。
+用法: python benchmarks/bench_text.py [行数]
+"""
+
+import asyncio
+import sys
+
+import cv2 as cv
+import numpy as np
+from _env import make_player, play, timeit
+from PIL import Image, ImageDraw
+
+from wows_core.wows_img import get_image_and_font
+from wows_core.wows_models import User, render_table_rows
+
+COLOR = (255, 255, 255)
+
+
+def hershey(img, text, center_position, font_size, color):
+    # 原来的 render_text_cv
+    font_scale = font_size / 30.0
+    text_size, _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, font_scale, thickness=4)
+    x_position = center_position[0] - text_size[0] // 2
+    y_position = center_position[1] + text_size[1] // 2
+    cv.putText(
+        img, text, (x_position, y_position), cv.FONT_HERSHEY_SIMPLEX, font_scale, color,
+        thickness=4, lineType=cv.LINE_AA,
+    )
+
+
+def pil(image, text, center_position, font, color):
+    # 原来的 render_text_pil
+    draw = ImageDraw.Draw(image)
+    text_length = draw.textlength(text, font=font)
+    draw.text(
+        (center_position[0] - text_length // 2, center_position[1] - 50 // 2),
+        text, font=font, fill=color,
+    )
+
+
+def old_rows(ships, font) -> np.ndarray:
+    img = np.full((1064 + len(ships) * 84, 1242, 3), 40, dtype=np.uint8)
+    for i, ship in enumerate(ships):
+        ypos = 1119 + i * 83
+        hershey(img, ship.display_battles, (350, ypos), 38, COLOR)
+        hershey(img, ship.display_winrate, (500, ypos), 38, COLOR)
+        hershey(img, ship.display_damage, (700, ypos), 38, COLOR)
+        hershey(img, ship.display_xp, (850, ypos), 38, COLOR)
+        hershey(img, f"{ship.pr.pr_number}", (1000, ypos), 38, ship.pr.pr_color)
+        hershey(img, f"{ship.frags}", (1150, ypos), 38, COLOR)
+    image = Image.fromarray(img[..., ::-1])
+    for i, ship in enumerate(ships):
+        pil(image, ship.ship_name, (130, 1119 + i * 83), font, COLOR)
+    return np.asarray(image)
+
+
+def atlas_rows(ships, font) -> np.ndarray:
+    img = np.full((1064 + len(ships) * 84, 1242, 3), 40, dtype=np.uint8)
+    render_table_rows(img, ships, 1064, font, COLOR)
+    return img
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    detail, ships = make_player(n_ships=300)
+    before, after = User(), User()
+    before.init_user(detail, ships, 0, None, "TAG")
+    await before.async_init(ships)
+    played = play(ships, n=rows)
+    new_detail = dict(detail)
+    new_detail["statistics"] = {"pvp": dict(detail["statistics"]["pvp"])}
+    new_detail["statistics"]["pvp"]["battles"] += rows * 5
+    after.init_user(new_detail, played, 0, None, "TAG")
+    await after.async_init(played)
+    recent = after - before
+    await recent.init_pr_sub()
+    table = recent.ship_list[:rows]
+    _, fonts = await get_image_and_font()
+    font = fonts[-1]
+
+    old = timeit(lambda: old_rows(table, font), 10)
+    new = timeit(lambda: atlas_rows(table, font), 10)
+    print(f"{len(table)} rows: hershey + PIL {old:.1f} ms, glyph atlas {new:.1f} ms, x{old / new:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+WG API 客户端: aiowpi (每次调用新建 session) vs wg_client (每个区服一个长连接 session)
+
+在本地启动一个返回固定数据 (gzip 压缩) 的假 WG 服务器, 两个客户端都指向它,
+比较请求耗时和服务器看到的新建连接数。本地没有 TLS 和真实的 DNS 查询, 线上差距会更大。
+用法: python benchmarks/bench_wg_client.py [请求数] [并发数]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from _env import make_player
+from aiohttp import web
+from aiowpi import WPIClient
+
+from wows_core.config import HttpConfig, WowsApiConfig
+from wows_core.wg_client import WGClient
+from wows_core.wg_fields import USER_FIELDS
+
+
+class FakeWG:
+    def __init__(self) -> None:
+        detail, ships = make_player(n_ships=300)
+        account_id = str(detail["account_id"])
+        self.personal = json.dumps({"status": "ok", "data": {account_id: detail}}).encode()
+        self.stats = json.dumps({"status": "ok", "data": {account_id: ships}}).encode()
+        self.account_id = detail["account_id"]
+        self.connections = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.connections.add(id(request.transport))
+        body = self.personal if request.path.startswith("/wows/account") else self.stats
+        response = web.Response(body=body, content_type="application/json")
+        response.enable_compression()
+        return response
+
+
+async def run(label: str, call, fake: FakeWG, n: int, concurrency: int) -> None:
+    fake.connections.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(n):
+            tg.create_task(one())
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:>9}: {n} requests in {elapsed * 1000:.0f} ms "
+        f"({elapsed / n * 1000:.2f} ms each), {len(fake.connections)} connections"
+    )
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    fake = FakeWG()
+    app = web.Application()
+    app.router.add_get("/{path:.*}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    # 两边都放开限速, 只比较连接开销
+    aiowpi = WPIClient("benchmark-aiowpi", 100000, 1)
+    client = WGClient(WowsApiConfig(application_id=["benchmark"]), HttpConfig(rate=100000))
+    account_id = fake.account_id
+
+    for kind, fields in (("personal", USER_FIELDS.personal_data), ("stats", USER_FIELDS.statistics)):
+        if kind == "personal":
+            old = lambda: aiowpi.player.personal_data(server, account_id, fields=fields)
+            new = lambda: client.player.personal_data(server, account_id, fields=fields)
+        else:
+            old = lambda: aiowpi.warships.statistics(server, account_id, fields=fields)
+            new = lambda: client.warships.statistics(server, account_id, fields=fields)
+        print(f"{kind}:")
+        await run("aiowpi", old, fake, n, concurrency)
+        await run("wg_client", new, fake, n, concurrency)
+
+    print(json.dumps(client.stats()[server], indent=2))
+    await client.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
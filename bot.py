@@ -2,14 +2,13 @@ import nonebot
 from nonebot.adapters.onebot.v11 import Adapter as ONEBOT_V11Adapter
 
 
+if __name__ == "__main__":
+    # 多进程渲染的工作进程 (spawn) 会重新导入本文件, 初始化只在主进程里做
+    nonebot.init()
 
-nonebot.init()
-
-driver = nonebot.get_driver()
-driver.register_adapter(ONEBOT_V11Adapter)
-
-nonebot.load_plugin("wows_core")
+    driver = nonebot.get_driver()
+    driver.register_adapter(ONEBOT_V11Adapter)
 
+    nonebot.load_plugin("wows_core")
 
-if __name__ == "__main__":
-    nonebot.run()
\ No newline at end of file
+    nonebot.run()
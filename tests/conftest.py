@@ -0,0 +1,55 @@
+"""
+测试公共环境
+
+与 benchmarks/_env.py 相同, 用假配置初始化 nonebot 并加载 wows_core。
+在仓库根目录运行: python -m pytest
+"""
+
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import nonebot
+import pytest
+
+nonebot.init(
+    driver="~none",
+    wows_api={"application_id": ["test"]},
+    db_config={"conn": "sqlite://:memory:"},
+)
+nonebot.load_plugin("wows_core")
+
+from tortoise import Tortoise
+from tortoise.backends.base.executor import EXECUTOR_CACHE
+
+MODELS = [
+    "wows_core.models.account",
+    "wows_core.models.daily_statistic",
+    "wows_core.models.daily_run",
+]
+
+
+@pytest.fixture
+def run_db():
+    """
+    返回 run(func, db_url): 在新的事件循环里初始化数据库 (默认内存中的 SQLite) 后运行 func, 结束时关闭连接
+    """
+
+    def run(func, db_url: str = "sqlite://:memory:"):
+        async def main():
+            await Tortoise.init(db_url=db_url, modules={"models": MODELS})
+            await Tortoise.generate_schemas()
+            try:
+                return await func()
+            finally:
+                await Tortoise.close_connections()
+                # Tortoise 按连接名缓存编译好的 SQL, 下一个测试可能换一种数据库, 不能沿用
+                EXECUTOR_CACHE.clear()
+
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,139 @@
+"""
+测试和基准测试共用的数据工厂
+
+按 WG API 的真实结构生成玩家和船只数据, 不依赖 nonebot, 可以在初始化之前导入。
+"""
+
+import json
+import os
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "wows_core/src/wows_ship_list.json"), "r") as f:
+    SHIP_IDS = [int(ship_id) for ship_id in json.load(f)]
+
+
+def _pvp(rng: random.Random, battles: int) -> dict:
+    wins = rng.randint(0, battles)
+    shots = rng.randint(0, battles * 200)
+    return {
+        "battles": battles,
+        "wins": wins,
+        "losses": battles - wins,
+        "draws": 0,
+        "damage_dealt": rng.randint(0, battles * 120000),
+        "xp": rng.randint(0, battles * 2000),
+        "frags": rng.randint(0, battles * 3),
+        "survived_battles": rng.randint(0, battles),
+        "ships_spotted": rng.randint(0, battles * 2),
+        "main_battery": {
+            "shots": shots,
+            "hits": rng.randint(0, shots),
+            "frags": 0,
+            "max_frags_battle": 2,
+        },
+        "max_damage_dealt": rng.randint(0, 300000),
+        "max_damage_scouting": rng.randint(0, 200000),
+        "max_frags_battle": rng.randint(0, 8),
+        "max_planes_killed": rng.randint(0, 50),
+        "max_total_agro": rng.randint(0, 5000000),
+        "max_xp": rng.randint(0, 5000),
+        "max_ships_spotted": rng.randint(0, 10),
+    }
+
+
+def make_player(account_id: int = 2000000001, n_ships: int = 300, seed: int = 1):
+    """
+    生成 (personal_data, warships.statistics) 两份数据, 与 aiowpi 返回的结构一致
+    """
+    rng = random.Random(seed)
+    ships = []
+    for ship_id in rng.sample(SHIP_IDS, min(n_ships, len(SHIP_IDS))):
+        ships.append(
+            {
+                "ship_id": ship_id,
+                "account_id": account_id,
+                "last_battle_time": 1700000000 + rng.randint(0, 10**7),
+                "updated_at": 1700000000,
+                "distance": rng.randint(0, 100000),
+                "battles": 1,
+                "private": None,
+                "pvp": _pvp(rng, rng.randint(0, 400)),
+            }
+        )
+    detail = {
+        "account_id": account_id,
+        "nickname": f"player_{account_id}",
+        "last_battle_time": 1710000000,
+        "leveling_tier": 15,
+        "created_at": 1500000000,
+        "hidden_profile": False,
+        "logout_at": 1710000000,
+        "stats_updated_at": 1710000000,
+        "statistics": {"pvp": _pvp(rng, 5000), "battles": 5000, "distance": 1},
+    }
+    return detail, ships
+
+
+# 真实响应里还有这些分项和模式, 各功能都用不到
+_SECTIONS = ("second_battery", "torpedoes", "aircraft", "ramming")
+_COUNTS = (
+    "planes_killed", "capture_points", "dropped_capture_points", "team_capture_points",
+    "team_dropped_capture_points", "art_agro", "torpedo_agro", "damage_scouting", "survived_wins",
+)
+_BEST_SHIPS = (
+    "max_xp_ship_id", "max_damage_dealt_ship_id", "max_frags_ship_id", "max_planes_killed_ship_id",
+    "max_total_agro_ship_id", "max_damage_scouting_ship_id", "max_ships_spotted_ship_id",
+)
+_MODES = ("pve", "rank_solo", "oper_solo")
+
+
+def _full_pvp(pvp: dict, rng: random.Random) -> dict:
+    for section in _SECTIONS:
+        pvp[section] = {
+            "max_frags_battle": rng.randint(0, 5),
+            "frags": rng.randint(0, 1000),
+            "hits": rng.randint(0, 10000),
+            "max_frags_ship_id": rng.randint(10**9, 5 * 10**9),
+            "shots": rng.randint(0, 50000),
+        }
+    for field in _COUNTS:
+        pvp[field] = rng.randint(0, 10**7)
+    for field in _BEST_SHIPS:
+        pvp[field] = rng.randint(10**9, 5 * 10**9)
+    return pvp
+
+
+def make_full_player(account_id: int = 2000000001, n_ships: int = 300, seed: int = 1):
+    """
+    与 make_player 相同, 但补齐 WG 接口不带 fields 时返回的全部分项和模式, 大小与真实响应相当
+    """
+    rng = random.Random(seed + 10**6)
+    detail, ships = make_player(account_id, n_ships, seed)
+    for ship in ships:
+        _full_pvp(ship["pvp"], rng)
+        for mode in _MODES:
+            ship[mode] = _full_pvp(_pvp(rng, rng.randint(0, 50)), rng)
+    _full_pvp(detail["statistics"]["pvp"], rng)
+    for mode in _MODES:
+        detail["statistics"][mode] = _full_pvp(_pvp(rng, 500), rng)
+    return detail, ships
+
+
+def play(ships: list, n: int = 60, seed: int = 2) -> list:
+    """
+    在一份船只数据上随机打 n 艘船的若干场, 用来构造 recent 数据
+    """
+    rng = random.Random(seed)
+    ships = json.loads(json.dumps(ships))
+    for ship in rng.sample(ships, min(n, len(ships))):
+        pvp = ship["pvp"]
+        battles = rng.randint(1, 5)
+        pvp["battles"] += battles
+        pvp["wins"] += rng.randint(0, battles)
+        pvp["damage_dealt"] += rng.randint(0, battles * 100000)
+        pvp["xp"] += battles * 1000
+        pvp["frags"] += rng.randint(0, battles)
+        ship["last_battle_time"] += rng.randint(1, 10**5)
+    return ships
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from wows_core.config import DailyConfig
+from wows_core.daily_pipeline import Chunk, DailyPipeline
+
+
+class FakeClient:
+    """
+    personal_data 返回公开战绩的玩家, statistics 记录同时进行的最大请求数
+    """
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+        self.player = SimpleNamespace(personal_data=self.personal_data)
+        self.warships = SimpleNamespace(statistics=self.statistics)
+
+    async def personal_data(self, server, account_ids, fields=None):
+        return [
+            SimpleNamespace(account_id=account_id, hidden_profile=False, statistics={})
+            for account_id in account_ids
+        ]
+
+    async def statistics(self, server, account_id, fields=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return [[{"ship_id": 1}]]
+
+
+def test_ship_requests_share_region_limit():
+    """
+    同一区服的多个块同时抓取时, 船只请求总数不超过 request_concurrency
+    """
+
+    async def main():
+        client = FakeClient()
+        pipeline = DailyPipeline(client, DailyConfig(request_concurrency=3))
+        chunks = [
+            Chunk(0, [(pk, pk, 0) for pk in range(start, start + 10)]) for start in (0, 10)
+        ]
+        fetched = await asyncio.gather(*(pipeline._fetch_chunk(chunk) for chunk in chunks))
+        assert sum(len(result.players) for result in fetched) == 20
+        return client.max_running
+
+    assert asyncio.run(main()) == 3
+
+
+def test_chunk_size_within_wg_limit():
+    for chunk_size in (0, 101):
+        with pytest.raises(ValidationError):
+            DailyConfig(chunk_size=chunk_size)
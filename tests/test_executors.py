@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from wows_core.executors import ExecutorRegistry
+
+
+def test_cancelled_tasks_leave_queue():
+    """
+    shutdown 取消的排队任务不会执行, 排队数仍然回到 0
+    """
+
+    async def main():
+        registry = ExecutorRegistry({"cpu": 1})
+        release = threading.Event()
+        running = asyncio.ensure_future(registry.run("cpu", release.wait))
+        queued = [asyncio.ensure_future(registry.run("cpu", int)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert registry.stats("cpu")["queue_depth"] == 3
+        registry.shutdown(wait=False)
+        release.set()
+        await running
+        results = await asyncio.gather(*queued, return_exceptions=True)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        return registry.stats("cpu")
+
+    stats = asyncio.run(main())
+    assert stats["queue_depth"] == 0
+    assert stats["cancelled"] == 3
+    assert stats["completed"] == 1
+
+
+def test_rejects_unknown_and_closed_pools():
+    registry = ExecutorRegistry()
+    with pytest.raises(KeyError):
+        registry.get("nope")
+    registry.get("io")
+    registry.shutdown(wait=False)
+    with pytest.raises(RuntimeError):
+        registry.get("io")
+    with pytest.raises(RuntimeError):
+        registry.register("io", ThreadPoolExecutor(1))
@@ -0,0 +1,23 @@
+import asyncio
+
+from wows_core.key_pool import KeyPool
+
+
+def test_headroom_follows_limiter():
+    async def main():
+        pool = KeyPool(["a", "b"], rate=4, period=0.2)
+        a, b = pool.keys
+        for _ in range(3):
+            assert await pool.acquire() in ("a", "b")
+        # 每次都挑余量最多的 id
+        assert sorted((round(a.headroom()), round(b.headroom()))) == [2, 3]
+        for _ in range(5):
+            await pool.acquire()
+        assert a.headroom() < 1 and b.headroom() < 1
+        assert not a.limiter.has_capacity() and not b.limiter.has_capacity()
+        # 桶按时间漏完后余量恢复
+        await asyncio.sleep(0.25)
+        assert a.headroom() == b.headroom() == 4
+        assert a.limiter.has_capacity(4)
+
+    asyncio.run(main())
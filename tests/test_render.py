@@ -0,0 +1,81 @@
+import asyncio
+from io import BytesIO
+
+from factories import make_player, play
+from PIL import Image
+
+from wows_core.wows_img import get_image_and_font, render_table_pages
+from wows_core.wows_models import (
+    CARD_WIDTH,
+    RANK_ROWS,
+    TABLE_TOP,
+    TILE_HEADER,
+    User,
+    wows_rank,
+    wows_recent,
+    wows_user,
+)
+
+
+def size(img: bytes) -> tuple[int, int]:
+    return Image.open(BytesIO(img)).size
+
+
+async def players(n_ships: int, n_played: int) -> tuple[User, User]:
+    """
+    返回 (当前玩家, 与快照相减得到的 recent), recent 中有 n_played 艘船
+    """
+    detail, ships = make_player(n_ships=n_ships)
+    old = User()
+    old.init_user(detail, ships, 0, None, "TEST")
+    await old.async_init(ships)
+    old.date = "2025-01-01"
+    played = play(ships, n_played)
+    new = User()
+    new.init_user(detail, played, 0, None, "TEST")
+    await new.async_init(played)
+    # 账号总场次没变时相减得到空的差分
+    new.battles += 1
+    recent = new - old
+    await recent.init_pr_sub()
+    return new, recent
+
+
+def test_render_cards():
+    """
+    每种卡片实际渲染一次, 绘制调用写错 (参数个数, 未定义的名字) 时直接失败;
+    表格的高度由行数决定, 后续页只有列名一行作为页头
+    """
+
+    async def main():
+        new, recent = await players(30, 10)
+        base_img, fonts = await get_image_and_font()
+        return (
+            len(recent.ship_list),
+            wows_user(new, base_img, fonts),
+            wows_recent(recent, base_img, fonts),
+            wows_rank(new, base_img, fonts),
+            wows_rank(new, base_img, fonts, start=RANK_ROWS, stop=2 * RANK_ROWS),
+        )
+
+    rows, user, recent, rank, rank_tile = asyncio.run(main())
+    assert rows == 10
+    assert size(user)[0] == CARD_WIDTH
+    assert size(recent) == (CARD_WIDTH, TABLE_TOP + rows * 84)
+    assert size(rank) == (CARD_WIDTH, TABLE_TOP + RANK_ROWS * 84)
+    assert size(rank_tile) == (CARD_WIDTH, TILE_HEADER + (30 - RANK_ROWS) * 84)
+
+
+def test_recent_pages():
+    """
+    超过单张图上限的 recent 按 page_rows (默认 25) 分页, 每页行数之和等于总行数
+    """
+
+    async def main():
+        _, recent = await players(80, 60)
+        return len(recent.ship_list), await render_table_pages("recent", recent)
+
+    rows, pages = asyncio.run(main())
+    assert rows == 60
+    heights = [size(page)[1] for page in pages]
+    assert heights == [TABLE_TOP + 25 * 84, TILE_HEADER + 25 * 84, TILE_HEADER + 10 * 84]
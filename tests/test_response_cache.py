@@ -0,0 +1,27 @@
+import asyncio
+
+from wows_core.response_cache import CachePolicy, ResponseCache
+
+
+def test_zero_entries_disables_cache():
+    """
+    max_entries 为 0 时每次都调用 fetch, 不插入条目也不计淘汰
+    """
+
+    async def main():
+        cache = ResponseCache(0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return {1: "data"}
+
+        policy = CachePolicy(ttl=60)
+        for _ in range(3):
+            assert await cache.get("key", policy, fetch) == {1: "data"}
+        return cache, len(calls)
+
+    cache, calls = asyncio.run(main())
+    assert calls == 3
+    assert cache.stats()["entries"] == 0
+    assert cache.evictions == 0
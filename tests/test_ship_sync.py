@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+
+from wows_core.ship_index import ShipIndex, load_index
+from wows_core.ship_sync import apply_entries, diff_entries, fetch_all
+
+
+def ship(name: str, tier: int = 10, ship_type: str = "Destroyer") -> dict:
+    return {
+        "name": name,
+        "tier": tier,
+        "type": ship_type,
+        "images": {"small": f"https://example.com/{name}.png"},
+        "nation": "japan",
+        "is_premium": False,
+        "is_special": False,
+    }
+
+
+class FakeEncyclopedia:
+    """
+    按页返回固定数据, 记录请求过的页和同时进行的最大请求数
+    """
+
+    def __init__(self, pages: list[dict]) -> None:
+        self.pages = pages
+        self.requested = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, page_no: int) -> tuple[int, dict]:
+        self.requested.append(page_no)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return len(self.pages), self.pages[page_no - 1]
+
+
+def write_json(path, ships: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(ships, f, ensure_ascii=False, indent=4)
+
+
+def test_fetch_all_merges_pages():
+    pages = [{str(page * 10 + i): ship(f"s{page}{i}") for i in range(3)} for page in range(7)]
+    fake = FakeEncyclopedia(pages)
+    ships = asyncio.run(fetch_all(fake, concurrency=2))
+    assert ships == {ship_id: entry for page in pages for ship_id, entry in page.items()}
+    assert sorted(fake.requested) == list(range(1, 8))
+    assert fake.requested[0] == 1
+    assert fake.max_running == 2
+
+
+def test_fetch_all_single_page():
+    fake = FakeEncyclopedia([{"1": ship("a")}])
+    assert asyncio.run(fetch_all(fake)) == {"1": ship("a")}
+    assert fake.requested == [1]
+
+
+def test_diff_entries():
+    current = {
+        "1": {**ship("same"), "RE": False},
+        "2": {**ship("old name"), "RE": False},
+        "3": {**ship("retired"), "RE": False},
+    }
+    fetched = {
+        "1": ship("same"),
+        2: ship("new name"),
+        "4": {**ship("added"), "unused": 1},
+        "5": None,
+    }
+    changed = diff_entries(current, fetched)
+    # 没变化的船、图鉴里已经没有的船和空条目都不算变化; 只保留 SHIP_FIELDS 中的字段
+    assert changed == {"2": ship("new name"), "4": ship("added")}
+
+
+def test_apply_entries(tmp_path):
+    json_path, index_path = tmp_path / "ships.json", tmp_path / "ships.bin"
+    write_json(json_path, {"1": {**ship("a"), "RE": True}, "2": {**ship("b"), "RE": False}})
+
+    result, index = apply_entries({"1": ship("a2", tier=9), "3": ship("c")}, json_path, index_path)
+    assert (result.fetched, result.added, result.updated) == (2, 1, 1)
+    assert isinstance(index, ShipIndex)
+    assert index.name(1) == "a2" and index.tier(1) == 9 and index.name(3) == "c"
+    with open(json_path) as f:
+        ships = json.load(f)
+    # 已有的额外字段保留, 新船补上默认值, 图鉴里没有的船不删除
+    assert ships["1"] == {**ship("a2", tier=9), "RE": True}
+    assert ships["3"] == {**ship("c"), "RE": False}
+    assert "2" in ships
+    # 同步写入的索引被认为是最新的, 加载时不重建
+    built = os.stat(index_path).st_mtime_ns
+    assert load_index(json_path, index_path).digest == index.digest
+    assert os.stat(index_path).st_mtime_ns == built
+
+
+def test_apply_entries_unchanged(tmp_path):
+    json_path, index_path = tmp_path / "ships.json", tmp_path / "ships.bin"
+    write_json(json_path, {"1": {**ship("a"), "RE": False}})
+    before = os.stat(json_path).st_mtime_ns
+    result, index = apply_entries({"1": ship("a")}, json_path, index_path)
+    assert index is None and not result.changed
+    assert os.stat(json_path).st_mtime_ns == before
+    assert not index_path.exists()
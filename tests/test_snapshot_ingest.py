@@ -0,0 +1,118 @@
+import datetime
+import os
+
+import pytest
+from tortoise.transactions import in_transaction
+
+from wows_core.models.account import Account
+from wows_core.models.daily_statistic import (
+    ROWS,
+    SNAPSHOT_COLUMNS,
+    PlayerDailyHeartbeat,
+    PlayerDailyStatistic,
+)
+from wows_core.snapshot_ingest import COPY, INSERT, write_heartbeats, write_snapshots
+
+# COPY 只在 asyncpg 后端上使用, 设置 WOWS_TEST_PG_URL (例如 asyncpg://postgres:@127.0.0.1:5432/postgres) 时才测试;
+# 测试会清空这个库里的账号和快照表
+PG_URL = os.environ.get("WOWS_TEST_PG_URL")
+BACKENDS = [
+    pytest.param("sqlite://:memory:", INSERT, id="sqlite-insert"),
+    pytest.param(
+        PG_URL,
+        COPY,
+        id="postgres-copy",
+        marks=pytest.mark.skipif(not PG_URL, reason="WOWS_TEST_PG_URL 未设置"),
+    ),
+]
+DATE = datetime.date(2024, 1, 2)
+LAST_BATTLE = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+async def clear() -> None:
+    await PlayerDailyHeartbeat.all().delete()
+    await PlayerDailyStatistic.all().delete()
+    await Account.all().delete()
+
+
+async def accounts(n: int) -> list[int]:
+    await Account.bulk_create(
+        Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(n)
+    )
+    return list(await Account.all().order_by("id").values_list("id", flat=True))
+
+
+def snapshot(account_pk: int, ship_id: int, battles: int) -> tuple:
+    return (account_pk, ship_id, DATE, battles, battles // 2, 10, 5, 1000, 1, 1, 100, LAST_BATTLE)
+
+
+async def stored() -> list[tuple]:
+    rows = await PlayerDailyStatistic.all().order_by("account_id", "ship_id").values_list(
+        *SNAPSHOT_COLUMNS
+    )
+    return [(*row[:-1], row[-1].timestamp()) for row in rows]
+
+
+def expected(rows: list[tuple]) -> list[tuple]:
+    return sorted((*row[:-1], row[-1].timestamp()) for row in rows)
+
+
+@pytest.mark.parametrize("db_url, method", BACKENDS)
+def test_write_snapshots_inserts_and_upserts(run_db, db_url, method):
+    async def main():
+        PlayerDailyStatistic.configure_storage(ROWS)
+        await clear()
+        try:
+            pks = await accounts(2)
+            rows = [snapshot(pk, ship_id, 10) for pk in pks for ship_id in (1, 2, 3)]
+            async with in_transaction() as connection:
+                assert await write_snapshots(rows, connection, batch_size=4) == method
+            assert await stored() == expected(rows)
+
+            # 同一天重复写入: 已有的记录以最后一次为准, 新的船直接插入
+            again = [snapshot(pks[0], 2, 12), snapshot(pks[1], 3, 15), snapshot(pks[1], 4, 1)]
+            async with in_transaction() as connection:
+                assert await write_snapshots(again, connection, batch_size=4) == method
+            rows = [row for row in rows if row[:2] not in {(pks[0], 2), (pks[1], 3)}] + again
+            assert await stored() == expected(rows)
+
+            # 空的批次不写入
+            async with in_transaction() as connection:
+                assert await write_snapshots([], connection) == method
+            assert await PlayerDailyStatistic.all().count() == len(rows)
+        finally:
+            await clear()
+
+    run_db(main, db_url)
+
+
+@pytest.mark.parametrize("db_url, method", BACKENDS)
+def test_write_snapshots_rolls_back_with_transaction(run_db, db_url, method):
+    async def main():
+        PlayerDailyStatistic.configure_storage(ROWS)
+        await clear()
+        try:
+            pks = await accounts(1)
+            with pytest.raises(RuntimeError):
+                async with in_transaction() as connection:
+                    await write_snapshots([snapshot(pks[0], 1, 10)], connection)
+                    raise RuntimeError
+            assert await PlayerDailyStatistic.all().count() == 0
+        finally:
+            await clear()
+
+    run_db(main, db_url)
+
+
+def test_write_heartbeats_upserts(run_db):
+    async def main():
+        pks = await accounts(2)
+        async with in_transaction() as connection:
+            await write_heartbeats([(pk, DATE, 3, 30) for pk in pks], connection)
+            await write_heartbeats([(pks[0], DATE, 4, 31)], connection)
+        heartbeats = await PlayerDailyHeartbeat.all().order_by("account_id").values_list(
+            "account_id", "date", "ships", "battles"
+        )
+        assert heartbeats == [(pks[0], DATE, 4, 31), (pks[1], DATE, 3, 30)]
+
+    run_db(main)
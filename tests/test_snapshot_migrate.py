@@ -0,0 +1,98 @@
+import datetime
+import random
+
+from tortoise.transactions import in_transaction
+
+from wows_core.models.account import Account
+from wows_core.models.daily_statistic import PACKED, ROWS, PlayerDailyStatistic
+from wows_core.snapshot_ingest import write_snapshots
+from wows_core.snapshot_migrate import migrate_to_delta, migrate_to_packed, pending_accounts
+
+START = datetime.date(2024, 1, 1)
+DAYS = 6
+
+
+def full_snapshots(account_pks: list) -> list:
+    """
+    旧的全量快照: 每天每个账号的每艘船一条, 每天只有几艘船的场次变化
+    """
+    rng = random.Random(0)
+    last_battle = datetime.datetime(2023, 12, 31)
+    fleets = {
+        pk: {ship_id: [rng.randint(1, 100)] * 8 + [last_battle] for ship_id in range(1, 6)}
+        for pk in account_pks
+    }
+    rows = []
+    for day in range(DAYS):
+        date = START + datetime.timedelta(days=day)
+        for pk, fleet in fleets.items():
+            if day:
+                for ship_id in rng.sample(list(fleet), rng.randint(0, 2)):
+                    stats = [value + rng.randint(1, 5) for value in fleet[ship_id][:8]]
+                    fleet[ship_id] = stats + [last_battle + datetime.timedelta(days=day)]
+            for ship_id, stats in fleet.items():
+                rows.append((pk, ship_id, date, *stats))
+    return rows
+
+
+def test_migration_keeps_fleet_as_of_each_day(run_db):
+    async def main():
+        PlayerDailyStatistic.configure_storage(ROWS)
+        await Account.bulk_create(
+            Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(3)
+        )
+        pks = await Account.all().values_list("id", flat=True)
+        rows = full_snapshots(pks)
+        async with in_transaction() as connection:
+            await write_snapshots(rows, connection)
+        # 最后一天之后的日期取到的是最后一天的船队
+        dates = [START + datetime.timedelta(days=day) for day in range(DAYS + 2)]
+        before = {
+            (pk, date): sorted(await PlayerDailyStatistic.fleet(pk, date))
+            for pk in pks
+            for date in dates
+        }
+
+        result = await migrate_to_delta(batch_size=2)
+        assert result["accounts"] == 3
+        assert result["deleted"] > 0
+        assert await PlayerDailyStatistic.all().count() == len(rows) - result["deleted"]
+        for (pk, date), fleet in before.items():
+            assert sorted(await PlayerDailyStatistic.fleet(pk, date)) == fleet, (pk, date)
+        assert not await pending_accounts()
+        assert (await migrate_to_delta())["deleted"] == 0
+
+    run_db(main)
+
+
+def test_packed_migration_keeps_fleet(run_db):
+    async def main():
+        PlayerDailyStatistic.configure_storage(ROWS)
+        await Account.bulk_create(
+            Account(account_id=1000 + i, server=0, nickname=f"p{i}") for i in range(3)
+        )
+        pks = await Account.all().values_list("id", flat=True)
+        async with in_transaction() as connection:
+            await write_snapshots(full_snapshots(pks), connection)
+        await migrate_to_delta()
+        dates = [START + datetime.timedelta(days=day) for day in range(DAYS + 2)]
+
+        async def fleets():
+            result = {}
+            for pk in pks:
+                for date in dates:
+                    fleet = await PlayerDailyStatistic.fleet(pk, date)
+                    result[pk, date] = sorted((*ship[:-1], int(ship[-1])) for ship in fleet)
+            return result
+
+        before = await fleets()
+        PlayerDailyStatistic.configure_storage(PACKED)
+        try:
+            result = await migrate_to_packed()
+            assert result["accounts"] == 3
+            assert await fleets() == before
+            assert (await migrate_to_packed())["accounts"] == 0
+        finally:
+            PlayerDailyStatistic.configure_storage(ROWS)
+
+    run_db(main)
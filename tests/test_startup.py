@@ -0,0 +1,21 @@
+import asyncio
+
+from nonebot import get_driver
+
+from wows_core.models.daily_run import DailyRun
+
+
+def test_startup_hooks():
+    """
+    启动钩子按注册顺序执行, 查库的钩子必须在 init_db 之后, 否则启动失败
+    """
+
+    async def main():
+        lifespan = get_driver()._lifespan
+        await lifespan.startup()
+        try:
+            assert await DailyRun.all().count() == 0
+        finally:
+            await lifespan.shutdown()
+
+    asyncio.run(main())
@@ -1,10 +1,7 @@
-from nonebot import get_plugin_config
+from nonebot import get_driver
 from nonebot.plugin import PluginMetadata
 from nonebot import require
 
-require("nonebot_plugin_waiter")
-require("nonebot_plugin_apscheduler")
-
 from .config import Config
 
 __plugin_meta__ = PluginMetadata(
@@ -14,5 +11,14 @@ __plugin_meta__ = PluginMetadata(
     config=Config,
 )
 
-from .cmd_handler import *
-from .wows_auto import *
\ No newline at end of file
+try:
+    get_driver()
+except ValueError:
+    # 多进程渲染的工作进程 (spawn) 没有初始化 nonebot, 只导入渲染用到的模块, 不注册插件
+    pass
+else:
+    require("nonebot_plugin_waiter")
+    require("nonebot_plugin_apscheduler")
+
+    from .cmd_handler import *
+    from .wows_auto import *
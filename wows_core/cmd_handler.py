@@ -2,36 +2,56 @@
 """
 指令解析器
 """
-import asyncio
 from nonebot.rule import startswith, is_type
 from nonebot.adapters.onebot.v11 import GroupMessageEvent, Bot, MessageSegment
 from nonebot import get_driver, get_plugin_config
 from nonebot.plugin import on_message
 from nonebot.exception import MatcherException
 from .config import Config
+from .executors import executor_registry
+from .render_farm import render_farm
+from .encoder import configure_encoder
+from .image_cache import image_cache
+from .wg_client import wg_client
 from .interrupt import add_player_waiter, wait_me, wait_account_id
 from tortoise import Tortoise
 from nonebot import logger
-from .wows_img import gen_player_image_by_account_id, get_me_recent_image
+from .wows_img import (
+    gen_player_image_by_account_id,
+    get_me_recent_image,
+    get_image_and_font,
+)
 import aiohttp
 from aiohttp.client_exceptions import ClientConnectorError
-from .wows_auto import update_player_daily_statistic
+from .wows_auto import (
+    resume_daily_statistic,
+    start_migrate_daily_statistic,
+    update_player_daily_statistic,
+)
 from .models.daily_statistic import PlayerDailyStatistic
 import datetime
 
 plugin_config = get_plugin_config(Config).wows_api
 db_config = get_plugin_config(Config).db_config
+daily_config = get_plugin_config(Config).daily
+executor_config = get_plugin_config(Config).executor
+image_config = get_plugin_config(Config).image
 
 
 async def init_db():
     await Tortoise.init(
         db_url=db_config.conn,
         modules={
-            "models": ["wows_core.models.account", "wows_core.models.daily_statistic"]
+            "models": [
+                "wows_core.models.account",
+                "wows_core.models.daily_statistic",
+                "wows_core.models.daily_run",
+            ]
         },
         timezone="Asia/Shanghai",
     )
     await Tortoise.generate_schemas()
+    PlayerDailyStatistic.configure_storage(daily_config.storage)
     # logger.success("init DB success")
 
 async def close_db():
@@ -40,8 +60,48 @@ async def close_db():
 
 
 
+async def init_executors():
+    configure_encoder(**image_config.model_dump())
+    image_cache.configure(image_config.cache_mb * 1024 * 1024)
+    executor_registry.configure(
+        executor_config.model_dump(include={"render", "io", "cpu"})
+    )
+    if executor_config.render_backend == "process":
+        base_img, _ = await get_image_and_font()
+        render_farm.start(base_img, executor_config.render_processes)
+        logger.success(f"render farm started: {executor_config.render_processes} processes")
+
+
+async def close_executors():
+    logger.info(f"executor stats: {executor_registry.stats()}")
+    logger.info(f"image cache stats: {image_cache.stats()}")
+    if render_farm.running:
+        logger.info(f"render farm stats: {render_farm.stats()}")
+        render_farm.shutdown()
+    executor_registry.shutdown(wait=False)
+    logger.success("shutdown all executors")
+
+
+async def init_wg_client():
+    await wg_client.start()
+
+
+async def close_wg_client():
+    logger.info(f"wg api stats: {wg_client.stats()}")
+    await wg_client.close()
+    logger.success("close all wg api sessions")
+
+
 get_driver().on_startup(init_db)
+get_driver().on_startup(init_executors)
+get_driver().on_startup(init_wg_client)
+# 启动钩子按注册顺序依次执行, 迁移和续跑都要查库, 必须在 init_db 之后注册;
+# 迁移先拿到 daily_lock, 续跑的每日任务等迁移完成后再开始
+get_driver().on_startup(start_migrate_daily_statistic)
+get_driver().on_startup(resume_daily_statistic)
 get_driver().on_shutdown(close_db)
+get_driver().on_shutdown(close_executors)
+get_driver().on_shutdown(close_wg_client)
 
 wows = on_message(
     rule=startswith("wows") & is_type(GroupMessageEvent), priority=1, block=False
@@ -68,7 +128,6 @@ async def get_args(messages: list[MessageSegment]) -> list[str]:
 @wows.handle()
 async def handler(bot: Bot, event: GroupMessageEvent):
     try:
-        await init_db()
         args = await get_args(event.original_message)
         if not args:
             return
@@ -217,8 +276,6 @@ async def handler(bot: Bot, event: GroupMessageEvent):
     except Exception as e:
         await wows.send(str(e))
         raise
-    finally:
-        await Tortoise.close_connections()
 
 
 async def tt():
@@ -1,25 +1,78 @@
-from pydantic import BaseModel
-import itertools
+from pydantic import BaseModel, Field
 
 
 class WowsApiConfig(BaseModel):
     application_id: list[str]
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.__pool = itertools.cycle(self.application_id)
-
-    def get_application_id(self):
-        return next(self.__pool)
-
 
 class PgDBConfig(BaseModel):
     conn: str
 
 
+class ExecutorConfig(BaseModel):
+    """
+    共享执行器的线程数, 对应 .env 中的 EXECUTOR__RENDER 等
+    """
+
+    render: int = 4  # 图片渲染
+    io: int = 8  # 文件读写
+    cpu: int = 2  # 其他同步计算
+    render_backend: str = "thread"  # thread 或 process (多进程渲染)
+    render_processes: int = 2  # process 后端的工作进程数
+
+
+class ImageConfig(BaseModel):
+    """
+    输出图片的编码参数, 对应 .env 中的 IMAGE__FORMAT 等
+    """
+
+    format: str = "JPEG"  # JPEG 或 WEBP
+    quality: int = 75
+    progressive: bool = False  # 仅 JPEG
+    webp_method: int = 2  # 0-6, 越大越慢压缩率越高
+    cache_mb: int = 64  # 渲染结果缓存上限, 0 表示不缓存
+    page_rows: int = Field(25, ge=1)  # 表格超过单张图上限时每页的行数, 至少 1
+
+
+class HttpConfig(BaseModel):
+    """
+    WG API 连接池参数, 对应 .env 中的 HTTP__LIMIT_PER_REGION 等
+    """
+
+    limit_per_region: int = 20  # 每个区服的最大并发连接数
+    keepalive_timeout: float = 60  # 空闲连接保留时长 (秒)
+    dns_ttl: int = 300  # DNS 缓存时长 (秒)
+    connect_timeout: float = 10
+    timeout: float = 30  # 单个请求的总超时 (秒)
+    rate: float = 10  # 每个 application_id 每秒的请求数
+    key_cooldown: float = 1  # application_id 被限流后暂停使用的时长 (秒), 连续被限流时加倍
+    cache_entries: int = 4096  # 响应缓存的条目上限, 0 表示不缓存
+
+
+class DailyConfig(BaseModel):
+    """
+    每日快照流水线参数, 对应 .env 中的 DAILY__CHUNK_SIZE 等
+    """
+
+    chunk_size: int = Field(100, ge=1, le=100)  # 每块的账号数, WG 单次最多接受 100 个 id
+    fetch_concurrency: int = 2  # 每个区服同时抓取的块数
+    request_concurrency: int = Field(16, ge=1)  # 每个区服同时进行的 WG 请求数, 所有抓取协程共用
+    queue_size: int = 4  # 相邻阶段之间最多排队的块数
+    write_batch: int = 2000  # 每次写库的记录数
+    chunk_retries: int = 2  # 块抓取失败后的重试次数
+    account_attempts: int = 3  # 同一天里一个账号最多尝试的次数
+    run_retries: int = 2  # 有失败的账号时, 任务结束后再跑几轮 (只处理未完成的账号)
+    retry_delay: float = 300  # 每轮之间的间隔 (秒)
+    storage: str = "rows"  # 快照存储方式: rows (每艘船一行) 或 packed (每个账号每天一行打包的船队)
+
+
 class Config(BaseModel):
     wows_api: WowsApiConfig
     db_config: PgDBConfig
+    executor: ExecutorConfig = ExecutorConfig()
+    image: ImageConfig = ImageConfig()
+    http: HttpConfig = HttpConfig()
+    daily: DailyConfig = DailyConfig()
 
 
 WOWS_CORE_CACHE = {}
@@ -0,0 +1,407 @@
+"""
+每日快照流水线
+
+账号按主键分页读出, 按区服切成不超过 WG 单次 id 上限的块, 依次经过
+抓取 → 解码 → 生成记录 → 写库 四个阶段, 相邻阶段之间用有界队列连接:
+下游处理不过来时上游在 put 上等待, 内存中同时只有队列容量内的几个块, 与账号总数无关。
+每个区服有自己的抓取队列和固定数量的抓取协程, 同一区服的所有 WG 请求共用一个信号量限制并发,
+各个 application_id 的限速由 wg_client 的 key_pool 负责。
+一个块重试后仍然失败只丢弃这个块, 不影响同一区服的其他账号。结束时输出各阶段的吞吐和延迟。
+
+每个账号的结果 (done / skipped / failed) 和它的快照记录在同一个事务里写入 daily_run_accounts,
+同一天再次运行 (重试或进程重启) 时跳过已完成的账号; 快照按 (账号, 船, 日期) upsert (见 snapshot_ingest), 重复写入不会冲突。
+
+快照只写场次与之前最新记录不同的船, 另外每个账号写一条心跳 (见 PlayerDailyStatistic 和 PlayerDailyHeartbeat);
+packed 存储方式下改为船队有变化的账号打包写入一行完整船队。
+"""
+
+import asyncio
+import datetime
+import time
+from typing import NamedTuple, Optional
+
+from nonebot import logger
+from tortoise.transactions import in_transaction
+
+from .config import DailyConfig
+from .expected import ExpectedValues, expected_store
+from .models.account import Account
+from .models.daily_run import DONE, FAILED, SKIPPED, DailyRun, DailyRunAccount
+from .models.daily_statistic import PlayerDailyHeartbeat, PlayerDailyStatistic
+from .snapshot_ingest import write_heartbeats, write_snapshots
+from .wg_client import REGIONS, WGClient
+from .wg_decode import PlayerDetail, ShipStats
+from .wg_fields import DAILY_FIELDS
+from .wows_models import User as Player
+
+# 队列结束标记
+_DONE = object()
+
+class Chunk(NamedTuple):
+    server: int
+    accounts: list[tuple[int, int, int]]  # [(Account 主键, account_id, 之前的尝试次数)]
+
+
+class Outcome(NamedTuple):
+    pk: int  # Account 主键
+    status: str
+    attempts: int
+    error: Optional[str] = None
+
+
+class Fetched(NamedTuple):
+    # [(Account 主键, 之前的尝试次数, 玩家, 船只)]
+    players: list[tuple[int, int, PlayerDetail, list[ShipStats]]]
+    outcomes: list[Outcome]  # 不再往下走的账号 (跳过或失败)
+
+
+class StageStats:
+    """
+    单个阶段的处理统计, units 是账号数或记录数
+    """
+
+    def __init__(self, name: str, unit: str) -> None:
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.units = 0
+        self.failed = 0
+        self.busy = 0.0  # 处理耗时之和
+        self.max_latency = 0.0
+        self.blocked = 0.0  # 等待下游队列的时间
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def record(self, start: float, units: int) -> None:
+        latency = time.perf_counter() - start
+        self.items += 1
+        self.units += units
+        self.busy += latency
+        self.max_latency = max(self.max_latency, latency)
+        if self.started is None:
+            self.started = start
+        self.finished = time.perf_counter()
+
+    def snapshot(self) -> dict:
+        elapsed = (self.finished - self.started) if self.started is not None else 0.0
+        return {
+            "items": self.items,
+            self.unit: self.units,
+            "failed": self.failed,
+            "per_second": round(self.units / elapsed, 1) if elapsed else 0.0,
+            "avg_ms": round(self.busy / self.items * 1000, 1) if self.items else 0.0,
+            "max_ms": round(self.max_latency * 1000, 1),
+            "blocked_s": round(self.blocked, 2),
+        }
+
+
+def _error(e: Exception) -> str:
+    return repr(e)[:200]
+
+
+class DailyPipeline:
+    def __init__(
+        self, client: WGClient, config: DailyConfig, date: Optional[datetime.date] = None
+    ) -> None:
+        self.client = client
+        self.config = config
+        self.date = date or datetime.date.today()
+        self.stages = {
+            "fetch": StageStats("fetch", "accounts"),
+            "decode": StageStats("decode", "accounts"),
+            "rows": StageStats("rows", "rows"),
+            "write": StageStats("write", "rows"),
+        }
+        self.ingest = None  # 写库方式, 见 snapshot_ingest
+        self.unchanged = 0  # 场次没有变化、不用写入的船
+        self.resumed = 0  # 之前的运行已经处理完的账号
+        self.given_up = 0  # 失败次数达到上限, 本次不再尝试的账号
+        self._run: Optional[DailyRun] = None
+        self._expected: Optional[ExpectedValues] = None
+        # 每个区服同时进行的 WG 请求数, 与块大小和抓取协程数无关
+        self._limits = {
+            server: asyncio.Semaphore(config.request_concurrency) for server in range(len(REGIONS))
+        }
+
+    async def _put(self, queue: asyncio.Queue, item, stats: StageStats) -> None:
+        start = time.perf_counter()
+        await queue.put(item)
+        stats.blocked += time.perf_counter() - start
+
+    async def run(self) -> dict:
+        """
+        跑完当天还没完成的账号, 返回各阶段的统计和整天的结果汇总
+        """
+        start = time.perf_counter()
+        self._run = await DailyRun.start(self.date)
+        self._expected = await expected_store.get()
+        size = self.config.queue_size
+        fetch_queues = {server: asyncio.Queue(size) for server in range(len(REGIONS))}
+        decode_queue = asyncio.Queue(size)
+        rows_queue = asyncio.Queue(size)
+        write_queue = asyncio.Queue(size)
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._chunk(fetch_queues))
+            fetchers = [
+                tg.create_task(self._fetch(queue, decode_queue))
+                for queue in fetch_queues.values()
+                for _ in range(self.config.fetch_concurrency)
+            ]
+            tg.create_task(self._close_after(fetchers, decode_queue))
+            tg.create_task(self._decode(decode_queue, rows_queue))
+            tg.create_task(self._rows(rows_queue, write_queue))
+            tg.create_task(self._write(write_queue))
+        await self._run.finish()
+        result = {name: stats.snapshot() for name, stats in self.stages.items()}
+        result["rows"]["unchanged"] = self.unchanged
+        result["write"]["ingest"] = self.ingest
+        result["summary"] = await self.summary()
+        result["elapsed_s"] = round(time.perf_counter() - start, 2)
+        return result
+
+    async def summary(self) -> dict:
+        run = self._run
+        failed = (
+            await DailyRunAccount.filter(run_id=run.id, status=FAILED)
+            .limit(20)
+            .values_list("account__account_id", flat=True)
+        )
+        return {
+            "date": str(run.date),
+            "status": run.status,
+            "attempts": run.attempts,
+            "done": run.done,
+            "skipped": run.skipped,
+            "failed": run.failed,
+            "resumed": self.resumed,
+            "given_up": self.given_up,
+            "failed_accounts": failed,
+        }
+
+    async def _chunk(self, fetch_queues: dict[int, asyncio.Queue]) -> None:
+        """
+        按主键分页读取账号, 跳过当天已经完成的, 每个区服攒够 chunk_size 个发出一块
+        """
+        chunk_size = self.config.chunk_size
+        buffers: dict[int, list] = {server: [] for server in fetch_queues}
+        last_id = 0
+        while True:
+            page = (
+                await Account.filter(id__gt=last_id)
+                .order_by("id")
+                .limit(chunk_size)
+                .values_list("id", "account_id", "server")
+            )
+            if not page:
+                break
+            last_id = page[-1][0]
+            progress = {
+                pk: (status, attempts)
+                for pk, status, attempts in await DailyRunAccount.filter(
+                    run_id=self._run.id, account_id__in=[row[0] for row in page]
+                ).values_list("account_id", "status", "attempts")
+            }
+            for pk, account_id, server in page:
+                status, attempts = progress.get(pk, (None, 0))
+                if status in (DONE, SKIPPED):
+                    self.resumed += 1
+                    continue
+                if attempts >= self.config.account_attempts:
+                    self.given_up += 1
+                    continue
+                if server not in buffers:
+                    continue
+                buffer = buffers[server]
+                buffer.append((pk, account_id, attempts))
+                if len(buffer) >= chunk_size:
+                    await fetch_queues[server].put(Chunk(server, buffer))
+                    buffers[server] = []
+        for server, buffer in buffers.items():
+            if buffer:
+                await fetch_queues[server].put(Chunk(server, buffer))
+        for queue in fetch_queues.values():
+            for _ in range(self.config.fetch_concurrency):
+                await queue.put(_DONE)
+
+    async def _fetch(self, queue: asyncio.Queue, out: asyncio.Queue) -> None:
+        stats = self.stages["fetch"]
+        while (chunk := await queue.get()) is not _DONE:
+            start = time.perf_counter()
+            for retry in range(self.config.chunk_retries + 1):
+                try:
+                    fetched = await self._fetch_chunk(chunk)
+                    break
+                except Exception as e:
+                    logger.warning(
+                        f"daily chunk fetch failed ({retry + 1}), server {chunk.server}, "
+                        f"{len(chunk.accounts)} accounts: {e!r}"
+                    )
+                    error = _error(e)
+            else:
+                stats.failed += len(chunk.accounts)
+                outcomes = [
+                    Outcome(pk, FAILED, attempts + 1, error) for pk, _, attempts in chunk.accounts
+                ]
+                await self._put(out, Fetched([], outcomes), stats)
+                continue
+            stats.record(start, len(chunk.accounts))
+            await self._put(out, fetched, stats)
+
+    async def _fetch_chunk(self, chunk: Chunk) -> Fetched:
+        server = REGIONS[chunk.server]
+        client = self.client
+        accounts = {account_id: (pk, attempts) for pk, account_id, attempts in chunk.accounts}
+        limit = self._limits[chunk.server]
+        async with limit:
+            details = await client.player.personal_data(
+                server, list(accounts), fields=DAILY_FIELDS.personal_data
+            )
+        # 不存在或隐藏战绩的账号没有船只数据, 不用再查
+        visible = [
+            detail
+            for detail in details
+            if detail and not detail.hidden_profile and detail.statistics is not None
+        ]
+        # 船只接口每次一个账号, 单个账号失败只记这个账号
+        ships = await asyncio.gather(
+            *(self._ships(limit, server, detail.account_id) for detail in visible),
+            return_exceptions=True,
+        )
+        players, outcomes = [], []
+        for detail, ship_stats in zip(visible, ships):
+            pk, attempts = accounts.pop(detail.account_id)
+            if isinstance(ship_stats, Exception):
+                outcomes.append(Outcome(pk, FAILED, attempts + 1, _error(ship_stats)))
+            elif ship_stats[0]:
+                players.append((pk, attempts, detail, ship_stats[0]))
+            else:
+                outcomes.append(Outcome(pk, SKIPPED, attempts + 1))
+        outcomes.extend(Outcome(pk, SKIPPED, attempts + 1) for pk, attempts in accounts.values())
+        return Fetched(players, outcomes)
+
+    async def _ships(self, limit: asyncio.Semaphore, server, account_id: int):
+        async with limit:
+            return await self.client.warships.statistics(
+                server, account_id, fields=DAILY_FIELDS.statistics
+            )
+
+    async def _close_after(self, fetchers: list[asyncio.Task], out: asyncio.Queue) -> None:
+        await asyncio.gather(*fetchers)
+        await out.put(_DONE)
+
+    async def _decode(self, queue: asyncio.Queue, out: asyncio.Queue) -> None:
+        """
+        组装成 User (过滤图鉴外的船, 计算 PR), 与指令查询时的处理一致
+        """
+        stats = self.stages["decode"]
+        while (fetched := await queue.get()) is not _DONE:
+            start = time.perf_counter()
+            players = []
+            outcomes = fetched.outcomes
+            for pk, attempts, detail, ships in fetched.players:
+                try:
+                    player = Player()
+                    player.init_user(detail, ships, -1, None, "")
+                    await player.async_init(ships, self._expected)
+                    players.append((pk, attempts, player))
+                except Exception as e:
+                    stats.failed += 1
+                    outcomes.append(Outcome(pk, FAILED, attempts + 1, _error(e)))
+                    logger.warning(f"daily decode failed, account {detail.account_id}: {e!r}")
+            stats.record(start, len(players))
+            await self._put(out, (players, outcomes), stats)
+        await out.put(_DONE)
+
+    async def _rows(self, queue: asyncio.Queue, out: asyncio.Queue) -> None:
+        """
+        生成整个船队的记录, 再按数据库中的最新状态只保留场次有变化的船
+        """
+        stats = self.stages["rows"]
+        while (item := await queue.get()) is not _DONE:
+            players, outcomes = item
+            start = time.perf_counter()
+            values, heartbeats = [], []
+            for pk, attempts, player in players:
+                values.extend(PlayerDailyStatistic.snapshot_values(player, pk, self.date))
+                heartbeats.append(PlayerDailyHeartbeat.heartbeat_values(player, pk, self.date))
+            try:
+                rows = await PlayerDailyStatistic.changed_values(values, self.date)
+            except Exception as e:
+                stats.failed += len(players)
+                logger.warning(f"daily delta query failed, {len(players)} accounts: {e!r}")
+                error = _error(e)
+                outcomes.extend(
+                    Outcome(pk, FAILED, attempts + 1, error) for pk, attempts, _ in players
+                )
+                await self._put(out, ([], [], outcomes), stats)
+                continue
+            outcomes.extend(Outcome(pk, DONE, attempts + 1) for pk, attempts, _ in players)
+            self.unchanged += len(values) - len(rows)
+            stats.record(start, len(rows))
+            await self._put(out, (rows, heartbeats, outcomes), stats)
+        await out.put(_DONE)
+
+    async def _write(self, queue: asyncio.Queue) -> None:
+        rows, heartbeats, outcomes = [], [], []
+        while (item := await queue.get()) is not _DONE:
+            rows.extend(item[0])
+            heartbeats.extend(item[1])
+            outcomes.extend(item[2])
+            # 大部分账号没有变化, 记录很少时按心跳数分批
+            if max(len(rows), len(heartbeats)) >= self.config.write_batch:
+                await self._flush(rows, heartbeats, outcomes)
+                rows, heartbeats, outcomes = [], [], []
+        if rows or outcomes:
+            await self._flush(rows, heartbeats, outcomes)
+
+    async def _flush(self, rows: list, heartbeats: list, outcomes: list[Outcome]) -> None:
+        """
+        快照、心跳和账号结果在同一个事务里写入, 中途失败时都不生效, 账号下次重试
+        """
+        stats = self.stages["write"]
+        start = time.perf_counter()
+        try:
+            async with in_transaction() as connection:
+                self.ingest = await write_snapshots(rows, connection)
+                await write_heartbeats(heartbeats, connection)
+                await self._mark(outcomes, connection)
+        except Exception as e:
+            stats.failed += len(rows)
+            logger.error(f"daily write failed, {len(rows)} rows: {e!r}")
+            error = _error(e)
+            failed = [
+                Outcome(o.pk, FAILED, o.attempts, error) if o.status == DONE else o
+                for o in outcomes
+            ]
+            try:
+                await self._mark(failed)
+            except Exception as e:
+                # 账号结果也没写进去, 下次运行会当作没处理过
+                logger.error(f"daily progress write failed: {e!r}")
+            return
+        stats.record(start, len(rows))
+
+    async def _mark(self, outcomes: list[Outcome], connection=None) -> None:
+        if not outcomes:
+            return
+        run_id = self._run.id
+        await DailyRunAccount.bulk_create(
+            [
+                DailyRunAccount(
+                    run_id=run_id,
+                    account_id=o.pk,
+                    status=o.status,
+                    attempts=o.attempts,
+                    error=o.error,
+                )
+                for o in outcomes
+            ],
+            on_conflict=("run_id", "account_id"),
+            update_fields=("status", "attempts", "error"),
+            using_db=connection,
+        )
+
+
+def log_stats(result: dict) -> None:
+    for name, stats in result.items():
+        logger.info(f"daily pipeline {name}: {stats}")
@@ -1,22 +1,29 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor
 from functools import wraps
+from typing import Union
 
-def async_run_in_executor(executor=None):
+from .executors import executor_registry
+
+
+async def _run(executor: Union[str, Executor], func, *args, **kwargs):
+    # 提交的是 lambda, 无法 pickle, 只能用于线程池
+    if isinstance(executor, str):
+        return await executor_registry.run(executor, func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, lambda: func(*args, **kwargs))
+
+
+def async_run_in_executor(executor: Union[str, Executor] = "cpu"):
     """
-    装饰器：将异步函数放入指定的 Executor（线程池或进程池）中运行。
-    默认使用 ThreadPoolExecutor。
+    装饰器：将异步函数放入指定的线程池中运行。
+    executor 可以是注册表中的池名称, 也可以是 ThreadPoolExecutor 实例, 默认使用共享的 cpu 池。
+    注意: 每次调用都会在工作线程里新建事件循环, 纯同步的重活请用 sync_run_in_executor。
     """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            loop = asyncio.get_running_loop()
-            # 如果没有传递 executor，则使用默认的线程池
-            exec_ = executor or ThreadPoolExecutor()
-
-            # 异步函数通过 run() 执行
-            result = await loop.run_in_executor(exec_, _run_async_function, func, *args, **kwargs)
-            return result
+            return await _run(executor, _run_async_function, func, *args, **kwargs)
 
         return wrapper
     return decorator
@@ -27,21 +34,15 @@ def _run_async_function(func, *args, **kwargs):
     """
     return asyncio.run(func(*args, **kwargs))
 
-def sync_run_in_executor(executor=None):
+def sync_run_in_executor(executor: Union[str, Executor] = "cpu"):
     """
-    装饰器：将步步函数放入指定的 Executor（线程池或进程池）中运行。
-    默认使用 ThreadPoolExecutor。
+    装饰器：将同步函数放入指定的线程池中运行。
+    executor 可以是注册表中的池名称, 也可以是 ThreadPoolExecutor 实例, 默认使用共享的 cpu 池。
     """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            loop = asyncio.get_running_loop()
-            # 如果没有传递 executor，则使用默认的线程池
-            exec_ = executor or ThreadPoolExecutor()
-
-            # 异步函数通过 run() 执行
-            result = await loop.run_in_executor(exec_, func, *args, **kwargs)
-            return result
+            return await _run(executor, func, *args, **kwargs)
 
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
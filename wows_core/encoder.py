@@ -0,0 +1,59 @@
+"""
+图片编码
+
+渲染全程使用同一块 RGB numpy 画布, 最后直接从这块内存编码,
+不再经过 BGR -> RGB 的整图拷贝。编码格式和质量可以通过插件配置调整。
+"""
+
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# 默认与原来的 img.save(format="JPEG") 一致
+_settings = {
+    "format": "JPEG",
+    "quality": 75,
+    "progressive": False,
+    "webp_method": 2,
+}
+
+
+def configure_encoder(**kwargs) -> None:
+    """
+    更新默认编码参数, 需要在启动渲染进程之前调用
+    """
+    for key, value in kwargs.items():
+        if key in _settings and value is not None:
+            _settings[key] = value.upper() if key == "format" else value
+
+
+def encoder_settings() -> dict:
+    return dict(_settings)
+
+
+def encode_image(img: np.ndarray, **kwargs) -> bytes:
+    """
+    把 RGB 画布编码成图片字节, kwargs 可以临时覆盖默认参数
+    """
+    settings = dict(_settings)
+    settings.update({k: v for k, v in kwargs.items() if v is not None})
+    fmt = settings["format"].upper()
+
+    img = np.ascontiguousarray(img)
+    height, width = img.shape[:2]
+    pil_img = Image.frombuffer("RGB", (width, height), img, "raw", "RGB", 0, 1)
+
+    if fmt == "JPEG":
+        params = {
+            "quality": settings["quality"],
+            "progressive": settings["progressive"],
+        }
+    elif fmt == "WEBP":
+        params = {"quality": settings["quality"], "method": settings["webp_method"]}
+    else:
+        params = {}
+
+    bytes_io = BytesIO()
+    pil_img.save(bytes_io, format=fmt, **params)
+    return bytes_io.getvalue()
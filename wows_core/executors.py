@@ -0,0 +1,188 @@
+"""
+执行器注册表
+
+进程内共享的具名执行器 (render / io / cpu)。
+渲染等同步重活统一提交到这里，避免每次调用都新建 ThreadPoolExecutor 和事件循环。
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+DEFAULT_POOL_SIZES = {"render": 4, "io": 8, "cpu": 2}
+
+
+class PoolStats:
+    """
+    单个执行器的排队深度与等待时间统计
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0  # 还没开始就被取消或提交失败的任务数
+        self.queue_depth = 0  # 已提交但还未开始执行的任务数
+        self.max_queue_depth = 0
+        self.total_wait = 0.0  # 排队等待总时长 (秒)
+        self.max_wait = 0.0
+        self.total_run = 0.0  # 执行总时长 (秒)
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self.submitted += 1
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def on_start(self, wait: float) -> None:
+        with self._lock:
+            self.queue_depth -= 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def on_cancel(self) -> None:
+        with self._lock:
+            self.cancelled += 1
+            self.queue_depth -= 1
+
+    def on_done(self, run: float, ok: bool = True) -> None:
+        with self._lock:
+            self.completed += 1
+            self.total_run += run
+            if not ok:
+                self.failed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            started = self.submitted - self.queue_depth - self.cancelled
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_ms": (self.total_wait / started * 1000) if started else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_run_ms": (
+                    (self.total_run / self.completed * 1000) if self.completed else 0.0
+                ),
+            }
+
+
+def _timed_call(stats: PoolStats, enqueued: float, func: Callable, *args, **kwargs):
+    """
+    在工作线程中执行, 顺便记录排队和执行耗时
+    """
+    start = time.perf_counter()
+    stats.on_start(start - enqueued)
+    ok = False
+    try:
+        result = func(*args, **kwargs)
+        ok = True
+        return result
+    finally:
+        stats.on_done(time.perf_counter() - start, ok)
+
+
+class ExecutorRegistry:
+    """
+    具名执行器注册表, 执行器在第一次使用时按配置的大小创建
+    """
+
+    def __init__(self, sizes: Optional[dict] = None) -> None:
+        self._lock = threading.Lock()
+        self._sizes = dict(DEFAULT_POOL_SIZES)
+        if sizes:
+            self._sizes.update(sizes)
+        self._executors: dict[str, Executor] = {}
+        self._stats: dict[str, PoolStats] = {}
+        self._closed = False
+
+    def configure(self, sizes: dict) -> None:
+        """
+        更新各个池的大小, 只对还未创建的池生效
+        """
+        with self._lock:
+            for name, size in sizes.items():
+                if size and size > 0:
+                    self._sizes[name] = size
+
+    def register(self, name: str, executor: Executor) -> None:
+        """
+        注册一个外部创建的线程池, 替换同名的旧执行器;
+        run 提交的调用带着 PoolStats (含线程锁), 无法 pickle 到进程池, 所以只接受 ThreadPoolExecutor
+        """
+        if not isinstance(executor, ThreadPoolExecutor):
+            raise TypeError(
+                f"executor {name!r} must be a ThreadPoolExecutor, got {type(executor).__name__}"
+            )
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"executor registry is shut down, cannot register {name!r}")
+            old = self._executors.get(name, None)
+            self._executors[name] = executor
+            self._stats.setdefault(name, PoolStats())
+        if old is not None and old is not executor:
+            old.shutdown(wait=False, cancel_futures=True)
+
+    def get(self, name: str) -> Executor:
+        """
+        返回具名执行器, 第一次使用时创建; 未配置的名称和 shutdown 之后的调用直接报错, 不会再起新的线程
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"executor registry is shut down, cannot use {name!r}")
+            if (executor := self._executors.get(name, None)) is None:
+                if name not in self._sizes:
+                    raise KeyError(f"unknown executor {name!r}")
+                executor = ThreadPoolExecutor(
+                    max_workers=self._sizes[name],
+                    thread_name_prefix=f"wows-{name}",
+                )
+                self._executors[name] = executor
+                self._stats.setdefault(name, PoolStats())
+            return executor
+
+    def stats(self, name: Optional[str] = None) -> dict:
+        with self._lock:
+            if name is not None:
+                stat = self._stats.get(name, None)
+                return stat.snapshot() if stat else {}
+            return {name: stat.snapshot() for name, stat in self._stats.items()}
+
+    async def run(self, name: str, func: Callable, *args, **kwargs):
+        """
+        在指定的池中执行同步函数并等待结果
+        """
+        executor = self.get(name)
+        stats = self._stats[name]
+        stats.on_submit()
+        call = partial(_timed_call, stats, time.perf_counter(), func, *args, **kwargs)
+        try:
+            future = executor.submit(call)
+        except BaseException:
+            stats.on_cancel()
+            raise
+        # 被 shutdown(cancel_futures=True) 或等待方取消时任务不会执行, 排队数在这里减掉
+        future.add_done_callback(lambda f: f.cancelled() and stats.on_cancel())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._closed = True
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+executor_registry = ExecutorRegistry()
+
+
+def get_executor_registry() -> ExecutorRegistry:
+    return executor_registry
@@ -0,0 +1,102 @@
+"""
+期望值 (wows-numbers expected values) 存储
+
+wows_exp.json 只在启动后第一次使用时解析一次, 得到以 int 船 id 为键的索引
+和给向量化 PR 用的按列数组, 文件里的 time 字段作为版本号。
+update_numbers_data 下载到新数据后直接用下载结果构建新版本, 写盘后整体替换引用,
+正在进行的渲染继续使用自己拿到的那个版本, 不会有请求重新解析 JSON。
+"""
+
+import asyncio
+import json
+import os
+from typing import Optional
+
+import aiofiles
+
+from .executors import executor_registry
+from .pr_engine import ExpectedIndex
+
+EXP_PATH = "wows_core/src/wows_exp.json"
+
+
+class ExpectedValues:
+    """
+    某一个版本的期望值, 构建后不再修改
+    """
+
+    __slots__ = ("version", "ships", "index")
+
+    def __init__(self, data: dict) -> None:
+        self.version = data.get("time", None)
+        ships = {}
+        for ship_id, ship_data in data.get("data", {}).items():
+            # 没有数据的船在 wows-numbers 里是空列表, 按无期望值处理
+            if not ship_data:
+                continue
+            ships[int(ship_id)] = (
+                ship_data.get("average_damage_dealt", 0.1),
+                ship_data.get("average_frags", 0.1),
+                ship_data.get("win_rate", 0.1),
+            )
+        self.ships: dict[int, tuple] = ships
+        self.index = ExpectedIndex(ships)
+
+    def get(self, ship_id: int) -> Optional[tuple]:
+        """
+        返回 (期望伤害, 期望击杀, 期望胜率), 没有期望值时返回 None
+        """
+        return self.ships.get(ship_id, None)
+
+    def __len__(self) -> int:
+        return len(self.ships)
+
+    @classmethod
+    def load(cls, path: str = EXP_PATH) -> "ExpectedValues":
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        return cls(data)
+
+
+class ExpectedStore:
+    """
+    持有当前版本的期望值, 更新时原子替换
+    """
+
+    def __init__(self, path: str = EXP_PATH) -> None:
+        self.path = path
+        self._current: Optional[ExpectedValues] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> ExpectedValues:
+        """
+        取当前版本; 同一次请求里应只取一次并一路传下去, 保证前后使用同一版本
+        """
+        if (current := self._current) is not None:
+            return current
+        async with self._lock:
+            if self._current is None:
+                self._current = await executor_registry.run(
+                    "io", ExpectedValues.load, self.path
+                )
+            return self._current
+
+    async def replace(self, data: dict) -> ExpectedValues:
+        """
+        用新下载的数据替换当前版本, 同时写回文件供下次启动使用
+        """
+        if not data.get("data", None):
+            raise ValueError("期望值数据为空")
+        values = await executor_registry.run("cpu", ExpectedValues, data)
+        tmp_path = f"{self.path}.tmp"
+        async with aiofiles.open(tmp_path, mode="w") as f:
+            await f.write(json.dumps(data, ensure_ascii=False, indent=4))
+        os.replace(tmp_path, self.path)
+        self._current = values
+        return values
+
+
+expected_store = ExpectedStore()
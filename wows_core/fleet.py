@@ -0,0 +1,79 @@
+"""
+按列存放的舰队计数, 用于 PR 计算和两个快照之间的差分
+
+每个 User 只在船表建好后提取一次列, 之后 PR 计算和差分都直接用这些列:
+差分时用 searchsorted 按船 id 对齐当前和过去的舰队, 一次减完所有计数,
+再用掩码去掉没有变化的船, 按最后战斗时间排序, 得到的差分本身也是列, 可以直接算 PR。
+"""
+
+from operator import attrgetter
+
+import numpy as np
+
+# 差分时相减的计数, 也是 User/Ship 相减结果里有意义的字段
+COUNTERS = (
+    "battles",
+    "wins",
+    "damage_dealt",
+    "xp",
+    "frags",
+    "survived_battles",
+    "shots",
+    "hits",
+)
+_get_counters = attrgetter(*COUNTERS)
+
+
+class FleetColumns:
+    """
+    一支舰队的计数列, 行顺序与船只列表一致
+    """
+
+    __slots__ = ("ship_ids", "last_battle_ts", "counters")
+
+    def __init__(
+        self, ship_ids: np.ndarray, last_battle_ts: np.ndarray, counters: np.ndarray
+    ) -> None:
+        self.ship_ids = ship_ids
+        self.last_battle_ts = last_battle_ts
+        self.counters = counters
+
+    @classmethod
+    def from_ships(cls, ships: list) -> "FleetColumns":
+        n = len(ships)
+        ship_ids = np.fromiter((ship.ship_id for ship in ships), np.int64, n)
+        # 数据库快照里的时间戳是 float, 统一用 float64
+        last_battle_ts = np.fromiter(
+            (ship.last_battle_ts for ship in ships), np.float64, n
+        )
+        counters = np.array(list(map(_get_counters, ships)), dtype=np.int64)
+        return cls(ship_ids, last_battle_ts, counters.reshape(n, len(COUNTERS)))
+
+    def __len__(self) -> int:
+        return len(self.ship_ids)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.counters[:, COUNTERS.index(name)]
+
+    def diff(self, past: "FleetColumns") -> tuple:
+        """
+        与过去的快照按船 id 对齐相减, 只保留场次发生变化或新出现的船
+
+        Returns:
+            tuple: (行下标, 差分后的 FleetColumns, 是否在过去的快照里),
+                按最后战斗时间从新到旧排列, 时间相同的保持原来的顺序
+        """
+        delta = self.counters.copy()
+        if len(past):
+            order = np.argsort(past.ship_ids, kind="stable")
+            past_ids = past.ship_ids[order]
+            pos = np.minimum(np.searchsorted(past_ids, self.ship_ids), len(past) - 1)
+            found = past_ids[pos] == self.ship_ids
+            delta[found] -= past.counters[order[pos[found]]]
+        else:
+            found = np.zeros(len(self), dtype=bool)
+
+        rows = np.flatnonzero(~found | (delta[:, 0] != 0))
+        rows = rows[np.lexsort((rows, -self.last_battle_ts[rows]))]
+        changed = FleetColumns(self.ship_ids[rows], self.last_battle_ts[rows], delta[rows])
+        return rows, changed, found[rows]
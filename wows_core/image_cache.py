@@ -0,0 +1,78 @@
+"""
+渲染结果缓存
+
+以实际画到图上的输入 (账号、最后战斗时间、公会、昵称、期望值版本、模板版本等) 的摘要为键,
+缓存编码后的图片字节, 按总字节数做 LRU 淘汰。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+def digest(*parts) -> str:
+    """
+    计算输入的摘要, parts 需要是 repr 稳定的基本类型
+    """
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class RenderedImageCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if (data := self._items.get(key, None)) is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if (old := self._items.pop(key, None)) is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._items:
+            _, data = self._items.popitem(last=False)
+            self._bytes -= len(data)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+image_cache = RenderedImageCache()
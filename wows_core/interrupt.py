@@ -4,18 +4,16 @@
 
 import asyncio
 from nonebot_plugin_waiter import waiter
-from .config import Config
-from nonebot import get_plugin_config
-from aiowpi import WPIClient, WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
+from aiowpi import WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
 from nonebot.internal.matcher import Matcher
 from nonebot.adapters.onebot.v11 import GroupMessageEvent
 from nonebot.adapters import Event
 from .models.account import Account, UserInfo
+from .wg_client import wg_client
+from .wg_fields import CLAN_DETAIL_FIELDS, CLAN_MEMBER_FIELDS, PLAYER_SEARCH_FIELDS
 from tortoise.exceptions import IntegrityError
 from typing import Tuple
 
-plugin_config = get_plugin_config(Config)
-
 Server = [0, 2, 3]
 Server2str = ["亚服", "毛服", "欧服", "美服"]
 Server2url = [WOWS_ASIA, WOWS_RU, WOWS_EU, WOWS_NA]
@@ -24,7 +22,7 @@ Server2url = [WOWS_ASIA, WOWS_RU, WOWS_EU, WOWS_NA]
 async def add_player_waiter(
     matcher: Matcher, keyword: str, tragger_event: GroupMessageEvent
 ) -> None:
-    wpi_client = WPIClient(plugin_config.wows_api.get_application_id(), 10, 1)
+    wpi_client = wg_client
     await matcher.send("开始查找玩家账号")
 
     # 存储玩家信息：昵称, account_id, 服务器
@@ -84,11 +82,16 @@ async def add_player_waiter(
     server = selected_player["server"]
     if account_clan := (
         await wpi_client.clans.account_info(
-            Server2url[server], selected_player["account_id"]
+            Server2url[server],
+            selected_player["account_id"],
+            fields=CLAN_MEMBER_FIELDS,
+            cached=True,
         )
     )[0]:
         if clan_detail := (
-            await wpi_client.clans.details(Server2url[server], account_clan["clan_id"])
+            await wpi_client.clans.details(
+                Server2url[server], account_clan["clan_id"], fields=CLAN_DETAIL_FIELDS, cached=True
+            )
         )[0]:
             clan_tag = clan_detail["tag"]
 
@@ -133,7 +136,9 @@ async def fetch_players(
     wpi_client, server, keyword, player_info, account2server, prams
 ) -> None:
     # 异步查找玩家信息
-    players = await wpi_client.player.serch(Server2url[server], search=keyword, limit=3)
+    players = await wpi_client.player.serch(
+        Server2url[server], search=keyword, fields=PLAYER_SEARCH_FIELDS, limit=3
+    )
     for player in players:
         # 存储玩家信息：昵称、account_id 和 服务器
         player_info.append(
@@ -199,7 +204,7 @@ async def wait_me(matcher: Matcher, sender_id) -> Tuple[bool, int]:
     )
 
 async def wait_account_id(matcher: Matcher, keyword: str, server_list=Server):
-    wpi_client = WPIClient(plugin_config.wows_api.get_application_id(), 10, 1)
+    wpi_client = wg_client
     # 存储玩家信息：昵称, account_id, 服务器
     player_info = []
     account2server = {}
@@ -0,0 +1,129 @@
+"""
+application_id 调度
+
+WG 对每个 application_id 单独限流。每个 id 一个令牌桶 (aiolimiter), 每次请求挑余量最多的 id;
+返回限流错误的 id 暂停使用一段时间 (连续触发时加倍), 总吞吐量随配置的 id 数线性增长。
+"""
+
+import asyncio
+from typing import Iterable
+
+import aiolimiter
+
+# 连续被限流时暂停时长加倍, 最长不超过这个值 (秒)
+MAX_COOLDOWN = 60
+
+
+class KeyState:
+    """
+    单个 application_id 的令牌桶和使用统计
+    """
+
+    def __init__(self, application_id: str, rate: float, period: float) -> None:
+        self.application_id = application_id
+        self.limiter = aiolimiter.AsyncLimiter(rate, period)
+        # 自己记一份与 limiter 相同的漏桶水位, 只用来比较余量, 不读 limiter 的私有字段
+        self.capacity = rate
+        self.rate_per_sec = rate / period
+        self.level = 0.0
+        self.checked = 0.0
+        self.waiting = 0  # 正在这个桶上排队的请求
+        self.requests = 0
+        self.limited = 0  # 收到限流错误的次数
+        self.strikes = 0  # 连续限流次数
+        self.benched_until = 0.0
+
+    def _leak(self) -> None:
+        now = asyncio.get_running_loop().time()
+        self.level = max(self.level - (now - self.checked) * self.rate_per_sec, 0.0)
+        self.checked = now
+
+    def consume(self) -> None:
+        """
+        limiter.acquire 返回后调用, 记下用掉的令牌
+        """
+        self._leak()
+        self.level += 1
+
+    def headroom(self) -> float:
+        """
+        桶里剩余的令牌数, 减去已经在排队的请求
+        """
+        self._leak()
+        return self.capacity - self.level - self.waiting
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "requests": self.requests,
+            "limited": self.limited,
+            "headroom": round(self.headroom(), 2),
+            "benched": round(max(self.benched_until - now, 0.0), 2),
+        }
+
+
+def _mask(application_id: str) -> str:
+    return f"{application_id[:4]}***" if len(application_id) > 4 else "***"
+
+
+class KeyPool:
+    """
+    application_id 池, acquire 返回本次请求使用的 id
+    """
+
+    def __init__(
+        self, application_ids: Iterable[str], rate: float, period: float = 1, cooldown: float = 1
+    ) -> None:
+        self.keys = [KeyState(key, rate, period) for key in dict.fromkeys(application_ids)]
+        if not self.keys:
+            raise ValueError("至少需要一个 application_id")
+        self._states = {key.application_id: key for key in self.keys}
+        self.cooldown = cooldown
+
+    async def acquire(self) -> str:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            available = [key for key in self.keys if key.benched_until <= now]
+            if not available:
+                # 所有 id 都在暂停中, 等最早恢复的那个
+                await asyncio.sleep(min(key.benched_until for key in self.keys) - now)
+                continue
+            key = max(available, key=KeyState.headroom)
+            key.waiting += 1
+            try:
+                # 有余量时立即返回, 否则在余量最多 (最早有令牌) 的桶上排队
+                await key.limiter.acquire()
+                key.consume()
+            finally:
+                key.waiting -= 1
+            if key.benched_until > loop.time():
+                # 排队期间这个 id 被暂停了, 换一个
+                continue
+            key.requests += 1
+            return key.application_id
+
+    def report_limited(self, application_id: str) -> None:
+        """
+        这个 id 收到了限流错误, 暂停使用
+        """
+        key = self._states[application_id]
+        key.limited += 1
+        now = asyncio.get_running_loop().time()
+        if key.benched_until > now:
+            # 暂停前已经发出的请求陆续返回的限流错误, 不再延长
+            return
+        key.strikes += 1
+        key.benched_until = now + min(self.cooldown * 2 ** (key.strikes - 1), MAX_COOLDOWN)
+
+    def report_ok(self, application_id: str) -> None:
+        self._states[application_id].strikes = 0
+
+    def stats(self) -> dict:
+        """
+        各个 id 的使用情况, 需要在事件循环中调用; id 只显示前几位
+        """
+        now = asyncio.get_running_loop().time()
+        return {
+            f"{index}:{_mask(key.application_id)}": key.snapshot(now)
+            for index, key in enumerate(self.keys)
+        }
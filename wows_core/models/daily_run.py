@@ -0,0 +1,75 @@
+from tortoise import fields, timezone
+from tortoise.functions import Count
+from tortoise.models import Model
+import datetime
+
+RUNNING = "running"
+PARTIAL = "partial"  # 结束了, 但还有失败的账号
+FINISHED = "finished"
+
+DONE = "done"  # 已写入当天的快照
+SKIPPED = "skipped"  # 账号不存在、隐藏战绩或没有船只数据, 不需要写入
+FAILED = "failed"  # 抓取、解码或写库失败, 下次运行重试
+
+
+class DailyRun(Model):
+    """
+    每天一条的快照任务进度, 重试或进程重启后从这里继续
+    """
+
+    id: int = fields.IntField(pk=True)
+    date = fields.DateField(unique=True)
+    status: str = fields.CharField(16, default=RUNNING)
+    attempts: int = fields.IntField(default=0)  # 运行过几次
+    done: int = fields.IntField(default=0)
+    skipped: int = fields.IntField(default=0)
+    failed: int = fields.IntField(default=0)
+    started_at = fields.DatetimeField(auto_now_add=True)
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "daily_runs"
+
+    @staticmethod
+    async def start(date: datetime.date) -> "DailyRun":
+        run, _ = await DailyRun.get_or_create(date=date)
+        run.status = RUNNING
+        run.attempts += 1
+        await run.save(update_fields=["status", "attempts"])
+        return run
+
+    async def finish(self) -> None:
+        """
+        按各账号的最终状态汇总计数
+        """
+        counts = dict(
+            await DailyRunAccount.filter(run_id=self.id)
+            .annotate(count=Count("id"))
+            .group_by("status")
+            .values_list("status", "count")
+        )
+        self.done = counts.get(DONE, 0)
+        self.skipped = counts.get(SKIPPED, 0)
+        self.failed = counts.get(FAILED, 0)
+        self.status = PARTIAL if self.failed else FINISHED
+        self.finished_at = timezone.now()
+        await self.save()
+
+
+class DailyRunAccount(Model):
+    """
+    单个账号在某次快照任务中的结果, done 和 skipped 的账号重试时不再处理
+    """
+
+    id: int = fields.IntField(pk=True)
+    run: fields.ForeignKeyRelation[DailyRun] = fields.ForeignKeyField(
+        "models.DailyRun", related_name="accounts", on_delete=fields.CASCADE
+    )
+    account = fields.ForeignKeyField("models.Account", on_delete=fields.CASCADE)
+    status: str = fields.CharField(8)
+    attempts: int = fields.IntField(default=1)
+    error: str = fields.CharField(200, null=True)
+
+    class Meta:
+        table = "daily_run_accounts"
+        unique_together = (("run", "account"),)
@@ -1,13 +1,77 @@
 from tortoise import fields
 from tortoise.models import Model
 from .account import Account
-from ..wows_models import User, Ship
+from ..wows_models import User
+from ..wg_decode import MainBattery, PvpStats, ShipStats
+from ..snapshot_pack import pack, unpack
 from tortoise.functions import Min, Max
 from tortoise.exceptions import DoesNotExist
+from tortoise.backends.base.client import BaseDBAsyncClient
+from typing import Iterable, Optional
 import datetime
 
 
+# 快照表的列, 与 PlayerDailyStatistic.snapshot_values 的顺序一致
+SNAPSHOT_COLUMNS = (
+    "account_id",
+    "ship_id",
+    "date",
+    "battles",
+    "wins",
+    "shots",
+    "hit",
+    "damage",
+    "frags",
+    "survive",
+    "xp",
+    "last_battle_at",
+)
+# 唯一约束, 同一天重复写入时按它合并
+SNAPSHOT_KEY = ("account_id", "ship_id", "date")
+# 心跳表的列, 与 PlayerDailyHeartbeat.heartbeat_values 的顺序一致
+HEARTBEAT_COLUMNS = ("account_id", "date", "ships", "battles")
+HEARTBEAT_KEY = ("account_id", "date")
+
+# 快照存储方式, 对应 .env 中的 DAILY__STORAGE
+ROWS = "rows"  # 每艘船一行 (PlayerDailyStatistic)
+PACKED = "packed"  # 每个账号每天一行打包的完整船队 (PlayerDailySnapshot)
+STORAGES = (ROWS, PACKED)
+_storage = ROWS
+
+
+def _latest_sql(
+    table: str,
+    group: tuple[str, ...],
+    columns: str,
+    account_pks: Iterable[int],
+    date: datetime.date,
+    before: bool,
+) -> str:
+    """
+    按 group 分组, 每组在 date 当天或之前 (before 为 True 时不含当天) 的最新一条记录;
+    主键和日期都是转换过的 int / date, 直接拼进 SQL, SQLite 和 Postgres 通用
+    """
+    ids = ", ".join(str(int(pk)) for pk in account_pks)
+    keys = ", ".join(group)
+    on = " AND ".join(f"s.{column} = latest.{column}" for column in (*group, "date"))
+    return (
+        f"SELECT {columns} FROM {table} s JOIN ("
+        f"SELECT {keys}, MAX(date) AS date FROM {table} "
+        f"WHERE account_id IN ({ids}) AND date {'<' if before else '<='} '{date.isoformat()}' "
+        f"GROUP BY {keys}"
+        f") latest ON {on}"
+    )
+
+
 class PlayerDailyStatistic(Model):
+    """
+    每日快照只保存场次有变化的船 (以及第一次出现的船), 某天的完整船队是每艘船在那天或之前的最新一条记录;
+    每个写过快照的账号每天另有一条 PlayerDailyHeartbeat
+
+    packed 存储方式下船只数据改存在 PlayerDailySnapshot, changed_values / fleet / get_player_from_db
+    按 configure_storage 设置的方式读写, 调用方不用区分
+    """
+
     account: fields.ForeignKeyRelation[Account] = fields.ForeignKeyField(
         "models.Account", related_name="daily_statistics", on_delete=fields.CASCADE
     )  # Reference to Account
@@ -30,38 +94,126 @@ class PlayerDailyStatistic(Model):
         )  # Composite key for account, ship, and date
 
     @staticmethod
-    async def create_from_player(player: User, curr_date=None, account=None):
-        account_id = player.account_id
-        curr_date = curr_date if curr_date else datetime.date.today()
-        ship_list: list[Ship] = player.ship_list
-        account = (
-            account
-            if account
-            else (await Account.filter(account_id=account_id).first())
+    def rows_from_player(player: User, account_pk: int, curr_date: datetime.date):
+        """
+        按已知的 Account 主键生成记录, 不查数据库
+        """
+        return [
+            PlayerDailyStatistic(**dict(zip(SNAPSHOT_COLUMNS, values)))
+            for values in PlayerDailyStatistic.snapshot_values(player, account_pk, curr_date)
+        ]
+
+    @staticmethod
+    def snapshot_values(player: User, account_pk: int, curr_date: datetime.date):
+        """
+        与 rows_from_player 相同, 但每条记录是按 SNAPSHOT_COLUMNS 排列的元组, 不建模型实例 (每日快照批量写入使用)
+        """
+        return [
+            (
+                account_pk,
+                ship.ship_id,
+                curr_date,
+                ship.battles,
+                ship.wins,
+                ship.shots,
+                ship.hits,
+                ship.damage_dealt,
+                ship.frags,
+                ship.survived_battles,
+                ship.xp,
+                ship.last_battle_time_raw,
+            )
+            for ship in player.ship_list
+        ]
+
+    @staticmethod
+    def configure_storage(storage: str) -> None:
+        global _storage
+        if storage not in STORAGES:
+            raise ValueError(f"unknown snapshot storage {storage!r}, expected one of {STORAGES}")
+        _storage = storage
+
+    @staticmethod
+    def storage() -> str:
+        return _storage
+
+    @staticmethod
+    async def changed_values(
+        values: list[tuple], date: datetime.date, connection: Optional[BaseDBAsyncClient] = None
+    ) -> list[tuple]:
+        """
+        从 snapshot_values 的结果中筛出场次与 date 之前最新记录不同的船 (包括第一次出现的船);
+        packed 存储方式下按账号筛选, 见 PlayerDailySnapshot.changed_values
+        """
+        if _storage == PACKED:
+            return await PlayerDailySnapshot.changed_values(values, date, connection)
+        if not values:
+            return values
+        sql = _latest_sql(
+            PlayerDailyStatistic._meta.db_table,
+            ("account_id", "ship_id"),
+            "s.account_id, s.ship_id, s.battles",
+            {row[0] for row in values},
+            date,
+            before=True,
+        )
+        connection = connection or PlayerDailyStatistic._meta.db
+        latest = {
+            (row["account_id"], row["ship_id"]): row["battles"]
+            for row in await connection.execute_query_dict(sql)
+        }
+        return [row for row in values if latest.get((row[0], row[1])) != row[3]]
+
+    @staticmethod
+    async def latest_rows(account_pk: int, date: datetime.date) -> list["PlayerDailyStatistic"]:
+        """
+        账号在 date 当天的完整船队: 每艘船在那天或之前的最新一条记录
+        """
+        sql = _latest_sql(
+            PlayerDailyStatistic._meta.db_table,
+            ("account_id", "ship_id"),
+            "s.*",
+            (account_pk,),
+            date,
+            before=False,
         )
-        statistic_list = [
-            PlayerDailyStatistic(
-                account_id=account.id,
-                ship_id=ship.ship_id,
-                date=curr_date,
-                battles=ship.battles,
-                wins=ship.wins,
-                shots=ship.shots,
-                hit=ship.hits,
-                damage=ship.damage_dealt,
-                frags=ship.frags,
-                survive=ship.survived_battles,
-                xp=ship.xp,
-                last_battle_at=ship.last_battle_time_raw,
+        return await PlayerDailyStatistic.raw(sql)
+
+    @staticmethod
+    async def fleet(account_pk: int, date: datetime.date) -> list[tuple]:
+        """
+        账号在 date 当天的完整船队, 每艘船一个按 PACK_COLUMNS 排列的元组 (last_battle_at 为时间戳)
+        """
+        if _storage == PACKED:
+            return await PlayerDailySnapshot.fleet(account_pk, date)
+        return [
+            (
+                ship.ship_id,
+                ship.battles,
+                ship.wins,
+                ship.shots,
+                ship.hit,
+                ship.damage,
+                ship.frags,
+                ship.survive,
+                ship.xp,
+                ship.last_battle_at.timestamp(),
             )
-            for ship in ship_list
+            for ship in await PlayerDailyStatistic.latest_rows(account_pk, date)
         ]
-        return statistic_list
 
     @staticmethod
     async def get_recent_date(account_id: int):
         try:
-            # 查找给定 account_id 的所有记录，按 date 降序排序（最接近的在前面）
+            # 最近一次写入快照的日期, 即使当天没有场次变化也有心跳
+            heartbeat = (
+                await PlayerDailyHeartbeat.filter(account_id=account_id)
+                .order_by("-date")
+                .first()
+            )
+            if heartbeat:
+                return heartbeat.date
+            # 还没有迁移 (没有心跳) 的旧数据, 查找快照记录中最近的日期
             recent_statistic = (
                 await PlayerDailyStatistic.filter(account_id=account_id)
                 .order_by("-date")
@@ -82,7 +234,7 @@ class PlayerDailyStatistic(Model):
             date = date if date else await PlayerDailyStatistic.get_recent_date(account.id)
             if not date:
                 return
-            ship_stats = await PlayerDailyStatistic.filter(account_id=account.id, date=date)
+            ship_stats = await PlayerDailyStatistic.fleet(account.id, date)
             user = User()
             user.date = date
             ship_list = []
@@ -94,17 +246,18 @@ class PlayerDailyStatistic(Model):
             user.damage_dealt = 0
             user.hits = 0
             user.survived_battles = 0
-            for ship in ship_stats:
-                ship_id = ship.ship_id
-                battles = ship.battles
-                frags = ship.frags
-                xp = ship.xp
-                damage = ship.damage
-                wins = ship.wins
-                survived = ship.survive
-                shots = ship.shots
-                hits = ship.hit
-                last_battle_time = ship.last_battle_at
+            for (
+                ship_id,
+                battles,
+                wins,
+                shots,
+                hits,
+                damage,
+                frags,
+                survived,
+                xp,
+                last_battle_time,
+            ) in ship_stats:
 
                 user.battles += battles
                 user.xp += xp
@@ -116,21 +269,124 @@ class PlayerDailyStatistic(Model):
                 user.survived_battles += survived
 
                 ship_list.append(
-                    {
-                        "pvp": {
-                            "battles": battles,
-                            "frags": frags,
-                            "damage_dealt": damage,
-                            "wins": wins,
-                            "xp": xp,
-                            "survived_battles": survived,
-                            "main_battery": {"shots": shots, "hits": hits},
-                        },
-                        "ship_id": ship_id,
-                        "last_battle_time": last_battle_time.timestamp(),
-                    }
+                    ShipStats(
+                        ship_id=ship_id,
+                        last_battle_time=last_battle_time,
+                        pvp=PvpStats(
+                            battles=battles,
+                            frags=frags,
+                            damage_dealt=damage,
+                            wins=wins,
+                            xp=xp,
+                            survived_battles=survived,
+                            main_battery=MainBattery(shots=shots, hits=hits),
+                        ),
+                    )
                 )
 
-            user.update_displays()
             await user.async_init(ship_list)
             return user
+
+
+class PlayerDailyHeartbeat(Model):
+    """
+    账号某天写入快照时的心跳, 记录当天完整船队的船只数和总场次; 没有场次变化的账号只写这一条
+    """
+
+    id: int = fields.IntField(pk=True)
+    account: fields.ForeignKeyRelation[Account] = fields.ForeignKeyField(
+        "models.Account", related_name="daily_heartbeats", on_delete=fields.CASCADE
+    )
+    date = fields.DateField()
+    ships: int = fields.IntField()  # 船只数
+    battles: int = fields.IntField()  # 所有船只的场次合计
+
+    class Meta:
+        table = "player_daily_heartbeats"
+        unique_together = (("account", "date"),)
+
+    @staticmethod
+    def heartbeat_values(player: User, account_pk: int, curr_date: datetime.date) -> tuple:
+        """
+        按 HEARTBEAT_COLUMNS 排列的一条记录
+        """
+        return (
+            account_pk,
+            curr_date,
+            len(player.ship_list),
+            sum(ship.battles for ship in player.ship_list),
+        )
+
+
+class PlayerDailySnapshot(Model):
+    """
+    packed 存储方式: 账号某天的完整船队打包成一行 (格式见 snapshot_pack), 只在船只数或总场次变化的那天写入,
+    某天的船队是那天或之前最新的一行
+    """
+
+    id: int = fields.IntField(pk=True)
+    account: fields.ForeignKeyRelation[Account] = fields.ForeignKeyField(
+        "models.Account", related_name="daily_snapshots", on_delete=fields.CASCADE
+    )
+    date = fields.DateField()
+    ships: int = fields.IntField()  # 船只数
+    battles: int = fields.IntField()  # 所有船只的场次合计
+    data: bytes = fields.BinaryField()
+
+    class Meta:
+        table = "player_daily_snapshots"
+        unique_together = (("account", "date"),)
+
+    @staticmethod
+    def from_values(
+        account_pk: int, date: datetime.date, values: list[tuple]
+    ) -> "PlayerDailySnapshot":
+        """
+        values 是同一个账号按 SNAPSHOT_COLUMNS 排列的记录
+        """
+        return PlayerDailySnapshot(
+            account_id=account_pk,
+            date=date,
+            ships=len(values),
+            battles=sum(row[3] for row in values),
+            data=pack([(row[1], *row[3:]) for row in values]),
+        )
+
+    @staticmethod
+    async def changed_values(
+        values: list[tuple], date: datetime.date, connection: Optional[BaseDBAsyncClient] = None
+    ) -> list[tuple]:
+        """
+        保留船只数或总场次与 date 之前最新一行不同的账号的全部记录 (场次只增不减, 总数不变即没有打过)
+        """
+        if not values:
+            return values
+        totals = {}
+        for row in values:
+            ships, battles = totals.get(row[0], (0, 0))
+            totals[row[0]] = (ships + 1, battles + row[3])
+        sql = _latest_sql(
+            PlayerDailySnapshot._meta.db_table,
+            ("account_id",),
+            "s.account_id, s.ships, s.battles",
+            totals,
+            date,
+            before=True,
+        )
+        connection = connection or PlayerDailySnapshot._meta.db
+        latest = {
+            row["account_id"]: (row["ships"], row["battles"])
+            for row in await connection.execute_query_dict(sql)
+        }
+        changed = {pk for pk, total in totals.items() if latest.get(pk) != total}
+        return [row for row in values if row[0] in changed]
+
+    @staticmethod
+    async def fleet(account_pk: int, date: datetime.date) -> list[tuple]:
+        data = (
+            await PlayerDailySnapshot.filter(account_id=account_pk, date__lte=date)
+            .order_by("-date")
+            .first()
+            .values_list("data", flat=True)
+        )
+        return unpack(data) if data else []
@@ -0,0 +1,157 @@
+"""
+向量化 PR 计算
+
+按列 (场次、伤害、击杀、胜场、船 id) 一次性计算整支舰队的 PR。
+结果与原来的逐船计算 (保留在 benchmarks/bench_pr.py 中作对照) 逐位一致:
+四则运算按原公式的顺序逐元素进行, 只有 exp 不用 np.exp (与 math.exp 可能差 1 ulp),
+w1 用按场次预先算好的表, w2 只对极少数低胜率的船回退到 math.exp。
+"""
+
+import math
+import numpy as np
+
+# PR 评价分段: (上限, PR 颜色, 背景颜色, 评价), 颜色为 RGB
+PR_BANDS = (
+    (750, (255, 0, 0), (255, 226, 230), "还需努力"),
+    (1100, (255, 140, 0), (255, 140, 0), "低于平均"),
+    (1350, (255, 255, 102), (255, 219, 153), "平均水平"),
+    (1550, (0, 205, 0), (166, 255, 144), "好"),
+    (1750, (0, 139, 0), (118, 255, 64), "很好"),
+    (2100, (0, 255, 255), (203, 255, 247), "非常好"),
+    (2450, (255, 52, 179), (255, 173, 223), "大佬平均"),
+    (math.inf, (139, 0, 139), (207, 85, 255), "神佬平均"),
+)
+BAND_UPPERS = np.array([band[0] for band in PR_BANDS], dtype=np.float64)
+
+# 场次 >= 56 时 exp(-0.7 * (battles - 3)) 已经小于 2**-53, w1 恰好是 1.0
+_W1_TABLE_SIZE = 64
+_W1_TABLE = np.array(
+    [1 / (1 + math.exp(-0.7 * (battles - 3))) for battles in range(_W1_TABLE_SIZE)]
+)
+# 胜率 (百分比) 大于 2.34 左右时 w2 恰好是 1.0, 留足余量取 3
+_W2_EXACT_ABOVE = 3.0
+
+
+class ExpectedIndex:
+    """
+    按船 id 排序的期望值列, 用二分查找代替逐船的 str(ship_id) 字典查询
+    """
+
+    __slots__ = ("ship_ids", "damage", "frags", "winrate")
+
+    def __init__(self, ships: dict) -> None:
+        """
+        ships: {船 id: (期望伤害, 期望击杀, 期望胜率)}
+        """
+        rows = sorted((ship_id, *values) for ship_id, values in ships.items())
+        self.ship_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.damage = np.array([row[1] for row in rows], dtype=np.float64)
+        self.frags = np.array([row[2] for row in rows], dtype=np.float64)
+        self.winrate = np.array([row[3] for row in rows], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.ship_ids)
+
+    def lookup(self, ship_ids: np.ndarray) -> tuple:
+        """
+        返回 (是否有期望值, 期望伤害, 期望击杀, 期望胜率), 没有期望值的位置填 1.0
+        """
+        n = len(ship_ids)
+        if not len(self.ship_ids):
+            return np.zeros(n, dtype=bool), np.ones(n), np.ones(n), np.ones(n)
+        pos = np.searchsorted(self.ship_ids, ship_ids)
+        pos = np.minimum(pos, len(self.ship_ids) - 1)
+        found = self.ship_ids[pos] == ship_ids
+        columns = (self.damage, self.frags, self.winrate)
+        return (found, *(np.where(found, column[pos], 1.0) for column in columns))
+
+
+def _w1(battles: np.ndarray) -> np.ndarray:
+    w1 = np.ones(len(battles))
+    in_table = (battles >= 0) & (battles < _W1_TABLE_SIZE)
+    w1[in_table] = _W1_TABLE[battles[in_table]]
+    # 负场次只会出现在异常数据里, 保持与原公式一致
+    for i in np.flatnonzero(battles < 0):
+        w1[i] = 1 / (1 + math.exp(-0.7 * (int(battles[i]) - 3)))
+    return w1
+
+
+def _w2(winrate: np.ndarray) -> np.ndarray:
+    w2 = np.ones(len(winrate))
+    for i in np.flatnonzero(~(winrate > _W2_EXACT_ABOVE)):
+        w2[i] = 1 / (1 + math.exp(-20 * (float(winrate[i]) - 0.50)))
+    return w2
+
+
+def ship_pr(
+    battles: np.ndarray,
+    damage_dealt: np.ndarray,
+    frags: np.ndarray,
+    wins: np.ndarray,
+    ship_ids: np.ndarray,
+    index: ExpectedIndex,
+) -> np.ndarray:
+    """
+    逐船 PR, 没有期望值的船为 -1; 场次需要大于 0
+    """
+    battles = np.asarray(battles, dtype=np.int64)
+    found, exp_damage, exp_frags, exp_winrate = index.lookup(
+        np.asarray(ship_ids, dtype=np.int64)
+    )
+
+    damage = np.asarray(damage_dealt, dtype=np.int64) / battles
+    frags = np.asarray(frags, dtype=np.int64) / battles
+    winrate = np.abs((np.asarray(wins, dtype=np.int64) / battles) * 100)
+
+    r_dmg = damage / exp_damage
+    r_frags = frags / exp_frags
+    r_winrate = winrate / exp_winrate
+
+    w1 = _w1(battles)
+    w2 = _w2(winrate)
+    w_wins = (1000 * w1) - ((1000 * w1 * 0.35) * w2)
+    w_dmg = (1000 * (1 - w1)) + ((1000 * w1 * 0.35) * w2)
+    w_frags = 150
+
+    n_dmg = np.maximum((r_dmg - 0.4) / (1 - 0.4), 0)
+    n_frags = np.maximum((r_frags - 0.1) / (1 - 0.1), 0)
+    n_wins = np.maximum((r_winrate - 0.7) / (1 - 0.7), 0)
+
+    pr = np.rint((w_dmg * n_dmg) + (w_frags * n_frags) + (w_wins * n_wins))
+    return np.where(found, pr, -1).astype(np.int64)
+
+
+def pr_bands(pr: np.ndarray) -> np.ndarray:
+    """
+    PR 所在的 PR_BANDS 下标
+    """
+    return np.searchsorted(BAND_UPPERS, pr, side="left")
+
+
+def account_pr(pr: np.ndarray, battles: np.ndarray) -> int:
+    """
+    按场次加权的账号 PR
+    """
+    pr = np.asarray(pr, dtype=np.int64)
+    battles = np.asarray(battles, dtype=np.int64)
+    total_battles = int(battles.sum())
+    total_pr = int((pr * battles).sum())
+    return round(total_pr / total_battles) if total_battles > 0 else 0
+
+
+def fleet_pr(
+    battles,
+    damage_dealt,
+    frags,
+    wins,
+    ship_ids,
+    index: ExpectedIndex,
+) -> tuple:
+    """
+    一次计算整支舰队的 PR
+
+    Returns:
+        tuple: (逐船 PR, 逐船分段下标, 账号 PR)
+    """
+    pr = ship_pr(battles, damage_dealt, frags, wins, ship_ids, index)
+    return pr, pr_bands(pr), account_pr(pr, battles)
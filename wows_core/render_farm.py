@@ -0,0 +1,271 @@
+"""
+多进程渲染
+
+可选的进程池渲染后端。模板图片在主进程里放进 multiprocessing.shared_memory，
+工作进程按名字挂载后直接当作 numpy 数组使用 (零拷贝)，
+每次渲染只传一个由数字、字符串和颜色组成的精简渲染描述, 而不是整个 User 对象。
+工作进程用 spawn 启动, 不继承主进程中事件循环、线程池持有的锁;
+工作进程里没有初始化 nonebot, 导入 wows_core 时只加载渲染用到的模块 (见 wows_core/__init__)。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+from PIL import ImageFont
+
+from .wows_models import wows_user, wows_recent, wows_rank, wows_ship
+from .wows_models import RECENT_ROWS, RANK_ROWS
+from .templates import TemplateSet
+from .encoder import configure_encoder, encoder_settings
+
+FONT_PATH = "wows_core/src/font/SourceHanSans-Heavy.otf"
+FONT_SIZES = (40, 48, 32)  # 与 get_image_and_font 的顺序一致
+
+RENDERERS = {
+    "user": wows_user,
+    "recent": wows_recent,
+    "rank": wows_rank,
+    "ship": wows_ship,
+}
+# 各个版式最多绘制的船只行数, 与渲染函数里的截断保持一致
+ROW_LIMITS = {"user": 0, "recent": RECENT_ROWS, "rank": RANK_ROWS, "ship": 0}
+
+_USER_FIELDS = (
+    "account_id",
+    "clan_tag",
+    "nick_name",
+    "created_at",
+    "last_battle_time",
+    "date",
+    "season_id",
+    "battles",
+    "frags",
+    "display_battles",
+    "display_winrate",
+    "display_damage",
+    "display_xp",
+    "display_kd",
+    "display_accu_rate",
+    "max_damage_dealt",
+    "max_damage_scouting",
+    "max_frags",
+    "max_planes_killed",
+    "max_total_agro",
+    "max_xp",
+    "max_ships_spotted",
+)
+_SHIP_FIELDS = (
+    "ship_id",
+    "ship_name",
+    "battles",
+    "frags",
+    "display_battles",
+    "display_winrate",
+    "display_damage",
+    "display_xp",
+    "display_kd",
+    "display_accu_rate",
+    "max_damage_dealt",
+    "max_damage_scouting",
+    "max_frags",
+    "max_planes_killed",
+    "max_total_agro",
+    "max_xp",
+    "max_ships_spotted",
+)
+_PR_FIELDS = ("pr_text", "pr_number", "pr_color", "color_background", "color_text")
+
+
+def _pick(obj, names) -> tuple:
+    return tuple(getattr(obj, name, None) for name in names)
+
+
+def _pr_spec(pr) -> Optional[tuple]:
+    return _pick(pr, _PR_FIELDS) if pr is not None else None
+
+
+def _ship_spec(ship) -> tuple:
+    return _pick(ship, _SHIP_FIELDS), _pr_spec(ship.pr)
+
+
+def build_render_spec(
+    kind: str,
+    user,
+    ship_id: Optional[str] = None,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> dict:
+    """
+    把 User 压缩成渲染需要的最小描述, 只包含会被画出来的字段
+
+    表格只保留 [start, stop) 这些行, 前面用 None 占位, 渲染函数按原下标切片即可
+    """
+    stop = ROW_LIMITS[kind] if stop is None else stop
+    spec = {
+        "user": _pick(user, _USER_FIELDS),
+        "pr": _pr_spec(user.pr),
+        "start": start,
+        "ships": [],
+        "recent": [],
+        "ship_dic": {},
+    }
+    if stop and user.ship_list:
+        spec["ships"] = [_ship_spec(ship) for ship in user.ship_list[start:stop]]
+    if stop and user.recent_battles:
+        spec["recent"] = [_ship_spec(ship) for ship in user.recent_battles[start:stop]]
+    if ship_id is not None and user.ship_dic and ship_id in user.ship_dic:
+        spec["ship_dic"] = {ship_id: _ship_spec(user.ship_dic[ship_id])}
+    return spec
+
+
+def _view(values: tuple, names: tuple, pr: Optional[tuple]) -> SimpleNamespace:
+    view = SimpleNamespace(**dict(zip(names, values)))
+    view.pr = SimpleNamespace(**dict(zip(_PR_FIELDS, pr))) if pr else None
+    return view
+
+
+def spec_to_user(spec: dict) -> SimpleNamespace:
+    """
+    在工作进程中把渲染描述还原成与 User 鸭子类型兼容的对象
+    """
+    user = _view(spec["user"], _USER_FIELDS, spec["pr"])
+    padding = [None] * spec["start"]
+    user.ship_list = padding + [_view(v, _SHIP_FIELDS, pr) for v, pr in spec["ships"]]
+    user.recent_battles = padding + [
+        _view(v, _SHIP_FIELDS, pr) for v, pr in spec["recent"]
+    ]
+    user.ship_dic = {
+        sid: _view(v, _SHIP_FIELDS, pr) for sid, (v, pr) in spec["ship_dic"].items()
+    }
+    return user
+
+
+# 工作进程内的状态: 挂载的共享内存、模板视图和字体
+_worker_state = {}
+
+
+def _worker_init(layouts: list, font_path: str, encoder: dict) -> None:
+    configure_encoder(**encoder)
+    shms = []
+    images = []
+    for name, shape, dtype in layouts:
+        shm = shared_memory.SharedMemory(name=name)
+        img = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        img.flags.writeable = False
+        shms.append(shm)
+        images.append(img)
+    _worker_state["shms"] = shms
+    images = TemplateSet(images)
+    images.warm()
+    _worker_state["images"] = images
+    _worker_state["fonts"] = [ImageFont.truetype(font_path, size) for size in FONT_SIZES]
+
+
+def _worker_render(kind: str, spec: dict, args: tuple, kwargs: dict) -> tuple:
+    start = time.perf_counter()
+    user = spec_to_user(spec)
+    images = _worker_state["images"]
+    fonts = _worker_state["fonts"]
+    if kind == "ship":
+        data = RENDERERS[kind](user, args[0], images, fonts)
+    else:
+        data = RENDERERS[kind](user, images, fonts, *args, **kwargs)
+    return data, os.getpid(), time.perf_counter() - start
+
+
+class WorkerStats:
+    def __init__(self) -> None:
+        self.renders = 0
+        self.busy = 0.0
+        self.bytes = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "renders": self.renders,
+            "busy_ms": self.busy * 1000,
+            "bytes": self.bytes,
+            "renders_per_sec": (self.renders / self.busy) if self.busy else 0.0,
+        }
+
+
+class RenderFarm:
+    """
+    进程池渲染后端
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._shms: list[shared_memory.SharedMemory] = []
+        self._lock = threading.Lock()
+        self._workers: dict[int, WorkerStats] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self, images: list, processes: int, font_path: str = FONT_PATH) -> None:
+        """
+        把模板放进共享内存并启动工作进程, 需要在加载完模板后调用
+        """
+        if self.running:
+            return
+        layouts = []
+        for img in images:
+            shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+            np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[:] = img
+            self._shms.append(shm)
+            layouts.append((shm.name, img.shape, img.dtype.str))
+        # 主进程此时已有事件循环和线程池在运行, fork 可能把其他线程持有的锁带进子进程,
+        # 所以用 spawn; 编码参数也不能靠继承, 一起传给子进程
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(layouts, font_path, encoder_settings()),
+        )
+
+    async def render(self, kind: str, user, *args, **kwargs) -> bytes:
+        """
+        与线程池版本相同的调用方式, 返回编码后的图片字节
+        """
+        spec = build_render_spec(
+            kind,
+            user,
+            args[0] if kind == "ship" else None,
+            kwargs.get("start", 0),
+            kwargs.get("stop", None),
+        )
+        loop = asyncio.get_running_loop()
+        data, pid, elapsed = await loop.run_in_executor(
+            self._executor, _worker_render, kind, spec, args, kwargs
+        )
+        with self._lock:
+            stat = self._workers.setdefault(pid, WorkerStats())
+            stat.renders += 1
+            stat.busy += elapsed
+            stat.bytes += len(data)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {pid: stat.snapshot() for pid, stat in self._workers.items()}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms.clear()
+
+
+render_farm = RenderFarm()
@@ -0,0 +1,134 @@
+"""
+WG API 响应缓存
+
+有上限的 LRU 缓存, 每个接口单独配置有效期:
+新鲜期内直接返回; 过期但还在 stale 窗口内时先返回旧值, 同时在后台刷新 (stale-while-revalidate);
+空结果 (账号不存在、隐藏战绩) 按单独的有效期缓存, 避免反复请求。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, NamedTuple, Optional
+
+from nonebot import logger
+
+
+def is_empty(data) -> bool:
+    """
+    默认的空结果判断: {id: 数据} 中所有账号都不存在或隐藏了战绩
+    """
+    if not isinstance(data, dict):
+        return False
+    return all(
+        value is None or getattr(value, "hidden_profile", False) for value in data.values()
+    )
+
+
+class CachePolicy(NamedTuple):
+    ttl: float  # 新鲜期 (秒)
+    stale: float = 0  # 过期后还能先返回旧值的时长 (秒)
+    negative_ttl: float = 0  # 空结果的有效期 (秒), 0 表示不缓存空结果
+    negative: Callable[[object], bool] = is_empty
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float) -> None:
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.negative = 0
+        self.evictions = 0
+        self.refresh_failed = 0
+
+    def configure(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._evict()
+
+    def put(self, key: Hashable, value, policy: CachePolicy) -> None:
+        # max_entries 为 0 时不缓存
+        if self.max_entries <= 0:
+            return
+        now = time.monotonic()
+        if policy.negative(value):
+            if not policy.negative_ttl:
+                self._entries.pop(key, None)
+                return
+            self.negative += 1
+            entry = _Entry(value, now + policy.negative_ttl, now + policy.negative_ttl)
+        else:
+            entry = _Entry(value, now + policy.ttl, now + policy.ttl + policy.stale)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, key: Hashable) -> Optional[_Entry]:
+        return self._entries.get(key, None)
+
+    async def get(
+        self, key: Hashable, policy: CachePolicy, fetch: Callable[[], Awaitable]
+    ):
+        """
+        返回缓存的值, 没有或已经完全过期时调用 fetch 并缓存结果
+        """
+        now = time.monotonic()
+        if (entry := self._entries.get(key, None)) is not None:
+            self._entries.move_to_end(key)
+            if now < entry.fresh_until:
+                self.hits += 1
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._revalidate(key, policy, fetch)
+                return entry.value
+            del self._entries[key]
+        self.misses += 1
+        value = await fetch()
+        self.put(key, value, policy)
+        return value
+
+    def _revalidate(self, key: Hashable, policy: CachePolicy, fetch: Callable[[], Awaitable]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self.put(key, await fetch(), policy)
+            except Exception as e:
+                # 刷新失败时保留旧值, 直到 stale 窗口结束
+                self.refresh_failed += 1
+                logger.warning(f"response cache refresh failed: {e!r}")
+            finally:
+                del self._refreshing[key]
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "negative": self.negative,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+            "refresh_failed": self.refresh_failed,
+        }
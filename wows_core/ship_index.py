@@ -0,0 +1,253 @@
+"""
+船只图鉴的紧凑二进制索引
+
+wows_ship_list.json 只作为数据源, 构建时转换成一个可以 mmap 的二进制文件:
+按 id 排序的 int64 船只 id、名字偏移、等级/类型/国家代码和 UTF-8 名字表。
+运行时直接 mmap 这个文件, 数组是文件页上的零拷贝视图, 多个进程共享同一份页缓存,
+名字在第一次用到时才解码并 intern。
+
+头部记录构建时 JSON 的大小和修改时间, 启动时只 stat 一次 JSON 来判断索引是否过期,
+不再读取和哈希整个 JSON; 内容摘要仍然保存在头部, 用来标识图鉴的版本。
+
+本文件不依赖插件包, 可以直接运行来构建索引 (Dockerfile 里就是这样做的):
+    python wows_core/ship_index.py [json 路径] [输出路径]
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+SHIP_LIST_PATH = "wows_core/src/wows_ship_list.json"
+SHIP_INDEX_PATH = "wows_core/src/wows_ship_list.bin"
+
+MAGIC = b"WOWSSHIP"
+FORMAT_VERSION = 2
+# magic, 格式版本, 船只数, 名字表字节数, 代码表字节数, 源 JSON 的摘要, 源 JSON 的大小和修改时间 (ns)
+_HEADER = struct.Struct("<8sIIII16sQq")
+
+FLAG_PREMIUM = 1
+FLAG_SPECIAL = 2
+
+
+class ShipInfo(NamedTuple):
+    ship_id: int
+    name: str
+    tier: int
+    type: str
+    nation: str
+    is_premium: bool
+    is_special: bool
+
+
+def source_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def source_stat(path: str) -> Optional[tuple[int, int]]:
+    """
+    JSON 的 (大小, 修改时间 ns), 文件不存在时为 None
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def encode_index(ships: dict, digest: bytes = b"", source: tuple[int, int] = (0, 0)) -> bytes:
+    """
+    把 {str 船 id: 船只信息} (wows_ship_list.json 的结构) 编码成二进制索引
+    """
+    rows = sorted((int(ship_id), ship) for ship_id, ship in ships.items())
+    types = sorted({ship.get("type") or "" for _, ship in rows})
+    nations = sorted({ship.get("nation") or "" for _, ship in rows})
+    type_codes = {value: code for code, value in enumerate(types)}
+    nation_codes = {value: code for code, value in enumerate(nations)}
+
+    names = [(ship.get("name") or "").encode() for _, ship in rows]
+    offsets = np.zeros(len(rows) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(name) for name in names])
+    columns = [
+        np.array([ship_id for ship_id, _ in rows], dtype="<i8"),
+        offsets,
+        np.array([ship.get("tier") or 0 for _, ship in rows], dtype=np.uint8),
+        np.array([type_codes[ship.get("type") or ""] for _, ship in rows], dtype=np.uint8),
+        np.array(
+            [nation_codes[ship.get("nation") or ""] for _, ship in rows], dtype=np.uint8
+        ),
+        np.array(
+            [
+                (FLAG_PREMIUM if ship.get("is_premium") else 0)
+                | (FLAG_SPECIAL if ship.get("is_special") else 0)
+                for _, ship in rows
+            ],
+            dtype=np.uint8,
+        ),
+    ]
+    name_table = b"".join(names)
+    code_table = json.dumps({"types": types, "nations": nations}, ensure_ascii=False)
+    code_table = code_table.encode()
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        len(rows),
+        len(name_table),
+        len(code_table),
+        digest.ljust(16, b"\0")[:16],
+        *source,
+    )
+    # 头部 56 字节, 紧跟的 int64 id 列保持 8 字节对齐
+    return b"".join([header, *(column.tobytes() for column in columns), name_table, code_table])
+
+
+class ShipIndex:
+    """
+    只读的船只索引, buffer 可以是 mmap 或 bytes
+    """
+
+    def __init__(self, buffer) -> None:
+        magic, version = struct.unpack_from("<8sI", buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("不是可识别的船只索引文件")
+        _, _, count, names_size, codes_size, digest, size, mtime_ns = _HEADER.unpack_from(buffer)
+        self.digest = digest
+        self.source = (size, mtime_ns)
+        self._buffer = buffer
+        offset = _HEADER.size
+
+        def column(dtype, n):
+            nonlocal offset
+            array = np.frombuffer(buffer, dtype=dtype, count=n, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.ship_ids = column("<i8", count)
+        self._name_offsets = column("<u4", count + 1)
+        self.tiers = column(np.uint8, count)
+        self.type_codes = column(np.uint8, count)
+        self.nation_codes = column(np.uint8, count)
+        self.flags = column(np.uint8, count)
+        self._name_table = memoryview(buffer)[offset : offset + names_size]
+        offset += names_size
+        codes = json.loads(bytes(buffer[offset : offset + codes_size]))
+        self.types: list[str] = codes["types"]
+        self.nations: list[str] = codes["nations"]
+        # 热路径按 id 查位置用普通字典, 船只数不到一千, 占用很小
+        self._positions: dict[int, int] = dict(
+            zip(self.ship_ids.tolist(), range(count))
+        )
+        self._names: dict[int, str] = {}
+
+    @classmethod
+    def open(cls, path: str = SHIP_INDEX_PATH) -> "ShipIndex":
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    @classmethod
+    def from_ships(
+        cls, ships: dict, digest: bytes = b"", source: tuple[int, int] = (0, 0)
+    ) -> "ShipIndex":
+        return cls(encode_index(ships, digest, source))
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, ship_id: int) -> bool:
+        return ship_id in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def position(self, ship_id: int) -> Optional[int]:
+        return self._positions.get(ship_id, None)
+
+    def _name_at(self, pos: int) -> str:
+        if (name := self._names.get(pos, None)) is None:
+            start, stop = self._name_offsets[pos], self._name_offsets[pos + 1]
+            name = sys.intern(bytes(self._name_table[start:stop]).decode())
+            self._names[pos] = name
+        return name
+
+    def name(self, ship_id: int) -> Optional[str]:
+        pos = self._positions.get(ship_id, None)
+        return self._name_at(pos) if pos is not None else None
+
+    def tier(self, ship_id: int) -> Optional[int]:
+        pos = self._positions.get(ship_id, None)
+        return int(self.tiers[pos]) if pos is not None else None
+
+    def ship_type(self, ship_id: int) -> Optional[str]:
+        pos = self._positions.get(ship_id, None)
+        return self.types[self.type_codes[pos]] if pos is not None else None
+
+    def get(self, ship_id: int) -> Optional[ShipInfo]:
+        if (pos := self._positions.get(ship_id, None)) is None:
+            return None
+        flags = int(self.flags[pos])
+        return ShipInfo(
+            ship_id,
+            self._name_at(pos),
+            int(self.tiers[pos]),
+            self.types[self.type_codes[pos]],
+            self.nations[self.nation_codes[pos]],
+            bool(flags & FLAG_PREMIUM),
+            bool(flags & FLAG_SPECIAL),
+        )
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _encode_file(json_path: str) -> bytes:
+    with open(json_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        raw = f.read()
+    return encode_index(json.loads(raw), source_digest(raw), (stat.st_size, stat.st_mtime_ns))
+
+
+def build_index(json_path: str = SHIP_LIST_PATH, index_path: str = SHIP_INDEX_PATH) -> bytes:
+    """
+    从 JSON 构建索引并写盘, 返回编码后的内容
+    """
+    data = _encode_file(json_path)
+    write_atomic(index_path, data)
+    return data
+
+
+def load_index(json_path: str = SHIP_LIST_PATH, index_path: str = SHIP_INDEX_PATH) -> ShipIndex:
+    """
+    mmap 打开索引; 索引不存在、格式不对或 JSON 的大小/修改时间与构建时不同时重新构建
+
+    构建好的索引无法写盘 (例如只读文件系统) 时退回到内存中的索引
+    """
+    source = source_stat(json_path)
+    if os.path.exists(index_path):
+        try:
+            index = ShipIndex.open(index_path)
+            if source is None or index.source == source:
+                return index
+        except (ValueError, struct.error):
+            pass
+    try:
+        build_index(json_path, index_path)
+    except OSError:
+        return ShipIndex(_encode_file(json_path))
+    return ShipIndex.open(index_path)
+
+
+if __name__ == "__main__":
+    json_path = sys.argv[1] if len(sys.argv) > 1 else SHIP_LIST_PATH
+    index_path = sys.argv[2] if len(sys.argv) > 2 else SHIP_INDEX_PATH
+    data = build_index(json_path, index_path)
+    print(f"{index_path}: {len(ShipIndex(data))} ships, {len(data)} bytes")
@@ -0,0 +1,148 @@
+"""
+船只图鉴同步
+
+按页拉取 WG 图鉴接口 (并发数有上限), 与当前的 wows_ship_list.json 比较,
+只把新增或变化的船写回 JSON 和二进制索引 (均为先写临时文件再替换), 最后替换内存中的索引。
+拉取一页的 HTTP 层可以注入, 离线时传入返回固定数据的函数即可。
+"""
+
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
+
+from aiowpi import WOWS_ASIA
+
+from .config import get_cache
+from .executors import executor_registry
+from .wg_client import WGClient, wg_client
+from .wg_fields import ENCYCLOPEDIA_FIELDS
+from .ship_index import (
+    SHIP_INDEX_PATH,
+    SHIP_LIST_PATH,
+    ShipIndex,
+    encode_index,
+    source_digest,
+    source_stat,
+    write_atomic,
+)
+
+# 写进 wows_ship_list.json 的字段
+SHIP_FIELDS = ENCYCLOPEDIA_FIELDS
+PAGE_LIMIT = 100
+SYNC_CONCURRENCY = 4
+
+# page_no -> (总页数, {str 船 id: 船只信息})
+PageFetcher = Callable[[int], Awaitable[tuple[int, dict]]]
+
+
+class WGEncyclopedia:
+    """
+    默认的 HTTP 层: 请求 WG 图鉴接口的一页
+    """
+
+    def __init__(
+        self, client: WGClient = wg_client, server: str = WOWS_ASIA, language: str = "zh-cn"
+    ) -> None:
+        self.client = client
+        self.server = server
+        self.language = language
+
+    async def __call__(self, page_no: int) -> tuple[int, dict]:
+        return await self.client.encyclopedia.warships_page(
+            self.server, page_no, fields=SHIP_FIELDS, language=self.language, limit=PAGE_LIMIT
+        )
+
+
+async def fetch_all(fetch_page: PageFetcher, concurrency: int = SYNC_CONCURRENCY) -> dict:
+    """
+    先拉第一页得到总页数, 其余页面最多 concurrency 个同时请求
+    """
+    page_total, first = await fetch_page(1)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page_no: int) -> dict:
+        async with semaphore:
+            _, data = await fetch_page(page_no)
+            return data
+
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(fetch(page)) for page in range(2, page_total + 1)]
+    ships = dict(first)
+    for task in tasks:
+        ships.update(task.result())
+    return ships
+
+
+def diff_entries(current: dict, fetched: dict) -> dict:
+    """
+    返回新增或内容变化的船; 图鉴里已经没有的船保留, 老战绩里还会用到
+    """
+    changed = {}
+    for ship_id, ship in fetched.items():
+        if not ship:
+            continue
+        ship_id = str(ship_id)
+        entry = {field: ship.get(field, None) for field in SHIP_FIELDS}
+        old = current.get(ship_id, None)
+        if old is None or any(old.get(field, None) != entry[field] for field in SHIP_FIELDS):
+            changed[ship_id] = entry
+    return changed
+
+
+class SyncResult:
+    def __init__(self, fetched: int, added: int, updated: int) -> None:
+        self.fetched = fetched
+        self.added = added
+        self.updated = updated
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated)
+
+    def __str__(self) -> str:
+        return f"fetched = {self.fetched}, added = {self.added}, updated = {self.updated}"
+
+
+def apply_entries(
+    fetched: dict,
+    json_path: str = SHIP_LIST_PATH,
+    index_path: str = SHIP_INDEX_PATH,
+) -> tuple[SyncResult, Optional[ShipIndex]]:
+    """
+    把变化的船合并进 JSON 并重建索引; 没有变化时不写盘, 返回的索引为 None
+    """
+    with open(json_path, "rb") as f:
+        current = json.loads(f.read())
+    changed = diff_entries(current, fetched)
+    added = sum(1 for ship_id in changed if ship_id not in current)
+    result = SyncResult(len(fetched), added, len(changed) - added)
+    if not changed:
+        return result, None
+
+    for ship_id, entry in changed.items():
+        current[ship_id] = {**current.get(ship_id, {"RE": False}), **entry}
+    raw = json.dumps(current, ensure_ascii=False, indent=4).encode()
+    # 先写 JSON 再写索引, 中途失败时索引记录的 JSON 大小和修改时间对不上, 下次加载会从 JSON 重建
+    write_atomic(json_path, raw)
+    write_atomic(index_path, encode_index(current, source_digest(raw), source_stat(json_path)))
+    return result, ShipIndex.open(index_path)
+
+
+async def sync_ship_index(
+    fetch_page: PageFetcher,
+    concurrency: int = SYNC_CONCURRENCY,
+    json_path: str = SHIP_LIST_PATH,
+    index_path: str = SHIP_INDEX_PATH,
+    install: bool = True,
+) -> SyncResult:
+    """
+    拉取完整图鉴并增量更新索引, 有变化且 install 为真时替换内存中的索引
+    """
+    fetched = await fetch_all(fetch_page, concurrency)
+    result, index = await executor_registry.run(
+        "io", apply_entries, fetched, json_path, index_path
+    )
+    if index is not None and install:
+        # 正在使用旧索引的请求继续持有旧对象, 之后的请求拿到新索引
+        get_cache()["ship_index"] = index
+    return result
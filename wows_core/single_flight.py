@@ -0,0 +1,45 @@
+"""
+请求合并 (single-flight)
+
+同一个键同时只执行一次: 第一个调用者发起请求, 在它完成前到达的相同调用直接等待同一个结果。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        if (task := self._tasks.get(key, None)) is None:
+            self.executed += 1
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.coalesced += 1
+        # 某个调用者被取消时不影响其他等待同一结果的调用者
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key, None) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # 所有调用者都已取消时, 避免 "exception was never retrieved" 警告
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+        }
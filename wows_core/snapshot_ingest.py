@@ -0,0 +1,130 @@
+"""
+每日快照批量写入
+
+记录是按 SNAPSHOT_COLUMNS 排列的元组 (PlayerDailyStatistic.snapshot_values), 不建 Tortoise 模型实例。
+Postgres (asyncpg 后端) 上用二进制 COPY 写进会话级的临时表, 再用一条
+INSERT ... SELECT ... ON CONFLICT (account_id, ship_id, date) DO UPDATE 合并进快照表;
+其他数据库 (如本地测试用的 SQLite) 退回到分批的 bulk_create upsert。
+两种方式都要在调用方的事务里执行, 重复写入同一天的记录时以最后一次为准。
+每个账号每天的心跳 (PlayerDailyHeartbeat) 一个账号只有一条, 数量少, 直接 bulk_create upsert。
+packed 存储方式下按账号打包成 PlayerDailySnapshot, 同样一个账号一行, 也用 bulk_create upsert。
+"""
+
+from collections import defaultdict
+from typing import Sequence
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from .models.daily_statistic import (
+    HEARTBEAT_COLUMNS,
+    HEARTBEAT_KEY,
+    PACKED,
+    SNAPSHOT_COLUMNS,
+    SNAPSHOT_KEY,
+    PlayerDailyHeartbeat,
+    PlayerDailySnapshot,
+    PlayerDailyStatistic,
+)
+
+COPY = "copy"
+INSERT = "insert"
+
+_STAGE = "daily_snapshot_stage"
+_UPDATE_COLUMNS = tuple(column for column in SNAPSHOT_COLUMNS if column not in SNAPSHOT_KEY)
+
+
+def ingest_method(connection: BaseDBAsyncClient) -> str:
+    """
+    这个连接使用的写入方式: packed 存储方式为 PACKED, 否则 asyncpg 后端为 COPY, 其他为 INSERT
+    """
+    if PlayerDailyStatistic.storage() == PACKED:
+        return PACKED
+    try:
+        from tortoise.backends.asyncpg.client import AsyncpgDBClient
+    except ImportError:  # 没有安装 asyncpg
+        return INSERT
+    return COPY if isinstance(connection, AsyncpgDBClient) else INSERT
+
+
+def _merge_sql(table: str) -> str:
+    columns = ", ".join(SNAPSHOT_COLUMNS)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in _UPDATE_COLUMNS)
+    return (
+        f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {_STAGE} "
+        f"ON CONFLICT ({', '.join(SNAPSHOT_KEY)}) DO UPDATE SET {updates}"
+    )
+
+
+async def _copy(rows: Sequence[tuple], connection: BaseDBAsyncClient) -> None:
+    table = PlayerDailyStatistic._meta.db_table
+    async with connection.acquire_connection() as raw:
+        # 临时表只属于当前连接, 列类型与快照表一致; 在连接池的连接上第一次使用时创建
+        await raw.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE} AS "
+            f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM {table} WITH NO DATA"
+        )
+        await raw.copy_records_to_table(_STAGE, records=rows, columns=SNAPSHOT_COLUMNS)
+        await raw.execute(_merge_sql(table))
+        await raw.execute(f"TRUNCATE {_STAGE}")
+
+
+async def _insert(rows: Sequence[tuple], connection: BaseDBAsyncClient, batch_size: int) -> None:
+    # 每批单独建模型实例, 内存只和批大小有关
+    for start in range(0, len(rows), batch_size):
+        await PlayerDailyStatistic.bulk_create(
+            [
+                PlayerDailyStatistic(**dict(zip(SNAPSHOT_COLUMNS, values)))
+                for values in rows[start : start + batch_size]
+            ],
+            on_conflict=SNAPSHOT_KEY,
+            update_fields=_UPDATE_COLUMNS,
+            using_db=connection,
+        )
+
+
+async def _pack(rows: Sequence[tuple], connection: BaseDBAsyncClient, batch_size: int) -> None:
+    # 每个账号 (同一天) 的记录打包成一行
+    accounts = defaultdict(list)
+    for row in rows:
+        accounts[row[0], row[2]].append(row)
+    await PlayerDailySnapshot.bulk_create(
+        [
+            PlayerDailySnapshot.from_values(account_pk, date, values)
+            for (account_pk, date), values in accounts.items()
+        ],
+        batch_size=batch_size,
+        on_conflict=("account_id", "date"),
+        update_fields=("ships", "battles", "data"),
+        using_db=connection,
+    )
+
+
+async def write_snapshots(
+    rows: Sequence[tuple], connection: BaseDBAsyncClient, batch_size: int = 1000
+) -> str:
+    """
+    写入 (或覆盖) 一批快照记录, 返回使用的写入方式; connection 一般是 in_transaction() 得到的事务连接
+    """
+    if not rows:
+        return ingest_method(connection)
+    if (method := ingest_method(connection)) == COPY:
+        await _copy(rows, connection)
+    elif method == PACKED:
+        await _pack(rows, connection, batch_size)
+    else:
+        await _insert(rows, connection, batch_size)
+    return method
+
+
+async def write_heartbeats(rows: Sequence[tuple], connection: BaseDBAsyncClient) -> None:
+    """
+    写入 (或覆盖) 一批按 HEARTBEAT_COLUMNS 排列的心跳记录
+    """
+    if not rows:
+        return
+    await PlayerDailyHeartbeat.bulk_create(
+        [PlayerDailyHeartbeat(**dict(zip(HEARTBEAT_COLUMNS, values))) for values in rows],
+        on_conflict=HEARTBEAT_KEY,
+        update_fields=[column for column in HEARTBEAT_COLUMNS if column not in HEARTBEAT_KEY],
+        using_db=connection,
+    )
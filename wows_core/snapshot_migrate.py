@@ -0,0 +1,134 @@
+"""
+把旧的全量每日快照迁移为只保存变化的快照
+
+旧数据每天为每个账号的每艘船写一条记录。迁移按账号分批, 每批在一个事务里:
+先按 (账号, 日期) 补写心跳 (当天的船只数和总场次, 已有的心跳不覆盖),
+再删除与同一艘船前一条记录场次相同的记录。每艘船最早的一条和每次场次变化都保留,
+PlayerDailyStatistic.latest_rows 取回的某天完整船队与迁移前那天的记录相同。
+
+一个账号最早一天的快照有心跳即视为已迁移 (新账号第一天就由每日任务写入心跳),
+所以迁移中途退出后再次运行只处理剩下的账号; 对已迁移的数据重复运行不会删除任何记录。
+
+切换到 packed 存储方式时, migrate_to_packed 把每艘船一行的记录按账号重建出每个有变化那天的完整船队,
+打包写入 PlayerDailySnapshot。已有打包数据的账号不再处理; 原来的记录保留, 需要时手动删除。
+"""
+
+import time
+from itertools import groupby
+from operator import itemgetter
+
+from nonebot import logger
+from tortoise.transactions import in_transaction
+
+from .models.daily_statistic import (
+    SNAPSHOT_COLUMNS,
+    PlayerDailyHeartbeat,
+    PlayerDailySnapshot,
+    PlayerDailyStatistic,
+)
+
+
+def _tables() -> tuple[str, str]:
+    return PlayerDailyStatistic._meta.db_table, PlayerDailyHeartbeat._meta.db_table
+
+
+async def pending_accounts() -> list[int]:
+    """
+    还没有迁移的账号主键 (最早一天的快照没有心跳)
+    """
+    table, heartbeats = _tables()
+    rows = await PlayerDailyStatistic._meta.db.execute_query_dict(
+        f"SELECT earliest.account_id FROM ("
+        f"SELECT account_id, MIN(date) AS date FROM {table} GROUP BY account_id"
+        f") earliest WHERE NOT EXISTS (SELECT 1 FROM {heartbeats} h "
+        "WHERE h.account_id = earliest.account_id AND h.date = earliest.date) "
+        "ORDER BY earliest.account_id"
+    )
+    return [row["account_id"] for row in rows]
+
+
+async def _migrate_batch(account_pks: list[int]) -> int:
+    table, heartbeats = _tables()
+    ids = ", ".join(str(int(pk)) for pk in account_pks)
+    async with in_transaction() as connection:
+        await connection.execute_query(
+            f"INSERT INTO {heartbeats} (account_id, date, ships, battles) "
+            f"SELECT account_id, date, COUNT(*), SUM(battles) FROM {table} "
+            f"WHERE account_id IN ({ids}) GROUP BY account_id, date "
+            "ON CONFLICT (account_id, date) DO NOTHING"
+        )
+        deleted, _ = await connection.execute_query(
+            f"DELETE FROM {table} WHERE id IN (SELECT id FROM ("
+            "SELECT id, battles, LAG(battles) OVER "
+            "(PARTITION BY account_id, ship_id ORDER BY date) AS previous "
+            f"FROM {table} WHERE account_id IN ({ids})"
+            ") history WHERE previous = battles)"
+        )
+    return deleted
+
+
+async def migrate_to_delta(batch_size: int = 200) -> dict:
+    """
+    迁移所有还没迁移的账号, 返回处理的账号数和删除的记录数
+    """
+    start = time.perf_counter()
+    pending = await pending_accounts()
+    deleted = 0
+    for i in range(0, len(pending), batch_size):
+        deleted += await _migrate_batch(pending[i : i + batch_size])
+        logger.debug(f"delta snapshot migration: {i + batch_size}/{len(pending)} accounts")
+    return {
+        "accounts": len(pending),
+        "deleted": deleted,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+    }
+
+
+async def unpacked_accounts() -> list[int]:
+    """
+    有每艘船一行的记录、还没有打包数据的账号主键
+    """
+    table = PlayerDailyStatistic._meta.db_table
+    rows = await PlayerDailyStatistic._meta.db.execute_query_dict(
+        f"SELECT DISTINCT account_id FROM {table} WHERE account_id NOT IN "
+        f"(SELECT account_id FROM {PlayerDailySnapshot._meta.db_table}) ORDER BY account_id"
+    )
+    return [row["account_id"] for row in rows]
+
+
+async def _pack_batch(account_pks: list[int]) -> int:
+    rows = (
+        await PlayerDailyStatistic.filter(account_id__in=account_pks)
+        .order_by("account_id", "date")
+        .values_list(*SNAPSHOT_COLUMNS)
+    )
+    snapshots = []
+    for account_pk, account_rows in groupby(rows, key=itemgetter(0)):
+        fleet, previous = {}, None
+        for date, day_rows in groupby(account_rows, key=itemgetter(2)):
+            fleet.update((row[1], row) for row in day_rows)
+            # 只在船队有变化的那天打包一行
+            snapshot = PlayerDailySnapshot.from_values(account_pk, date, list(fleet.values()))
+            if (snapshot.ships, snapshot.battles) != previous:
+                snapshots.append(snapshot)
+                previous = snapshot.ships, snapshot.battles
+    async with in_transaction() as connection:
+        await PlayerDailySnapshot.bulk_create(snapshots, batch_size=1000, using_db=connection)
+    return len(snapshots)
+
+
+async def migrate_to_packed(batch_size: int = 200) -> dict:
+    """
+    把还没有打包数据的账号转成 PlayerDailySnapshot, 返回处理的账号数和写入的行数
+    """
+    start = time.perf_counter()
+    pending = await unpacked_accounts()
+    written = 0
+    for i in range(0, len(pending), batch_size):
+        written += await _pack_batch(pending[i : i + batch_size])
+        logger.debug(f"packed snapshot migration: {i + batch_size}/{len(pending)} accounts")
+    return {
+        "accounts": len(pending),
+        "snapshots": written,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+    }
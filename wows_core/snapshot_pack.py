@@ -0,0 +1,62 @@
+"""
+每日快照的打包格式 (packed 存储方式)
+
+一个账号一天的完整船队打成一个 blob: msgpack 数组 [版本, 列1, 列2, ...],
+每列是按 ship_id 排序的整数数组, 整体再用 zlib 压缩。
+解码是一次 zlib.decompress 和一次 msgpack.unpackb, 得到各列的 list, 不为每艘船建对象。
+"""
+
+import datetime
+import zlib
+from typing import Sequence
+
+import msgpack
+
+VERSION = 1
+# 打包的列, last_battle_at 存为 Unix 时间戳 (秒)
+PACK_COLUMNS = (
+    "ship_id",
+    "battles",
+    "wins",
+    "shots",
+    "hit",
+    "damage",
+    "frags",
+    "survive",
+    "xp",
+    "last_battle_at",
+)
+_LEVEL = 6
+
+
+def _timestamp(value) -> int:
+    if value is None:
+        return 0
+    return int(value.timestamp()) if isinstance(value, datetime.datetime) else int(value)
+
+
+def pack(rows: Sequence[tuple]) -> bytes:
+    """
+    rows 是按 PACK_COLUMNS 排列的元组, last_battle_at 可以是 datetime 或时间戳
+    """
+    rows = sorted(rows)
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in PACK_COLUMNS]
+    columns[-1] = [_timestamp(value) for value in columns[-1]]
+    return zlib.compress(msgpack.packb([VERSION, *columns]), _LEVEL)
+
+
+def unpack_columns(blob: bytes) -> list[list[int]]:
+    """
+    解码为与 PACK_COLUMNS 对应的各列
+    """
+    version, *columns = msgpack.unpackb(zlib.decompress(blob))
+    if version != VERSION:
+        raise ValueError(f"unknown snapshot pack version {version}")
+    return columns
+
+
+def unpack(blob: bytes) -> list[tuple]:
+    """
+    解码为按 PACK_COLUMNS 排列的元组, 按 ship_id 排序
+    """
+    return list(zip(*unpack_columns(blob)))
@@ -0,0 +1,95 @@
+"""
+模板图片, 按 PR 分段预先着色的模板缓存, 以及各版式的静态底图缓存
+"""
+
+import hashlib
+import threading
+from typing import Callable
+
+import numpy as np
+
+from .wows_models import PR_BANDS
+
+# 模板中需要替换成 PR 颜色的占位色值
+PLACEHOLDER = 222
+
+MAIN_DATA = 0
+PR_BAR = 1
+MAX_MAIN = 2
+RECENT = 3
+
+
+def tint(img: np.ndarray, color: tuple) -> np.ndarray:
+    """
+    把模板里各通道等于占位色值的像素替换成 color (RGB), 返回新数组
+    """
+    out = img.copy()
+    for c in range(3):
+        channel = out[:, :, c]
+        channel[channel == PLACEHOLDER] = color[c]
+    return out
+
+
+class TemplateSet(list):
+    """
+    模板图片列表 (main_data, pr_bar, max_main, recent), RGB 格式
+
+    仍然可以按下标取原图, 另外缓存每个 PR 颜色对应的着色结果,
+    PR 颜色只有 PR_BANDS 里有限的几种, 所以缓存大小是固定的。
+    """
+
+    def __init__(self, images) -> None:
+        super().__init__(images)
+        self._tinted: dict[tuple, np.ndarray] = {}
+        self._layers: dict[tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        """
+        模板内容的摘要, 用作渲染结果缓存键的一部分
+        """
+        if self._version is None:
+            h = hashlib.blake2b(digest_size=8)
+            for img in self:
+                h.update(np.ascontiguousarray(img).data)
+            self._version = h.hexdigest()
+        return self._version
+
+    def tinted(self, index: int, color: tuple) -> np.ndarray:
+        """
+        取着色后的模板 (只读), 第一次使用某个颜色时计算
+        """
+        color = tuple(int(c) for c in color)
+        key = (index, color)
+        if (img := self._tinted.get(key, None)) is None:
+            img = self[index].view()
+            if color != (PLACEHOLDER,) * 3:
+                img = tint(img, color)
+            img.flags.writeable = False
+            with self._lock:
+                img = self._tinted.setdefault(key, img)
+        return img
+
+    def layer(self, key: tuple, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        取缓存的底图 (只读), 不存在时调用 build 生成
+
+        key 需要包含版式、颜色和字体, 模板变化时整个 TemplateSet 会被替换, 缓存随之失效
+        """
+        if (img := self._layers.get(key, None)) is None:
+            img = build()
+            img.flags.writeable = False
+            with self._lock:
+                img = self._layers.setdefault(key, img)
+        return img
+
+    def warm(self) -> None:
+        """
+        预先为所有 PR 分段计算着色模板
+        """
+        for _, pr_color, color_background, _ in PR_BANDS:
+            self.tinted(PR_BAR, pr_color)
+            for index in (MAIN_DATA, MAX_MAIN, RECENT):
+                self.tinted(index, color_background)
@@ -0,0 +1,159 @@
+"""
+字形图集文字渲染
+
+每个字体 (路径 + 字号) 只用 FreeType 光栅化一次字形, 得到 alpha 蒙版后缓存起来:
+ASCII 字形常驻在一张图集里, 中日韩等其他字形放进 LRU。
+画字时把一行字的蒙版拼好, 再对 numpy 画布做一次向量化的 alpha 混合, 不需要在 PIL 和 numpy 之间来回转换。
+"""
+
+import string
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+ASCII_CHARS = string.printable[:95]  # 数字、字母、标点和空格
+CJK_LRU_SIZE = 2048
+
+
+class Glyph:
+    __slots__ = ("mask", "left", "top", "advance")
+
+    def __init__(self, mask: np.ndarray, left: int, top: int, advance: float) -> None:
+        self.mask = mask  # uint8 alpha 蒙版
+        self.left = left  # 相对笔位置的偏移
+        self.top = top  # 相对行顶部 (ascender) 的偏移
+        self.advance = advance
+
+
+def _rasterize(font: ImageFont.FreeTypeFont, char: str) -> Glyph:
+    left, top, right, bottom = font.getbbox(char)
+    width, height = max(right - left, 0), max(bottom - top, 0)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    if width and height:
+        img = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(img).text((-left, -top), char, font=font, fill=255)
+        mask = np.asarray(img)
+    return Glyph(mask, left, top, font.getlength(char))
+
+
+class GlyphAtlas:
+    """
+    单个字体的字形缓存
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont, lru_size: int = CJK_LRU_SIZE) -> None:
+        self.font = font
+        self.lru_size = lru_size
+        self._lock = threading.Lock()
+        self._lru: OrderedDict[str, Glyph] = OrderedDict()
+        self._ascii = self._build_ascii()
+        # 以数字的上下沿中点作为竖直居中的基准, 与字符串内容无关
+        digit = self._ascii["0"]
+        self.middle = digit.top + digit.mask.shape[0] / 2
+
+    def _build_ascii(self) -> dict:
+        # 所有 ASCII 字形放进同一块内存, 各字形是其中的切片
+        glyphs = [_rasterize(self.font, char) for char in ASCII_CHARS]
+        height = max(g.mask.shape[0] for g in glyphs)
+        width = sum(g.mask.shape[1] for g in glyphs)
+        atlas = np.zeros((height, width), dtype=np.uint8)
+        result = {}
+        xpos = 0
+        for char, g in zip(ASCII_CHARS, glyphs):
+            h, w = g.mask.shape
+            atlas[:h, xpos : xpos + w] = g.mask
+            result[char] = Glyph(atlas[:h, xpos : xpos + w], g.left, g.top, g.advance)
+            xpos += w
+        atlas.flags.writeable = False
+        self.atlas = atlas
+        return result
+
+    def glyph(self, char: str) -> Glyph:
+        if (g := self._ascii.get(char, None)) is not None:
+            return g
+        with self._lock:
+            if (g := self._lru.get(char, None)) is not None:
+                self._lru.move_to_end(char)
+                return g
+        g = _rasterize(self.font, char)
+        g.mask.flags.writeable = False
+        with self._lock:
+            self._lru[char] = g
+            if len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return g
+
+    def layout(self, text: str) -> tuple:
+        """
+        排版一行字, 返回 (alpha 蒙版, 蒙版相对行起点的 x 偏移, y 偏移, 行宽)
+        """
+        glyphs = [self.glyph(char) for char in text]
+        pens = []
+        pen = 0.0
+        for g in glyphs:
+            pens.append(round(pen) + g.left)
+            pen += g.advance
+        drawn = [(g, x) for g, x in zip(glyphs, pens) if g.mask.size]
+        if not drawn:
+            return None, 0, 0, pen
+        x0 = min(x for _, x in drawn)
+        x1 = max(x + g.mask.shape[1] for g, x in drawn)
+        y0 = min(g.top for g, _ in drawn)
+        y1 = max(g.top + g.mask.shape[0] for g, _ in drawn)
+        alpha = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for g, x in drawn:
+            h, w = g.mask.shape
+            region = alpha[g.top - y0 : g.top - y0 + h, x - x0 : x - x0 + w]
+            np.maximum(region, g.mask, out=region)
+        return alpha, x0, y0, pen
+
+
+_atlases: dict[tuple, GlyphAtlas] = {}
+_atlases_lock = threading.Lock()
+
+
+def get_atlas(font: ImageFont.FreeTypeFont) -> GlyphAtlas:
+    key = (font.path, font.size)
+    if (atlas := _atlases.get(key, None)) is None:
+        atlas = GlyphAtlas(font)
+        with _atlases_lock:
+            atlas = _atlases.setdefault(key, atlas)
+    return atlas
+
+
+def blend(img: np.ndarray, alpha: np.ndarray, xpos: int, ypos: int, color) -> None:
+    """
+    把 alpha 蒙版以 color 混合到画布 (xpos, ypos) 处, 超出画布的部分裁掉
+    """
+    h, w = alpha.shape
+    cx0, cy0 = max(xpos, 0), max(ypos, 0)
+    cx1, cy1 = min(xpos + w, img.shape[1]), min(ypos + h, img.shape[0])
+    if cx0 >= cx1 or cy0 >= cy1:
+        return
+    a = alpha[cy0 - ypos : cy1 - ypos, cx0 - xpos : cx1 - xpos, None].astype(np.uint16)
+    region = img[cy0:cy1, cx0:cx1]
+    color = np.asarray(color, dtype=np.uint16)
+    region[:] = (region * (255 - a) + color * a + 127) // 255
+
+
+def draw_text(
+    img: np.ndarray,
+    text: str,
+    center_x: int,
+    font: ImageFont.FreeTypeFont,
+    color,
+    top: float = None,
+    middle: float = None,
+) -> None:
+    """
+    以 center_x 水平居中画一行字; 竖直方向给 top (行顶部) 或 middle (数字中线) 之一
+    """
+    atlas = get_atlas(font)
+    alpha, x0, y0, width = atlas.layout(text)
+    if alpha is None:
+        return
+    xpos = center_x - width // 2
+    ypos = top if top is not None else middle - atlas.middle
+    blend(img, alpha, int(xpos) + x0, int(ypos) + y0, color)
@@ -0,0 +1,404 @@
+"""
+WG API 客户端
+
+aiowpi 每次调用都新建 ClientSession, 每个请求都要重新做 DNS 解析和 TCP/TLS 握手。
+这里每个区服只保持一个长连接的 session (启动时创建, 关闭时释放), 开启 DNS 缓存 (aiodns 已安装时
+aiohttp 默认使用 AsyncResolver), 响应按 gzip/br 压缩传输; 返回值与 aiowpi 对应方法的结构一致,
+玩家和船只数据直接从响应字节解码成 wg_decode 中的结构。
+每个请求使用的 application_id 由 key_pool 按各个 id 的令牌桶余量分配;
+同时发出的相同请求 (区服、接口、参数都相同) 合并成一次; 查询类的调用可以用 cached=True 走响应缓存。
+"""
+
+import asyncio
+import time
+from collections.abc import Iterable
+from typing import Callable, Optional, TypeVar, Union
+
+import aiohttp
+from aiohttp.client_exceptions import ClientConnectionError
+from aiowpi import WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
+from aiowpi.error import WPIError
+from nonebot import get_plugin_config
+
+from .config import Config, HttpConfig, WowsApiConfig
+from .key_pool import KeyPool
+from .response_cache import CachePolicy, ResponseCache
+from .single_flight import SingleFlight
+from .wg_decode import (
+    PlayerDetail,
+    ShipStats,
+    decode_personal_data_response,
+    decode_response,
+    decode_statistics_response,
+)
+
+REGIONS = (WOWS_ASIA, WOWS_RU, WOWS_EU, WOWS_NA)
+
+# 与 aiowpi 的 retry_decorator 相同: 连接错误最多重试 5 次, 间隔 1 秒
+MAX_RETRIES = 5
+RETRY_INTERVAL = 1
+# WG 的限流错误, 换一个 application_id 立即重试
+LIMIT_ERRORS = ("REQUEST_LIMIT_EXCEEDED",)
+
+T = TypeVar("T")
+
+# 各接口的缓存有效期 (秒)
+CACHE_POLICIES = {
+    # 战绩变化靠 last_battle_time 发现, 过期后先返回旧数据再后台刷新
+    "/wows/account/info/": CachePolicy(ttl=60, stale=600, negative_ttl=600),
+    # 键里带玩家的 last_battle_time, 打了新的对局自然失效
+    "/wows/ships/stats/": CachePolicy(ttl=86400, negative_ttl=600),
+    "/wows/clans/accountinfo/": CachePolicy(ttl=600, stale=3600, negative_ttl=600),
+    "/wows/clans/info/": CachePolicy(ttl=3 * 3600, stale=86400, negative_ttl=3600),
+}
+
+
+def _join(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Iterable):
+        return ",".join(map(str, value))
+    return str(value)
+
+
+def _query(**kwargs) -> dict:
+    return {key: _join(value) for key, value in kwargs.items() if value}
+
+
+class RegionStats:
+    """
+    单个区服的请求统计
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.failed = 0
+        self.retries = 0
+        self.limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.bytes = 0
+        self.total_time = 0.0
+
+    def snapshot(self) -> dict:
+        done = self.requests - self.in_flight
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "retries": self.retries,
+            "limited": self.limited,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "bytes": self.bytes,
+            "avg_ms": (self.total_time / done * 1000) if done else 0.0,
+        }
+
+
+def _pool_stats(connector: aiohttp.BaseConnector) -> dict:
+    # aiohttp 没有公开连接池占用, 读取内部字段, 版本变化时退回到 0
+    acquired = getattr(connector, "_acquired", ())
+    idle = getattr(connector, "_conns", {})
+    return {
+        "limit": connector.limit_per_host,
+        "acquired": len(acquired),
+        "idle": sum(len(conns) for conns in idle.values()),
+    }
+
+
+class WGClient:
+    """
+    按区服复用连接的 WG API 客户端, 接口按 aiowpi 分成 player / warships / clans / encyclopedia
+    """
+
+    def __init__(self, api_config: WowsApiConfig, http_config: Optional[HttpConfig] = None) -> None:
+        self.http_config = http_config or HttpConfig()
+        self.keys = KeyPool(
+            api_config.application_id, self.http_config.rate, cooldown=self.http_config.key_cooldown
+        )
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+        self._stats: dict[str, RegionStats] = {region: RegionStats() for region in REGIONS}
+        self.single_flight = SingleFlight()
+        self.cache = ResponseCache(self.http_config.cache_entries)
+        self.player = _Player(self)
+        self.warships = _Warships(self)
+        self.clans = _Clans(self)
+        self.encyclopedia = _Encyclopedia(self)
+
+    def _new_session(self, region: str) -> aiohttp.ClientSession:
+        config = self.http_config
+        connector = aiohttp.TCPConnector(
+            limit=config.limit_per_region,
+            limit_per_host=config.limit_per_region,
+            ttl_dns_cache=config.dns_ttl,
+            keepalive_timeout=config.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(
+            region,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=config.timeout, sock_connect=config.connect_timeout
+            ),
+            raise_for_status=True,
+        )
+
+    def session(self, region: str) -> aiohttp.ClientSession:
+        if (session := self._sessions.get(region, None)) is None or session.closed:
+            session = self._new_session(region)
+            self._sessions[region] = session
+            self._stats.setdefault(region, RegionStats())
+        return session
+
+    async def start(self) -> None:
+        """
+        在事件循环中为所有区服创建 session, 之后关闭的 session 在下次使用时重建
+        """
+        for region in REGIONS:
+            self.session(region)
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+
+    def stats(self) -> dict:
+        result = {}
+        for region, stats in self._stats.items():
+            result[region] = stats.snapshot()
+            if (session := self._sessions.get(region, None)) is not None:
+                result[region]["pool"] = _pool_stats(session.connector)
+        result["keys"] = self.keys.stats()
+        result["single_flight"] = self.single_flight.stats()
+        result["cache"] = self.cache.stats()
+        return result
+
+    async def request(
+        self,
+        region: str,
+        path: str,
+        decode: Callable[[bytes], T],
+        cached: bool = False,
+        version=None,
+        **params,
+    ) -> T:
+        """
+        请求一个接口并解码, 与正在进行的相同请求合并; 解码结果由合并的调用者共享, 不要修改
+
+        cached 为真时按 CACHE_POLICIES 使用响应缓存, version 会加入缓存键
+        """
+        query = _query(**params)
+        key = (region, path, decode, tuple(sorted(query.items())))
+
+        def fetch():
+            return self.single_flight.do(key, lambda: self._request(region, path, decode, query))
+
+        if cached and (policy := CACHE_POLICIES.get(path, None)) is not None:
+            return await self.cache.get((key, version), policy, fetch)
+        return await fetch()
+
+    async def _request(self, region: str, path: str, decode: Callable[[bytes], T], query: dict) -> T:
+        """
+        连接错误时等待后重试, 限流错误时换一个 application_id 立即重试
+        """
+        stats = self._stats.setdefault(region, RegionStats())
+        retry = 0
+        while True:
+            application_id = await self.keys.acquire()
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+            start = time.perf_counter()
+            try:
+                async with self.session(region).get(
+                    path, params={"application_id": application_id, **query}
+                ) as response:
+                    raw = await response.read()
+                stats.bytes += len(raw)
+                result = decode(raw)
+                self.keys.report_ok(application_id)
+                return result
+            except WPIError as e:
+                stats.failed += 1
+                if e.message not in LIMIT_ERRORS or retry >= MAX_RETRIES:
+                    raise
+                stats.limited += 1
+                self.keys.report_limited(application_id)
+                wait = 0
+            except ClientConnectionError:
+                stats.failed += 1
+                if retry >= MAX_RETRIES:
+                    raise
+                wait = RETRY_INTERVAL
+            except Exception:
+                stats.failed += 1
+                raise
+            finally:
+                stats.in_flight -= 1
+                stats.total_time += time.perf_counter() - start
+            retry += 1
+            stats.retries += 1
+            if wait:
+                await asyncio.sleep(wait)
+
+
+def _data(raw: bytes):
+    return decode_response(raw)["data"]
+
+
+class _Api:
+    def __init__(self, client: WGClient) -> None:
+        self.client = client
+
+
+class _Player(_Api):
+    async def serch(
+        self, server: str, search: str, fields=None, language=None, limit=None, search_type=None
+    ) -> tuple[tuple[str, int], ...]:
+        data = await self.client.request(
+            server,
+            "/wows/account/list/",
+            _data,
+            search=search,
+            fields=fields,
+            language=language,
+            limit=limit,
+            type=search_type,
+        )
+        return tuple((player["nickname"], player["account_id"]) for player in data)
+
+    async def personal_data(
+        self,
+        server: str,
+        account_id: Union[int, Iterable[int], str],
+        access_token=None,
+        extra=None,
+        fields=None,
+        language=None,
+        cached: bool = False,
+    ) -> tuple[Optional[PlayerDetail], ...]:
+        data = await self.client.request(
+            server,
+            "/wows/account/info/",
+            decode_personal_data_response,
+            cached=cached,
+            account_id=account_id,
+            access_token=access_token,
+            extra=extra,
+            fields=fields,
+            language=language,
+        )
+        return tuple(data.values())
+
+
+class _Warships(_Api):
+    async def _1statistics(
+        self, server: str, account_id: int, fields=None, last_battle_time=None, **kwargs
+    ) -> Optional[list[ShipStats]]:
+        data = await self.client.request(
+            server,
+            "/wows/ships/stats/",
+            decode_statistics_response,
+            cached=last_battle_time is not None,
+            version=last_battle_time,
+            account_id=account_id,
+            fields=fields,
+            **kwargs,
+        )
+        return data.get(int(account_id), None)
+
+    async def statistics(
+        self,
+        server: str,
+        account_id: Union[int, Iterable[int]],
+        access_token=None,
+        extra=None,
+        fields=None,
+        in_garage=None,
+        language=None,
+        ship_id=None,
+        last_battle_time=None,
+    ) -> tuple[Optional[list[ShipStats]], ...]:
+        """
+        船只接口每次只能查一个账号, 多个账号并发请求, 按传入顺序返回
+
+        只查一个账号时可以传入它的 last_battle_time (来自 personal_data), 船只数据会按它缓存
+        """
+        if isinstance(account_id, (int, str)):
+            account_id = (account_id,)
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(
+                    self._1statistics(
+                        server,
+                        acc_id,
+                        fields=fields,
+                        access_token=access_token,
+                        extra=extra,
+                        in_garage=in_garage,
+                        language=language,
+                        ship_id=ship_id,
+                        last_battle_time=last_battle_time,
+                    )
+                )
+                for acc_id in account_id
+            ]
+        return tuple(task.result() for task in tasks)
+
+
+class _Clans(_Api):
+    async def account_info(
+        self, server: str, account_id, extra=None, fields=None, language=None, cached=False
+    ) -> tuple:
+        data = await self.client.request(
+            server,
+            "/wows/clans/accountinfo/",
+            _data,
+            cached=cached,
+            account_id=account_id,
+            extra=extra,
+            fields=fields,
+            language=language,
+        )
+        return tuple(data.values())
+
+    async def details(
+        self, server: str, clan_id, extra=None, fields=None, language=None, cached=False
+    ) -> tuple:
+        data = await self.client.request(
+            server,
+            "/wows/clans/info/",
+            _data,
+            cached=cached,
+            clan_id=clan_id,
+            extra=extra,
+            fields=fields,
+            language=language,
+        )
+        return tuple(data.values())
+
+
+class _Encyclopedia(_Api):
+    async def warships_page(
+        self, server: str, page_no: int, fields=None, language=None, limit=None
+    ) -> tuple[int, dict]:
+        """
+        图鉴的一页, 返回 (总页数, {str 船 id: 船只信息})
+        """
+        response = await self.client.request(
+            server,
+            "/wows/encyclopedia/ships/",
+            decode_response,
+            fields=fields,
+            language=language,
+            limit=limit,
+            page_no=page_no,
+        )
+        return response["meta"]["page_total"], response["data"]
+
+
+plugin_config = get_plugin_config(Config)
+wg_client = WGClient(plugin_config.wows_api, plugin_config.http)
+
+
+def get_wg_client() -> WGClient:
+    return wg_client
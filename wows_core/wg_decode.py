@@ -0,0 +1,145 @@
+"""
+WG API 返回数据的类型化解码
+
+用 msgspec Struct 描述 personal_data 和 warships statistics 中实际用到的字段,
+其余字段在解码时直接跳过。拿到原始响应字节时 (decode_*_response) 可以不经过中间的字典树直接解码;
+aiowpi 已经解析成字典的结果用 msgspec.convert 转换, 转换后原来的字典树即可释放。
+"""
+
+from typing import Optional, Union
+
+import msgspec
+
+
+class MainBattery(msgspec.Struct, gc=False):
+    shots: int = 0
+    hits: int = 0
+
+
+class PvpStats(msgspec.Struct, gc=False):
+    battles: int = 0
+    wins: int = 0
+    damage_dealt: int = 0
+    xp: int = 0
+    frags: int = 0
+    survived_battles: int = 0
+    main_battery: MainBattery = msgspec.field(default_factory=MainBattery)
+    # 最佳数据, 部分船只没有
+    max_damage_dealt: Optional[int] = None
+    max_damage_scouting: Optional[int] = None
+    max_frags_battle: Optional[int] = None
+    max_planes_killed: Optional[int] = None
+    max_total_agro: Optional[int] = None
+    max_xp: Optional[int] = None
+    max_ships_spotted: Optional[int] = None
+
+
+class ShipStats(msgspec.Struct, gc=False):
+    """
+    warships statistics 中的一艘船
+    """
+
+    ship_id: int
+    last_battle_time: int = 0
+    account_id: int = 0
+    pvp: PvpStats = msgspec.field(default_factory=PvpStats)
+
+
+class PlayerStatistics(msgspec.Struct, gc=False):
+    pvp: PvpStats = msgspec.field(default_factory=PvpStats)
+
+
+class PlayerDetail(msgspec.Struct, gc=False):
+    """
+    player personal_data 中的一个玩家
+    """
+
+    account_id: int
+    nickname: str = ""
+    last_battle_time: int = 0
+    leveling_tier: int = 0
+    created_at: int = 0
+    hidden_profile: bool = False
+    logout_at: int = 0
+    statistics: Optional[PlayerStatistics] = None
+
+
+class WGError(msgspec.Struct):
+    code: int = 0
+    message: str = ""
+    field: Optional[str] = None
+    value: Optional[str] = None
+
+
+class _PersonalDataResponse(msgspec.Struct):
+    status: str = "ok"
+    error: Optional[WGError] = None
+    data: dict[int, Optional[PlayerDetail]] = {}
+
+
+class _StatisticsResponse(msgspec.Struct):
+    status: str = "ok"
+    error: Optional[WGError] = None
+    data: dict[int, Optional[list[ShipStats]]] = {}
+
+
+_personal_data_decoder = msgspec.json.Decoder(_PersonalDataResponse)
+_statistics_decoder = msgspec.json.Decoder(_StatisticsResponse)
+
+
+def _check(response) -> None:
+    if response.error is not None:
+        # 与 aiowpi 的 check_wg_response 抛出相同的异常
+        from aiowpi.error import WPIError
+
+        raise WPIError(msgspec.structs.asdict(response.error))
+
+
+def decode_personal_data_response(raw: bytes) -> dict[int, Optional[PlayerDetail]]:
+    """
+    直接从 /wows/account/info/ 的响应字节解码, 返回 {account_id: PlayerDetail}
+    """
+    response = _personal_data_decoder.decode(raw)
+    _check(response)
+    return response.data
+
+
+def decode_statistics_response(raw: bytes) -> dict[int, Optional[list[ShipStats]]]:
+    """
+    直接从 /wows/ships/stats/ 的响应字节解码, 返回 {account_id: [ShipStats, ...]}
+    """
+    response = _statistics_decoder.decode(raw)
+    _check(response)
+    return response.data
+
+
+def decode_response(raw: bytes) -> dict:
+    """
+    没有对应结构的接口 (公会、搜索、图鉴) 解码成字典, 返回完整响应 (含 meta)
+    """
+    response = msgspec.json.decode(raw)
+    if error := response.get("error", None):
+        from aiowpi.error import WPIError
+
+        raise WPIError(error)
+    return response
+
+
+def as_player_detail(detail: Union[PlayerDetail, dict]) -> PlayerDetail:
+    """
+    把 aiowpi 返回的字典转换成 PlayerDetail, 已经是 PlayerDetail 时原样返回
+    """
+    if isinstance(detail, PlayerDetail):
+        return detail
+    return msgspec.convert(detail, PlayerDetail)
+
+
+def as_ship_stats(ships: Optional[list]) -> list[ShipStats]:
+    """
+    把 aiowpi 返回的船只列表转换成 ShipStats 列表, 已经转换过时原样返回
+    """
+    if not ships:
+        return []
+    if isinstance(ships[0], ShipStats):
+        return ships
+    return msgspec.convert(ships, list[ShipStats])
@@ -0,0 +1,85 @@
+"""
+各功能请求 WG API 时的字段投影 (fields 参数)
+
+WG 接口默认返回完整对象, 而每个功能只读其中一小部分。这里集中声明每个功能需要的字段,
+调用接口时作为 fields 传入, 服务端只返回这些字段。
+玩家和船只数据的字段由 wg_decode 中的结构推导, 结构里加了字段投影会自动跟着变化。
+"""
+
+import typing
+from typing import NamedTuple
+
+import msgspec
+
+from .wg_decode import PlayerDetail, ShipStats
+
+# 最佳数据, 只有玩家卡片上显示
+BEST_FIELDS = (
+    "max_damage_dealt",
+    "max_damage_scouting",
+    "max_frags_battle",
+    "max_planes_killed",
+    "max_total_agro",
+    "max_xp",
+    "max_ships_spotted",
+)
+
+
+def _struct_type(tp):
+    # 取出 Optional[X] 中的 X
+    if typing.get_origin(tp) is typing.Union:
+        args = [arg for arg in typing.get_args(tp) if arg is not type(None)]
+        tp = args[0] if len(args) == 1 else tp
+    if isinstance(tp, type) and issubclass(tp, msgspec.Struct):
+        return tp
+    return None
+
+
+def projection(struct_type, exclude=(), prefix: str = "") -> tuple[str, ...]:
+    """
+    把结构的字段展开成 WG 的 fields 写法 ("statistics.pvp.battles"), exclude 按字段名排除
+    """
+    fields = []
+    for field in msgspec.structs.fields(struct_type):
+        if field.name in exclude:
+            continue
+        path = f"{prefix}{field.encode_name}"
+        if (nested := _struct_type(field.type)) is not None:
+            fields.extend(projection(nested, exclude, f"{path}."))
+        else:
+            fields.append(path)
+    return tuple(fields)
+
+
+class PlayerProjection(NamedTuple):
+    """
+    一个功能对 personal_data 和 warships statistics 两个接口的投影
+    """
+
+    personal_data: tuple[str, ...]
+    statistics: tuple[str, ...]
+
+
+# 玩家卡片: 总览和最佳数据, 船表只需要计数
+USER_FIELDS = PlayerProjection(
+    projection(PlayerDetail),
+    projection(ShipStats, exclude=("account_id", *BEST_FIELDS)),
+)
+# 近期战绩: 只显示船表的差分
+RECENT_FIELDS = PlayerProjection(
+    projection(PlayerDetail, exclude=BEST_FIELDS),
+    projection(ShipStats, exclude=("account_id", *BEST_FIELDS)),
+)
+# 每日快照: 只保存船只计数, 批量请求时按 account_id 归组
+DAILY_FIELDS = PlayerProjection(
+    projection(PlayerDetail, exclude=BEST_FIELDS),
+    projection(ShipStats, exclude=BEST_FIELDS),
+)
+
+# 公会
+CLAN_MEMBER_FIELDS = ("clan_id", "account_name")
+CLAN_DETAIL_FIELDS = ("tag",)
+# 玩家搜索
+PLAYER_SEARCH_FIELDS = ("account_id", "nickname")
+# 船只图鉴, 即 wows_ship_list.json 中保存的字段
+ENCYCLOPEDIA_FIELDS = ("name", "tier", "type", "images", "nation", "is_premium", "is_special")
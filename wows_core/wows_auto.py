@@ -1,13 +1,12 @@
+
 import datetime
-import json
 
-import aiofiles
 import aiohttp
 from .models.account import Account
-from .models.daily_statistic import PlayerDailyStatistic
-from .config import Config, get_cache
+from .models.daily_run import FINISHED, DailyRun
+from .config import Config
 from nonebot import get_plugin_config
-from aiowpi import WPIClient, WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
+from aiowpi import WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
 from aiowpi.error import WPIError
 import asyncio
 import pytz
@@ -15,12 +14,22 @@ from nonebot import logger
 from aiohttp.client_exceptions import ClientConnectionError
 from nonebot_plugin_apscheduler import scheduler
 from apscheduler.triggers.cron import CronTrigger
-from collections import defaultdict
-from .wows_models import User as Player
-from typing import Callable
+from .expected import expected_store
+from .ship_sync import WGEncyclopedia, sync_ship_index
+from .daily_pipeline import DailyPipeline, log_stats
+from .models.daily_statistic import PACKED
+from .snapshot_migrate import (
+    migrate_to_delta,
+    migrate_to_packed,
+    pending_accounts,
+    unpacked_accounts,
+)
+from .wg_client import wg_client
+from .wg_fields import CLAN_DETAIL_FIELDS, CLAN_MEMBER_FIELDS
 
 api_config = get_plugin_config(Config).wows_api
 db_config = get_plugin_config(Config).db_config
+daily_config = get_plugin_config(Config).daily
 
 Server2url = [WOWS_ASIA, WOWS_RU, WOWS_EU, WOWS_NA]
 timezone = pytz.timezone("Asia/Shanghai")
@@ -34,7 +43,7 @@ async def update_clan_tags():
     accounts = await Account.all().values(
         "id", "account_id", "server", "clan_tag", "nickname"
     )  # 获取账户数据
-    wpi = WPIClient(api_config.get_application_id(), 5)
+    wpi = wg_client
     updated_accounts = []  # 用来存储更新后的Account实例
 
     async with asyncio.TaskGroup() as tg:
@@ -57,15 +66,17 @@ async def updata_account_clan_tag_and_name(account, wpi, updated_accounts, retry
     try:
         server = account["server"]
         account_id = account["account_id"]
-        player_clan = (await wpi.clans.account_info(Server2url[server], account_id))[
-            0
-        ]  # 获取玩家的clan信息
+        player_clan = (
+            await wpi.clans.account_info(
+                Server2url[server], account_id, fields=CLAN_MEMBER_FIELDS
+            )
+        )[0]  # 获取玩家的clan信息
         # logger.info(player_clan)
         clan_tag = None
         nickname = None
         if player_clan and player_clan["clan_id"]:
             clan_details = await wpi.clans.details(
-                Server2url[server], player_clan["clan_id"]
+                Server2url[server], player_clan["clan_id"], fields=CLAN_DETAIL_FIELDS
             )  # 获取clan详情
             clan_tag = (
                 clan_details[0]["tag"]
@@ -101,135 +112,99 @@ async def updata_account_clan_tag_and_name(account, wpi, updated_accounts, retry
             )
 
 
-async def retry_request(
-    func: Callable,
-    *args,
-    max_retries: int = 5,
-    retry_interval: float = 1,
-    retry_count: int = 0,
-    **kwargs,
-):
-    """
-    通用的API请求重试方法
-
-    :param func: 需要重试的函数
-    :param args: 传递给函数的参数
-    :param max_retries: 最大重试次数
-    :param retry_interval: 重试间隔（秒）
-    :param retry_count: 当前重试次数
-    :param kwargs: 传递给函数的关键字参数
-    :return: 函数的返回值
-    """
-    if retry_count >= max_retries:
-        logger.error(f"Max retries reached for {func.__name__} with args {args}")
-        return []
-
-    try:
-        result = await func(*args, **kwargs)  # 调用原始函数
-        return result
-    except ClientConnectionError:
-        logger.warning(
-            f"Retry {retry_count + 1} failed due to connection error, for {func.__name__} with args {args}"
-        )
-        await asyncio.sleep(retry_interval)  # 等待一定时间后重试
-        return await retry_request(
-            func,
-            *args,
-            max_retries=max_retries,
-            retry_interval=retry_interval,
-            retry_count=retry_count + 1,
-            **kwargs,
-        )
-    except WPIError as e:
-        if e.code == 407:
-            logger.warning(
-                f"Retry {retry_count + 1} failed due to WPIError (code 407), for {func.__name__} with args {args}"
-            )
-            await asyncio.sleep(retry_interval)
-            return await retry_request(
-                func,
-                *args,
-                max_retries=max_retries,
-                retry_interval=retry_interval,
-                retry_count=retry_count + 1,
-                **kwargs,
-            )
-        else:
-            logger.error(f"WPIError occurred with code {e.code}: {e.message}")
-            return []
-    except Exception as e:
-        logger.error(f"Unexpected error during {func.__name__}: {e}")
-        raise e
+# 定时任务和启动时的续跑不同时进行
+daily_lock = asyncio.Lock()
 
 
 @scheduler.scheduled_job(
     CronTrigger(hour=3, minute=0, timezone=timezone), id="update_ships"
 )
-async def update_player_daily_statistic(retry=0):
-    if retry == 0:
+async def update_player_daily_statistic():
+    """
+    每个账号的进度保存在 daily_runs / daily_run_accounts 中, 重跑时只处理当天还没完成的账号
+    """
+    async with daily_lock:
         logger.info("PlayerDailyStatistic Update start")
-    if retry > 5:
-        return
-    try:
-        accounts = await Account.all().values("account_id", "server")
-        wpi = WPIClient(api_config.get_application_id(), 3)
-        detail_tasks = []
-        stat_tasks = []
-        server2account_ids = defaultdict(list)
-        for account in accounts:
-            account_id = account["account_id"]
-            server = Server2url[account["server"]]
-            server2account_ids[server].append(account_id)
-        curr_date = datetime.date.today()
-        async with asyncio.TaskGroup() as tg:
-            for server, account_ids in server2account_ids.items():
-                detail_tasks.append(
-                    tg.create_task(
-                        retry_request(wpi.player.personal_data, server, account_ids)
-                    )
-                )
-                stat_tasks.append(
-                    tg.create_task(
-                        retry_request(wpi.warships.statistics, server, account_ids)
-                    )
-                )
-
-        aid2data = defaultdict(dict)
-        for task in detail_tasks:
-            for detail in task.result():
-                if detail:
-                    aid = detail["account_id"]
-                    aid2data[aid]["detail"] = detail
-        for task in stat_tasks:
-            for stat in task.result():
-                if stat and stat[0]:
-                    aid = stat[0]["account_id"]
-                    aid2data[aid]["stat"] = stat
-
-        player_daily_statistics = []
-
-        for aid, data in aid2data.items():
-            detail = data.get("detail", None)
-            stat = data.get("stat", None)
-            if not detail and stat:
+        summary = None
+        for attempt in range(daily_config.run_retries + 1):
+            if attempt:
+                await asyncio.sleep(daily_config.retry_delay)
+            try:
+                result = await DailyPipeline(wg_client, daily_config).run()
+            except Exception as e:
+                logger.error(str(e))
+                logger.exception("Exception")
                 continue
-            player = Player()
-            player.init_user(detail, stat, -1, None, "")
-            await player.async_init(stat)
-            player_daily_statistics.extend(
-                await PlayerDailyStatistic.create_from_player(player, curr_date)
+            log_stats(result)
+            summary = result["summary"]
+            if not summary["failed"] or summary["given_up"] >= summary["failed"]:
+                break
+        if summary is None:
+            logger.error("PlayerDailyStatistic Update failed")
+        elif summary["failed"]:
+            logger.warning(
+                f"PlayerDailyStatistic Update finished with failures, done = {summary['done']}, "
+                f"skipped = {summary['skipped']}, failed = {summary['failed']}, "
+                f"e.g. {summary['failed_accounts']}"
+            )
+        else:
+            logger.success(
+                f"PlayerDailyStatistic Update Success, done = {summary['done']}, "
+                f"skipped = {summary['skipped']}"
             )
 
-        await PlayerDailyStatistic.bulk_create(
-            player_daily_statistics,
-        )
-        logger.success(
-            f"PlayerDailyStatistic Update Success, num = {len(player_daily_statistics)}"
-        )
-    except Exception as e:
-        logger.error(str(e))
-        logger.exception("Exception")
-        await update_player_daily_statistic(retry=retry + 1)
+
+async def migrate_daily_statistic():
+    """
+    启动时把旧的全量快照迁移为只保存变化的快照, 只处理还没迁移的账号;
+    使用 packed 存储方式时再把还没打包的账号转成 PlayerDailySnapshot。迁移完之前每日任务等待
+    """
+    async with daily_lock:
+        stage = "delta"
+        try:
+            result = await migrate_to_delta()
+            if result["accounts"]:
+                logger.success(f"PlayerDailyStatistic delta migration finished, {result}")
+            # 直接看配置, 不依赖 init_db 里的 configure_storage 是否已经执行
+            if daily_config.storage == PACKED:
+                stage = "packed"
+                result = await migrate_to_packed()
+                if result["accounts"]:
+                    logger.success(f"PlayerDailyStatistic packed migration finished, {result}")
+        except Exception as e:
+            # 已经完成的批次不会回滚, 剩下的账号在下次启动时继续迁移
+            logger.error(
+                f"PlayerDailyStatistic {stage} migration failed, "
+                f"{await _pending_count(stage)} accounts pending: {e}"
+            )
+            logger.exception("Exception")
+
+
+async def _pending_count(stage: str):
+    try:
+        pending = pending_accounts if stage == "delta" else unpacked_accounts
+        return len(await pending())
+    except Exception:
+        return "unknown"
+
+
+async def start_migrate_daily_statistic():
+    _background.add(task := asyncio.create_task(migrate_daily_statistic()))
+    task.add_done_callback(_background.discard)
+
+
+async def resume_daily_statistic():
+    """
+    启动时如果当天的快照任务没有完成 (进程在任务中途退出), 在后台继续
+    """
+    run = await DailyRun.get_or_none(date=datetime.date.today())
+    if run is not None and run.status != FINISHED:
+        logger.info(f"resume PlayerDailyStatistic Update, status = {run.status}")
+        _background.add(task := asyncio.create_task(update_player_daily_statistic()))
+        task.add_done_callback(_background.discard)
+
+
+_background = set()
 
 
 @scheduler.scheduled_job(
@@ -242,12 +217,24 @@ async def update_numbers_data():
             async with session.get(api) as resp:
                 if 200 == resp.status:
                     data = await resp.json()
-                    async with aiofiles.open(
-                        "wows_core/src/wows_exp.json", mode="w"
-                    ) as f:
-                        await f.write(json.dumps(data, ensure_ascii=False, indent=4))
-                        cache = get_cache()
-                        cache.clear()
+                    expected = await expected_store.replace(data)
+                    logger.success(
+                        f"Expected values updated, version = {expected.version}, "
+                        f"ships = {len(expected)}"
+                    )
+    except Exception as e:
+        logger.error(str(e))
+        logger.exception("Exception")
+        return
+
+
+@scheduler.scheduled_job(
+    CronTrigger(hour=0, minute=30, timezone=timezone), id="update ship list"
+)
+async def update_ship_list():
+    try:
+        result = await sync_ship_index(WGEncyclopedia())
+        logger.success(f"Ship list sync finished, {result}")
     except Exception as e:
         logger.error(str(e))
         logger.exception("Exception")
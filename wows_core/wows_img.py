@@ -1,29 +1,50 @@
 import asyncio
-from aiowpi import WPIClient, WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
+from aiowpi import WOWS_ASIA, WOWS_EU, WOWS_NA, WOWS_RU
 from nonebot import get_plugin_config
 from .config import Config, get_cache
 from .wows_models import User as Player
 from .wows_models import Ship as WarShip
-from .wows_models import wows_user, wows_recent
+from .wows_models import read_ship_index
 from PIL import ImageFont
 import cv2 as cv
 from nonebot.adapters.onebot.v11 import Message, MessageSegment
 from .models.daily_statistic import PlayerDailyStatistic
-from .wows_auto import retry_request
+from .executors import executor_registry
+from .render_farm import render_farm, RENDERERS, ROW_LIMITS
+from .templates import TemplateSet
+from .image_cache import image_cache, digest
+from .encoder import encoder_settings
+from .expected import ExpectedValues, expected_store
+from .wg_decode import PlayerDetail, as_player_detail, as_ship_stats
+from .wg_client import wg_client
+from .wg_fields import CLAN_DETAIL_FIELDS, CLAN_MEMBER_FIELDS, RECENT_FIELDS, USER_FIELDS
 import json
 
 Server2url = [WOWS_ASIA, WOWS_RU, WOWS_EU, WOWS_NA]
 plugin_config = get_plugin_config(Config)
+image_config = plugin_config.image
+
+
+def _load_image(path: str):
+    # 渲染全程使用 RGB, 读入时就完成通道转换
+    img = cv.imread(path)
+    return cv.cvtColor(img, cv.COLOR_BGR2RGB, dst=img)
+
+
+def _load_base_images():
+    main_data_img = _load_image("wows_core/components/main_data.png")
+    pr_bar_img = _load_image("wows_core/components/pr_bar.png")
+    max_data_img = _load_image("wows_core/components/max_main.png")
+    recent_data_img = _load_image("wows_core/components/recent.png")
+    images = TemplateSet([main_data_img, pr_bar_img, max_data_img, recent_data_img])
+    images.warm()
+    return images
 
 
 async def get_image_and_font():
     WOWS_CORE_CACHE = get_cache()
     if not WOWS_CORE_CACHE.get("base_img", None):
-        main_data_img = cv.imread("wows_core/components/main_data.png")
-        pr_bar_img = cv.imread("wows_core/components/pr_bar.png")
-        max_data_img = cv.imread("wows_core/components/max_main.png")
-        recent_data_img = cv.imread("wows_core/components/recent.png")
-        images = [main_data_img, pr_bar_img, max_data_img, recent_data_img]
+        images = await executor_registry.run("io", _load_base_images)
         WOWS_CORE_CACHE["base_img"] = images
     if not WOWS_CORE_CACHE.get("fonts", None):
         font_medium = ImageFont.truetype(
@@ -41,57 +62,163 @@ async def get_image_and_font():
     return WOWS_CORE_CACHE["base_img"], WOWS_CORE_CACHE["fonts"]
 
 
+async def render_image(kind: str, user: Player, *args, **kwargs) -> bytes:
+    """
+    渲染图片, 开启多进程渲染时交给 render_farm, 否则在共享的 render 线程池中执行
+    """
+    if render_farm.running:
+        return await render_farm.render(kind, user, *args, **kwargs)
+    base_img, fonts = await get_image_and_font()
+    if kind == "ship":
+        return await executor_registry.run(
+            "render", RENDERERS[kind], user, args[0], base_img, fonts
+        )
+    return await executor_registry.run(
+        "render", RENDERERS[kind], user, base_img, fonts, *args, **kwargs
+    )
+
+
+async def render_table_pages(kind: str, user: Player) -> list[bytes]:
+    """
+    渲染 recent/rank 表格, 行数超过单张图的上限时切成固定行数的多页并行渲染
+    """
+    total = len(user.ship_list)
+    if total <= ROW_LIMITS[kind]:
+        return [await render_image(kind, user)]
+    rows = image_config.page_rows
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(render_image(kind, user, start=start, stop=start + rows))
+            for start in range(0, total, rows)
+        ]
+    return [task.result() for task in tasks]
+
+
+def image_message(pages: list[bytes]) -> Message:
+    return Message([MessageSegment.image(page) for page in pages])
+
+
+async def image_cache_key(
+    kind: str, detail: PlayerDetail, clan_tag: str, expected: ExpectedValues, *extra
+) -> str:
+    """
+    渲染结果缓存的键: 所有会影响画面的输入的摘要
+
+    PR 分段由船只数据和期望值决定, 船只数据只会在打了新的对局后变化,
+    所以用 last_battle_time 和期望值版本就能覆盖; 船名和等级来自船只索引, 同步图鉴后用索引摘要区分。
+    """
+    base_img, fonts = await get_image_and_font()
+    ship_index = await read_ship_index()
+    return digest(
+        kind,
+        detail.account_id,
+        detail.last_battle_time,
+        detail.nickname,
+        clan_tag,
+        expected.version,
+        ship_index.digest,
+        base_img.version,
+        tuple((font.path, font.size) for font in fonts),
+        tuple(sorted(encoder_settings().items())),
+        *extra,
+    )
+
+
 async def gen_player_image_by_account_id(account_id: int, server: int, clan_tag=None):
     server_int = server
     server = Server2url[server]
-    client = WPIClient(plugin_config.wows_api.get_application_id())
+    client = wg_client
     async with asyncio.TaskGroup() as tg:
-        player_detail = tg.create_task(client.player.personal_data(server, account_id))
+        player_detail = tg.create_task(
+            client.player.personal_data(
+                server, account_id, fields=USER_FIELDS.personal_data, cached=True
+            )
+        )
         if not clan_tag:
-            player_clan = tg.create_task(client.clans.account_info(server, account_id))
-        player_stat = tg.create_task(client.warships.statistics(server, account_id))
+            player_clan = tg.create_task(
+                client.clans.account_info(
+                    server, account_id, fields=CLAN_MEMBER_FIELDS, cached=True
+                )
+            )
     if not clan_tag:
         if player_clan := player_clan.result()[0]:
-            clan_details = await client.clans.details(server, player_clan["clan_id"])
+            clan_details = await client.clans.details(
+                server, player_clan["clan_id"], fields=CLAN_DETAIL_FIELDS, cached=True
+            )
             clan_tag = clan_details[0]["tag"] if clan_details[0]["tag"] else "_NO_CLAN_"
+    clan_tag = clan_tag if clan_tag else "_NO_CLAN_"
+
+    player_detail = as_player_detail(player_detail.result()[0])
 
-    player_detail = player_detail.result()
-    player_stat = player_stat.result()
+    # 整个请求使用同一版本的期望值, 期望值更新时缓存键随之变化
+    expected = await expected_store.get()
+    # 没打过新的对局时战绩不会变化, 直接返回缓存的图片, 也不用再拉船只数据
+    cache_key = await image_cache_key("user", player_detail, clan_tag, expected)
+    if img := image_cache.get(cache_key):
+        return MessageSegment.image(img)
+
+    # 船只数据按 last_battle_time 缓存, 没打新的对局时不用重新请求
+    player_stat = await client.warships.statistics(
+        server,
+        account_id,
+        fields=USER_FIELDS.statistics,
+        last_battle_time=player_detail.last_battle_time,
+    )
+    player_stat = as_ship_stats(player_stat[0])
 
     player = Player()
-    player.init_user(player_detail[0], player_stat[0], server_int, None, clan_tag if clan_tag else "_NO_CLAN_")
-    await player.async_init(player_stat[0])
-    base_img, fonts = await get_image_and_font()
-    img = await wows_user(player, base_img, fonts)
+    player.init_user(player_detail, player_stat, server_int, None, clan_tag)
+    await player.async_init(player_stat, expected)
+    img = await render_image("user", player)
+    image_cache.put(cache_key, img)
     return MessageSegment.image(img)
 
 async def get_me_recent_image(account_id: int, server: int, date=None, clan_tag=None):
     server_int = server
     server = Server2url[server]
-    client = WPIClient(plugin_config.wows_api.get_application_id())
+    client = wg_client
     async with asyncio.TaskGroup() as tg:
-        player_detail = tg.create_task(retry_request(client.player.personal_data, server, account_id))
+        player_detail = tg.create_task(
+            client.player.personal_data(
+                server, account_id, fields=RECENT_FIELDS.personal_data, cached=True
+            )
+        )
         if not clan_tag:
-            player_clan = tg.create_task(retry_request(client.clans.account_info, server, account_id))
-        player_stat = tg.create_task(retry_request(client.warships.statistics, server, account_id))
+            player_clan = tg.create_task(
+                client.clans.account_info(
+                    server, account_id, fields=CLAN_MEMBER_FIELDS, cached=True
+                )
+            )
         db_player = tg.create_task(PlayerDailyStatistic.get_player_from_db(account_id, date))
     if not clan_tag:
         if player_clan := player_clan.result()[0]:
-            clan_details = await retry_request(client.clans.details, server, player_clan["clan_id"])
+            clan_details = await client.clans.details(
+                server, player_clan["clan_id"], fields=CLAN_DETAIL_FIELDS, cached=True
+            )
             clan_tag = clan_details[0]["tag"] if clan_details[0]["tag"] else "_NO_CLAN_"
 
-    player_detail = player_detail.result()
-    player_stat = player_stat.result()
+    player_detail = as_player_detail(player_detail.result()[0])
     db_player = db_player.result()
 
     if not db_player:
         return
 
+    # 与玩家卡片共用按 last_battle_time 缓存的船只数据
+    player_stat = await client.warships.statistics(
+        server,
+        account_id,
+        fields=RECENT_FIELDS.statistics,
+        last_battle_time=player_detail.last_battle_time,
+    )
+    player_stat = as_ship_stats(player_stat[0])
+
+    expected = await expected_store.get()
     player = Player()
-    player.init_user(player_detail[0], player_stat[0], server_int, None, clan_tag if clan_tag else "_NO_CLAN_")
-    await player.async_init(player_stat[0])
+    player.init_user(player_detail, player_stat, server_int, None, clan_tag if clan_tag else "_NO_CLAN_")
+    await player.async_init(player_stat, expected)
     recent_player = player - db_player
-    await recent_player.init_pr_sub()
-    base_img, fonts = await get_image_and_font()
-    img = await wows_recent(recent_player, base_img, fonts)
-    return MessageSegment.image(img)
+    if not recent_player.ship_list:
+        return Message("场次未发生变化")
+    await recent_player.init_pr_sub(expected)
+    pages = await render_table_pages("recent", recent_player)
+    return image_message(pages)
@@ -1,595 +1,569 @@
-import math
-import json
 import datetime
-import cv2 as cv
 import numpy as np
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
-import aiofiles
-from collections import defaultdict
 from .config import get_cache
-from .decorators import sync_run_in_executor, async_run_in_executor
+from .text_engine import draw_text
+from .encoder import encode_image
+from .pr_engine import PR_BANDS, fleet_pr
+from .expected import ExpectedValues, expected_store
+from .fleet import COUNTERS, FleetColumns
+from .ship_index import ShipIndex, load_index
+from .executors import executor_registry
+from .wg_decode import PlayerDetail, ShipStats, as_player_detail, as_ship_stats
 
 
-class Ship:
+def _format_time(timestamp):
+    if timestamp is None:
+        return None
+    date = datetime.datetime.fromtimestamp(timestamp)
+    return date.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _init_slots(obj, names) -> None:
+    for name in names:
+        setattr(obj, name, None)
+
+
+class _Displays:
+    """
+    Ship 和 User 共用的显示数据, 只在渲染时按需格式化, 不再随对象常驻内存
+    """
+
+    __slots__ = ()
+
+    @property
+    def display_battles(self):
+        return f"{self.battles}"
+
+    @property
+    def display_damage(self):
+        return (
+            f"{round(self.damage_dealt / self.battles)}" if self.battles > 0 else "N/A"
+        )
+
+    @property
+    def display_kd(self):
+        return (
+            (f"{round(self.frags / (self.battles - self.survived_battles), 2)}")
+            if (self.battles - self.survived_battles) > 0
+            else "N/A"
+        )
+
+    @property
+    def display_accu_rate(self):
+        return format(self.hits / self.shots, ".2%") if self.shots > 0 else "N/A"
+
+    @property
+    def display_winrate(self):
+        return format(self.wins / self.battles, ".2%") if self.battles > 0 else "N/A"
+
+    @property
+    def display_xp(self):
+        return f"{round(self.xp / self.battles)}" if self.battles > 0 else "N/A"
+
+
+class Ship(_Displays):
     """
     这是一个对 船只抽象的类
 
+    使用 __slots__, 不保留原始 json, 时间只存时间戳, 显示数据按需计算
+
     Returns:
         Ship: 一个船只对象
     """
 
-    org_json = None
-
-    ship_id = None
-    ship_name = None
-    last_battle_time = None
-    distance = None
-
-    battles = None
-    wins = None
-    damage_dealt = None
-    xp = None
-    frags = None
-    survived_battles = None
-    shots = None
-    hits = None
-
-    max_damage_dealt = None
-    max_damage_scouting = None
-    max_frags = None
-    max_planes_killed = None
-    max_total_agro = None
-    max_xp = None
-    max_ships_spotted = None
-
-    pr = None
-
-    display_battles = None
-    display_winrate = None
-    display_damage = None
-    display_xp = None
-    display_kd = None
-    display_accu_rate = None
+    __slots__ = (
+        "ship_id",
+        "ship_name",
+        "last_battle_ts",  # 上次战斗的时间戳
+        "distance",
+        "battles",
+        "wins",
+        "damage_dealt",
+        "xp",
+        "frags",
+        "survived_battles",
+        "shots",
+        "hits",
+        "max_damage_dealt",
+        "max_damage_scouting",
+        "max_frags",
+        "max_planes_killed",
+        "max_total_agro",
+        "max_xp",
+        "max_ships_spotted",
+        "pr",
+    )
 
     def __init__(self) -> None:
-        pass
+        _init_slots(self, Ship.__slots__)
 
-    def init_ship(self, ship_dict: dict, ship_list: dict, expected_data) -> None:
-        # 原始数据
-        self.org_json = ship_dict
+    def init_ship(self, ship: ShipStats, ship_index: ShipIndex) -> None:
         # 基本数据
-        self.ship_id = ship_dict["ship_id"]
-        self.ship_name = ship_list[str(self.ship_id)]["name"]
+        self.ship_id = ship.ship_id
+        self.ship_name = ship_index.name(self.ship_id)
         # 非战斗数据
-        date = datetime.datetime.fromtimestamp(ship_dict["last_battle_time"])
-        self.last_battle_time = date.strftime("%Y-%m-%d %H:%M:%S")
-        self.last_battle_time_raw = date
-        self.distance = None
+        self.last_battle_ts = ship.last_battle_time
         # pvp 数据
-        pvp = ship_dict["pvp"]
+        pvp = ship.pvp
         # 战斗数据
-        self.battles = pvp["battles"]
-        self.damage_dealt = pvp["damage_dealt"]
-        self.wins = pvp["wins"]
-        self.xp = pvp["xp"]
-        self.frags = pvp["frags"]
-        self.survived_battles = pvp["survived_battles"]
-        self.shots = pvp["main_battery"]["shots"]
-        self.hits = pvp["main_battery"]["hits"]
+        self.battles = pvp.battles
+        self.damage_dealt = pvp.damage_dealt
+        self.wins = pvp.wins
+        self.xp = pvp.xp
+        self.frags = pvp.frags
+        self.survived_battles = pvp.survived_battles
+        self.shots = pvp.main_battery.shots
+        self.hits = pvp.main_battery.hits
         # 最佳数据
-        self.max_damage_dealt = pvp.get("max_damage_dealt", None)
-        self.max_damage_scouting = pvp.get("max_damage_scouting", None)
-        self.max_frags = pvp.get("max_frags_battle", None)
-        self.max_planes_killed = pvp.get("max_planes_killed", None)
-        self.max_total_agro = pvp.get("max_total_agro", None)
-        self.max_xp = pvp.get("max_xp", None)
-        self.max_ships_spotted = pvp.get("max_ships_spotted", None)
-
-        self.update_displays()
-
-        # PR 数据
-        self.pr = Pr()
-        self.pr.init_pr_ship(self, expected_data)
-
-    def update_displays(self):
-        # 显示数据
-        self.display_battles = f"{self.battles}"
-        self.display_damage = (
-            f"{round(self.damage_dealt / self.battles)}" if self.battles > 0 else "N/A"
-        )
-        self.display_kd = (
-            (f"{round(self.frags / (self.battles - self.survived_battles), 2)}")
-            if (self.battles - self.survived_battles) > 0
-            else "N/A"
-        )
-        self.display_accu_rate = (
-            format(self.hits / self.shots, ".2%") if self.shots > 0 else "N/A"
-        )
-        self.display_winrate = (
-            format(self.wins / self.battles, ".2%") if self.battles > 0 else "N/A"
-        )
-        self.display_xp = (
-            f"{round(self.xp / self.battles)}" if self.battles > 0 else "N/A"
-        )
-
-    def __sub__(self, other):
+        self.max_damage_dealt = pvp.max_damage_dealt
+        self.max_damage_scouting = pvp.max_damage_scouting
+        self.max_frags = pvp.max_frags_battle
+        self.max_planes_killed = pvp.max_planes_killed
+        self.max_total_agro = pvp.max_total_agro
+        self.max_xp = pvp.max_xp
+        self.max_ships_spotted = pvp.max_ships_spotted
+        # PR 由 User.init_fleet_pr 整支舰队一起计算
+
+    @property
+    def last_battle_time(self):
+        return _format_time(self.last_battle_ts)
+
+    @property
+    def last_battle_time_raw(self):
+        if self.last_battle_ts is None:
+            return None
+        return datetime.datetime.fromtimestamp(self.last_battle_ts)
+
+    def with_counters(self, values) -> "Ship":
+        """
+        以本船的 id、名字和时间生成一条只有计数的记录, values 与 COUNTERS 顺序一致
+        """
         new_ship = Ship()
-        new_ship.battles = self.battles - other.battles
-        new_ship.wins = self.wins - other.wins
-        new_ship.damage_dealt = self.damage_dealt - other.damage_dealt
-        new_ship.xp = self.xp - other.xp
-        new_ship.frags = self.frags - other.frags
-        new_ship.ship_name = self.ship_name
-        new_ship.last_battle_time = self.last_battle_time
         new_ship.ship_id = self.ship_id
-        new_ship.shots = self.shots - other.shots
-        new_ship.hits = self.hits - other.hits
-        new_ship.survived_battles = self.survived_battles - other.survived_battles
+        new_ship.ship_name = self.ship_name
+        new_ship.last_battle_ts = self.last_battle_ts
+        for name, value in zip(COUNTERS, values):
+            setattr(new_ship, name, value)
         new_ship.pr = Pr()
-        new_ship.update_displays()
-        # new_ship.pr.init_pr_ship(new_ship)
         return new_ship
 
+    def __sub__(self, other):
+        return self.with_counters(
+            [getattr(self, name) - getattr(other, name) for name in COUNTERS]
+        )
+
     def __lt__(self, other):
-        return self.last_battle_time < other.last_battle_time
+        return self.last_battle_ts < other.last_battle_ts
 
     def __eq__(self, other):
-        return self.last_battle_time == other.last_battle_time
+        return self.last_battle_ts == other.last_battle_ts
 
     def __ge__(self, other):
-        return self.last_battle_time > other.last_battle_time
+        return self.last_battle_ts > other.last_battle_ts
 
 
-class User:
+class User(_Displays):
     """
     这是一个对 用户抽象的类
 
+    使用 __slots__, 不保留原始 json, 时间只存时间戳, 显示数据按需计算
+
     Returns:
         User: 一个用户对象
     """
 
-    account_id = None
-    nick_name = None
-    server = None
-
-    org_json = None
-
-    # 非战斗数据
-    last_battle_time = None  # 上次战斗
-    leveling_tier = None  # 等级
-    created_at = None  # 账号创建时间
-    hidden_profile = None  # 隐藏战绩
-    logout_at = None  # 上次退出游戏
-    distance = None  # 航行长度
-
-    # 战斗数据
-    # 基本战斗数据
-    battles = None  # 战斗场数
-    wins = None  # 胜场
-    losses = None  # 败场
-    damage_dealt = None  # 总伤害
-    xp = None  # 总经验
-    frags = None  # 总k头
-    survived_battles = None
-    # 主炮参数
-    frags_battery = None  # 主炮k头
-    hits = None  # 主炮命中
-    shots = None  # 发射
-    # 详细数据
-    draws = None  # 平局
-    ships_spotted = None  # 点亮数
-
-    # 最佳数据
-    max_damage_dealt = None  # 最大伤害
-    max_frags = None  # 最大k头
-    max_planes_killed = None
-    max_xp = None  # 最高xp
-    max_ships_spotted = None  # 最佳点亮
-    max_damage_scouting = None  # 最大点亮伤害
-    max_total_agro = None  # 最大潜在
-
-    # 船表
-    ship_list = None  # 玩家船只列表
-    ship_dic = None
-    recent_battles = None
-
-    # PR
-    pr = None  # pr 数值
-
-    # 显示数据
-    display_battles = None
-    display_winrate = None
-    display_damage = None
-    display_xp = None
-    display_kd = None
-    display_accu_rate = None
-
-    clan_id = None
-    clan_tag = None
+    __slots__ = (
+        "account_id",
+        "nick_name",
+        "server",
+        # 非战斗数据
+        "last_battle_ts",  # 上次战斗的时间戳
+        "leveling_tier",  # 等级
+        "created_ts",  # 账号创建的时间戳
+        "hidden_profile",  # 隐藏战绩
+        "logout_at",  # 上次退出游戏
+        "distance",  # 航行长度
+        # 基本战斗数据
+        "battles",  # 战斗场数
+        "wins",  # 胜场
+        "losses",  # 败场
+        "damage_dealt",  # 总伤害
+        "xp",  # 总经验
+        "frags",  # 总k头
+        "survived_battles",
+        # 主炮参数
+        "frags_battery",  # 主炮k头
+        "hits",  # 主炮命中
+        "shots",  # 发射
+        # 详细数据
+        "draws",  # 平局
+        "ships_spotted",  # 点亮数
+        # 最佳数据
+        "max_damage_dealt",  # 最大伤害
+        "max_frags",  # 最大k头
+        "max_planes_killed",
+        "max_xp",  # 最高xp
+        "max_ships_spotted",  # 最佳点亮
+        "max_damage_scouting",  # 最大点亮伤害
+        "max_total_agro",  # 最大潜在
+        # 船表
+        "ship_list",  # 玩家船只列表
+        "ship_dic",
+        "recent_battles",
+        # PR
+        "pr",  # pr 数值
+        "clan_id",
+        "clan_tag",
+        # 快照日期和排位赛季
+        "date",
+        "season_id",
+        "_fleet",  # 船表的计数列, 见 fleet 属性
+    )
 
     def __init__(self) -> None:
-        pass
+        _init_slots(self, User.__slots__)
 
     def init_user(
-        self, user: dict, ships: dict, server: int, clan_id, clan_tag
+        self, user: PlayerDetail, ships: dict, server: int, clan_id, clan_tag
     ) -> None:
-        self.org_json = user
-
+        # 也接受 aiowpi 返回的字典
+        user = as_player_detail(user)
         self.clan_id = clan_id
         self.clan_tag = clan_tag
 
-        self.account_id = user["account_id"]
-        self.nick_name = user["nickname"]
+        self.account_id = user.account_id
+        self.nick_name = user.nickname
         self.server = server
 
         # 非战斗数据
-        date = datetime.datetime.fromtimestamp(user["last_battle_time"])
-        self.last_battle_time = date.strftime("%Y-%m-%d %H:%M:%S")  # 上次战斗
-        self.leveling_tier = user["leveling_tier"]  # 等级
-        date = datetime.datetime.fromtimestamp(user["created_at"])
-        self.created_at = date.strftime("%Y-%m-%d %H:%M:%S")
-        self.hidden_profile = user["hidden_profile"]  # 隐藏战绩
-        self.logout_at = user["logout_at"]  # 上次退出游戏
+        self.last_battle_ts = user.last_battle_time  # 上次战斗
+        self.leveling_tier = user.leveling_tier  # 等级
+        self.created_ts = user.created_at
+        self.hidden_profile = user.hidden_profile  # 隐藏战绩
+        self.logout_at = user.logout_at  # 上次退出游戏
 
-        pvp = user["statistics"]["pvp"]
+        pvp = user.statistics.pvp
 
         # 战斗数据
         # 基本战斗数据
-        self.battles = pvp["battles"]
-        self.damage_dealt = pvp["damage_dealt"]
-        self.wins = pvp["wins"]
-        self.xp = pvp["xp"]
-        self.frags = pvp["frags"]
-        self.survived_battles = pvp["survived_battles"]
-        self.shots = pvp["main_battery"]["shots"]
-        self.hits = pvp["main_battery"]["hits"]
+        self.battles = pvp.battles
+        self.damage_dealt = pvp.damage_dealt
+        self.wins = pvp.wins
+        self.xp = pvp.xp
+        self.frags = pvp.frags
+        self.survived_battles = pvp.survived_battles
+        self.shots = pvp.main_battery.shots
+        self.hits = pvp.main_battery.hits
 
         # 最佳数据
-        self.max_damage_dealt = pvp["max_damage_dealt"]
-        self.max_damage_scouting = pvp["max_damage_scouting"]
-        self.max_frags = pvp["max_frags_battle"]
-        self.max_planes_killed = pvp["max_planes_killed"]
-        self.max_total_agro = pvp["max_total_agro"]
-        self.max_xp = pvp["max_xp"]
-        self.max_ships_spotted = pvp["max_ships_spotted"]
-
-        self.update_displays()
-
-    def update_displays(self):
-        self.display_battles = f"{self.battles}"
-        self.display_damage = (
-            f"{round(self.damage_dealt / self.battles)}" if self.battles > 0 else "N/A"
-        )
-        self.display_kd = (
-            (f"{round(self.frags / (self.battles - self.survived_battles), 2)}")
-            if (self.battles - self.survived_battles) > 0
-            else "N/A"
-        )
-        self.display_accu_rate = (
-            format(self.hits / self.shots, ".2%") if self.shots > 0 else "N/A"
-        )
-        self.display_winrate = (
-            format(self.wins / self.battles, ".2%") if self.battles > 0 else "N/A"
-        )
-        self.display_xp = (
-            f"{round(self.xp / self.battles)}" if self.battles > 0 else "N/A"
-        )
-
-    async def async_init(self, ships) -> None:
-        ship_ls = await read_ship_dic()
-        exps = await wows_get_numbers_api()
+        self.max_damage_dealt = pvp.max_damage_dealt
+        self.max_damage_scouting = pvp.max_damage_scouting
+        self.max_frags = pvp.max_frags_battle
+        self.max_planes_killed = pvp.max_planes_killed
+        self.max_total_agro = pvp.max_total_agro
+        self.max_xp = pvp.max_xp
+        self.max_ships_spotted = pvp.max_ships_spotted
+
+    @property
+    def last_battle_time(self):
+        return _format_time(self.last_battle_ts)
+
+    @property
+    def created_at(self):
+        return _format_time(self.created_ts)
+
+    @property
+    def fleet(self) -> FleetColumns:
+        """
+        与 ship_list 行对齐的计数列, 第一次使用时提取, PR 计算和差分共用
+        """
+        if self._fleet is None or len(self._fleet) != len(self.ship_list):
+            self._fleet = FleetColumns.from_ships(self.ship_list)
+        return self._fleet
+
+    async def async_init(self, ships, expected: ExpectedValues = None) -> None:
+        ship_index = await read_ship_index()
+        ships = as_ship_stats(ships)
         # 船表
         self.ship_list = []  # 玩家船只列表
         self.ship_dic = {}
         for ship in ships:
-            if ship["pvp"]["battles"] != 0 and str(ship["ship_id"]) in ship_ls.keys():
+            if ship.pvp.battles != 0 and ship.ship_id in ship_index:
                 ship_add = Ship()
-                ship_add.init_ship(ship, ship_ls, exps)
+                ship_add.init_ship(ship, ship_index)
                 # self.ship_list.append(ship_add)
-                self.ship_dic[str(ship["ship_id"])] = ship_add
+                self.ship_dic[str(ship.ship_id)] = ship_add
         self.ship_list = list(self.ship_dic.values())
+        self._fleet = None
 
         # PR
-        self.pr = Pr()  # pr 数值
-        self.pr.init_pr_user(self.ship_list)
-
-    async def init_recents(self, past_user, recent_user, db_respons):
-        recent_ships_dic = defaultdict(list)
-        expected_data = await wows_get_numbers_api()
-        for record in db_respons:
-            ship = Ship()
-            ship.ship_id = record["ship_id"]
-            ship.last_battle_time = record["last_battle_time"]
-            ship.battles = record["battles"]
-            ship.damage_dealt = record["damage_dealt"]
-            ship.wins = record["wins"]
-            ship.xp = record["xp"]
-            ship.frags = record["frags"]
-            ship.survived_battles = record["survived_battles"]
-            ship.shots = record["shots"]
-            ship.hits = record["hits"]
-            recent_ships_dic[str(ship.ship_id)].append(ship)
-        for ships in recent_ships_dic.values():
-            ships.sort()
-        recent_battles = []
-        for ship_id, ships in recent_ships_dic.items():
-            for index, ship_record in enumerate(ships):
-                if index == 0:
-                    single_battle = ship_record - past_user.ship_dic[ship_id]
-                else:
-                    single_battle = ship_record - ships[index - 1]
-                if single_battle.battles != 0:
-                    single_battle.ship_name = past_user.ship_dic[ship_id].ship_name
-                    single_battle.pr.init_pr_ship(single_battle, expected_data)
-                    recent_battles.append(single_battle)
-        recent_battles.sort(reverse=True)
-        recent_user.recent_battles = recent_battles
-        return recent_user
+        self.init_fleet_pr(expected or await expected_store.get())
 
     def __sub__(self, other):
-        # other = self
-        if self.battles == other.battles:
-            raise Exception("场次未发生变化")
-        else:
-            new_user = User()
-            new_user.battles = self.battles - other.battles
-            new_user.wins = self.wins - other.wins
-            new_user.damage_dealt = self.damage_dealt - other.damage_dealt
-            new_user.xp = self.xp - other.xp
-            new_user.frags = self.frags - other.frags
-            new_user.nick_name = self.nick_name
-            new_user.clan_tag = self.clan_tag
-            new_user.survived_battles = self.survived_battles - other.survived_battles
-            new_user.shots = self.shots - other.shots
-            new_user.hits = self.hits - other.hits
-            new_user.update_displays()
-            new_user.ship_list = []
-            new_user.ship_dic = {}
-            new_user.date = other.date
-            old_ship_map = other.ship_dic
-            for ship_now in self.ship_list:
-                ship_past = old_ship_map.get(str(ship_now.ship_id), None)
-                if ship_past is None:
-                    new_user.ship_list.append(ship_now)
-                    continue
-                else:
-                    if ship_now.battles == ship_past.battles:
-                        continue
-                    else:
-                        updated_ship = ship_now - ship_past
-                        new_user.ship_dic[ship_now.ship_id] = updated_ship
-                        new_user.ship_list.append(updated_ship)
-            new_user.ship_list = sorted(new_user.ship_list, reverse=True)
-            new_user.pr = Pr()
+        """
+        与过去的快照相减, 得到这段时间内的数据; 场次没有变化时返回空的差分
+        """
+        new_user = User()
+        for name in COUNTERS:
+            setattr(new_user, name, getattr(self, name) - getattr(other, name))
+        new_user.nick_name = self.nick_name
+        new_user.clan_tag = self.clan_tag
+        new_user.date = other.date
+        new_user.ship_list = []
+        new_user.ship_dic = {}
+        new_user.pr = Pr()
+        if new_user.battles == 0:
             return new_user
 
-    async def init_pr_sub(self):
-        exps = await wows_get_numbers_api()
-        for ship in self.ship_list:
-            ship.pr.init_pr_ship(ship, exps)
-        self.pr.init_pr_user(self.ship_list)
+        rows, fleet, found = self.fleet.diff(other.fleet)
+        values = fleet.counters.tolist()
+        for row, counters, in_past in zip(rows.tolist(), values, found.tolist()):
+            ship_now = self.ship_list[row]
+            # 快照里没有的船直接使用当前数据
+            ship = ship_now.with_counters(counters) if in_past else ship_now
+            new_user.ship_list.append(ship)
+            new_user.ship_dic[str(ship.ship_id)] = ship
+        new_user._fleet = fleet
+        return new_user
+
+    async def init_pr_sub(self, expected: ExpectedValues = None):
+        self.init_fleet_pr(expected or await expected_store.get())
+
+    def init_fleet_pr(self, expected: ExpectedValues) -> None:
+        """
+        按列一次算完整支舰队每艘船的 PR 和账号 PR, 结果与逐船计算一致
+        """
+        fleet = self.fleet
+        pr, bands, total = fleet_pr(
+            fleet.column("battles"),
+            fleet.column("damage_dealt"),
+            fleet.column("frags"),
+            fleet.column("wins"),
+            fleet.ship_ids,
+            expected.index,
+        )
+        for ship, pr_number, band in zip(self.ship_list, pr.tolist(), bands.tolist()):
+            ship.pr = Pr(pr_number, band)
+        self.pr = Pr(total)
 
 
 class Pr:
-    pr_text = None
-    pr_number = None
-    pr_color = None
-    color_background = None
-    color_text = None
-
-    def __init__(self) -> None:
-        pass
-
-    def init_pr_user(self, ships: list[Ship]) -> None:
-        total_pr = 0
-        total_battles = 0
-
-        for ship in ships:
-            total_pr += ship.pr.pr_number * ship.battles
-            total_battles += ship.battles
-
-        self.pr_number = round(total_pr / total_battles) if total_battles > 0 else 0
-
-        self.color_init()
-
-    def init_pr_ship(self, ship: Ship, expected_data: dict) -> None:
-        ship_id = ship.ship_id
+    """
+    PR 只保存数值和所在分段, 颜色和评价从 PR_BANDS 查表
+    """
 
-        battles = ship.battles
+    __slots__ = ("pr_number", "band")
 
-        ship_data = expected_data["data"].get(str(ship_id), {})
+    color_text = (0, 0, 0)
 
-        if not ship_data:
-            self.pr_number = -1
+    def __init__(self, pr_number=None, band=None) -> None:
+        self.pr_number = pr_number
+        self.band = band
+        if pr_number is not None and band is None:
             self.color_init()
-            return
 
-        exp_damage = ship_data.get("average_damage_dealt", 0.1)
-        exp_frags = ship_data.get("average_frags", 0.1)
-        exp_winrate = ship_data.get("win_rate", 0.1)
+    def color_init(self) -> None:
+        for band, (upper, _, _, _) in enumerate(PR_BANDS):
+            if self.pr_number <= upper:
+                break
+        self.band = band
 
-        damage = ship.damage_dealt / ship.battles
-        frags = ship.frags / ship.battles
-        winrate = abs((ship.wins / ship.battles) * 100)
+    @property
+    def pr_color(self):
+        return PR_BANDS[self.band][1] if self.band is not None else None
 
-        r_dmg = damage / exp_damage
-        r_frags = frags / exp_frags
-        r_winrate = winrate / exp_winrate
+    @property
+    def color_background(self):
+        return PR_BANDS[self.band][2] if self.band is not None else None
 
-        w1 = 1 / (1 + math.exp(-0.7 * (battles - 3)))
-        w2 = 1 / (1 + math.exp(-20 * (winrate - 0.50)))
+    @property
+    def pr_text(self):
+        return PR_BANDS[self.band][3] if self.band is not None else None
 
-        w_wins = (1000 * w1) - ((1000 * w1 * 0.35) * w2)
-        w_dmg = (1000 * (1 - w1)) + ((1000 * w1 * 0.35) * w2)
-        w_frags = 150
 
-        n_dmg = max(0, (r_dmg - 0.4) / (1 - 0.4))
-        n_frags = max(0, (r_frags - 0.1) / (1 - 0.1))
-        n_wins = max(0, (r_winrate - 0.7) / (1 - 0.7))
+async def read_ship_index() -> ShipIndex:
+    """
+    船只图鉴索引, 第一次使用时 mmap 打开 (必要时从 JSON 构建)
+    """
+    WOWS_CORE_CACHE = get_cache()
+    if (index := WOWS_CORE_CACHE.get("ship_index", None)) is None:
+        index = await executor_registry.run("io", load_index)
+        WOWS_CORE_CACHE["ship_index"] = index
+    return index
 
-        self.pr_number = round(
-            (w_dmg * n_dmg) + (w_frags * n_frags) + (w_wins * n_wins)
-        )
 
-        self.color_init()
+def render_text_pil(image, text, center_position, font, text_color):
+    """
+    以行顶部对齐画字 (位置与原来 PIL 绘制一致), 画布和颜色均为 RGB; 字号由 font 决定
+    """
+    draw_text(
+        image,
+        text,
+        center_position[0],
+        font,
+        text_color,
+        top=center_position[1] - 50 // 2,
+    )
+    return image
 
-    def color_init(self) -> None:
-        self.color_text = (0, 0, 0)
-        if self.pr_number <= 750:
-            self.pr_color = (255, 0, 0)
-            self.color_background = (255, 226, 230)
-            self.pr_text = "还需努力"
-        elif self.pr_number <= 1100:
-            self.pr_color = (255, 140, 0)
-            self.color_background = (255, 140, 0)
-            self.pr_text = "低于平均"
-        elif self.pr_number <= 1350:
-            self.pr_color = (255, 255, 102)
-            self.color_background = (255, 219, 153)
-            self.pr_text = "平均水平"
-        elif self.pr_number <= 1550:
-            self.pr_color = (0, 205, 0)
-            self.color_background = (166, 255, 144)
-            self.pr_text = "好"
-        elif self.pr_number <= 1750:
-            self.pr_color = (0, 139, 0)
-            self.color_background = (118, 255, 64)
-            self.pr_text = "很好"
-        elif self.pr_number <= 2100:
-            self.pr_color = (0, 255, 255)
-            self.color_background = (203, 255, 247)
-            self.pr_text = "非常好"
-        elif self.pr_number <= 2450:
-            self.pr_color = (255, 52, 179)
-            self.color_background = (255, 173, 223)
-            self.pr_text = "大佬平均"
-        else:
-            self.pr_color = (139, 0, 139)
-            self.color_background = (207, 85, 255)
-            self.pr_text = "神佬平均"
 
+def render_text_cv(image, text, center_position, font, color):
+    """
+    以数字中线竖直居中画字, 画布和颜色均为 RGB; 字号由 font 决定
+    """
+    draw_text(image, text, center_position[0], font, color, middle=center_position[1])
 
-async def read_ship_dic():
-    WOWS_CORE_CACHE = get_cache()
-    if not WOWS_CORE_CACHE.get("wows_ship_list.json", None):
-        async with aiofiles.open("wows_core/src/wows_ship_list.json", "r") as f:
-            js = await f.read()
-            json_dic = json.loads(js)
-            WOWS_CORE_CACHE["wows_ship_list.json"] = json_dic
-    return WOWS_CORE_CACHE["wows_ship_list.json"]
 
+CARD_WIDTH = 1242
+TABLE_TOP = 1064  # recent/rank 表头以下是逐行绘制的船只数据
+TILE_HEADER = 84  # 分页时后续页的页头高度 (列名那一行)
+RECENT_ROWS = 50  # 单张图最多绘制的行数
+RANK_ROWS = 20
 
-async def wows_get_numbers_api():
-    WOWS_CORE_CACHE = get_cache()
-    if not WOWS_CORE_CACHE.get("numbers_api", None):
-        async with aiofiles.open("wows_core/src/wows_exp.json", mode="r") as f:
-            js = await f.read()
-            try:
-                dic = json.loads(js)
-            except Exception:
-                dic = {}
-            WOWS_CORE_CACHE["numbers_api"] = dic
-    return WOWS_CORE_CACHE["numbers_api"]
 
+def _fonts_key(fonts: list) -> tuple:
+    return tuple((getattr(font, "path", None), getattr(font, "size", None)) for font in fonts)
 
-def render_text_pil(image, text, center_position, font, font_size, text_color):
-    # 创建Draw对象
-    draw = ImageDraw.Draw(image)
 
-    # 计算文本长度和起始位置
-    text_length = draw.textlength(text, font=font)
-    x_position = center_position[0] - text_length // 2
-    y_position = center_position[1] - 50 // 2
+def _build_card_base(wows_images, fonts, layout, color_pr, color_bg, color_text):
+    """
+    生成某个版式的静态底图: 着色后的模板块和固定的文字标签
+    """
+    if layout in ("user", "ship"):
+        font_medium = fonts[0]
+        img = np.full((1900, CARD_WIDTH, 3), 255, dtype=np.uint8)
+        img[336 : 336 + 120, :] = wows_images.tinted(1, color_pr)
+        img[483 : 483 + 650, :] = wows_images.tinted(0, color_bg)
+        img[1160 : 1160 + 650, :] = wows_images.tinted(2, color_bg)
+        labels = []
+        if layout == "user":
+            labels = [
+                ("账号创建时间", (310, 245), font_medium),
+                ("最后战斗时间", (931, 245), font_medium),
+            ]
+    else:
+        font_medium = fonts[-1]
+        font_heavy = fonts[1]
+        img = np.full((TABLE_TOP, CARD_WIDTH, 3), 255, dtype=np.uint8)
+        img[336 : 336 + 120, :] = wows_images.tinted(1, color_pr)
+        img[477 : 477 + 421, :] = wows_images.tinted(3, color_bg)
+        if layout == "recent":
+            labels = [("近期船只数据", (621, 930), font_heavy)]
+        else:
+            labels = [
+                ("船只数据", (621, 930), font_heavy),
+                ("PR 不可用", (621, 390), font_medium),
+            ]
+        for text, xpos in (
+            ("战舰名称", 130),
+            ("场数", 350),
+            ("胜率", 500),
+            ("场均", 700),
+            ("XP", 850),
+            ("PR", 1000),
+            ("击沉", 1150),
+        ):
+            labels.append((text, (xpos, 1037), font_medium))
+
+    for text, position, font in labels:
+        render_text_pil(img, text, position, font, color_text)
+    return img
+
+
+def card_base(wows_images, fonts, layout, color_pr, color_bg, color_text):
+    """
+    取某个版式在某个 PR 分段下的静态底图 (只读, 按需生成并缓存)
+    """
+    key = (
+        layout,
+        tuple(color_pr),
+        tuple(color_bg),
+        tuple(color_text),
+        _fonts_key(fonts),
+    )
+    return wows_images.layer(
+        key,
+        lambda: _build_card_base(
+            wows_images, fonts, layout, color_pr, color_bg, color_text
+        ),
+    )
 
-    # 绘制文本
-    draw.text((x_position, y_position), text, font=font, fill=text_color)
 
-    return image
+def table_canvas(base: np.ndarray, rows: int, start: int = 0) -> np.ndarray:
+    """
+    在表头底图下面接上 rows 行空白表格
 
+    start > 0 表示分页渲染的后续页, 只保留表格的列名那一条作为页头
+    """
+    header = base if start == 0 else base[TABLE_TOP - TILE_HEADER :]
+    top = header.shape[0]
+    img = np.empty((top + rows * 84, CARD_WIDTH, 3), dtype=np.uint8)
+    img[:top] = header
+    img[top:] = 255
+    return img
 
-def render_text_cv(image, text, center_position, font, font_size, color):
-    # 计算字体缩放比例
-    font_scale = font_size / 30.0
 
-    # 计算文本大小和起始位置
-    text_size, baseline = cv.getTextSize(
-        text, cv.FONT_HERSHEY_SIMPLEX, font_scale, thickness=4
-    )
-    x_position = center_position[0] - text_size[0] // 2
-    y_position = center_position[1] + text_size[1] // 2
+def render_table_rows(img, ships, top, font, color_text, show_pr=True):
+    """
+    从 top 开始逐行绘制船只表格, show_pr 为 False 时 PR 列显示 N/A
+    """
+    for i, current_ship in enumerate(ships):
+        ypos = top + 55 + i * 83
+        render_text_pil(img, current_ship.ship_name, (130, ypos), font, color_text)
+        render_text_cv(img, current_ship.display_battles, (350, ypos), font, color_text)
+        render_text_cv(img, current_ship.display_winrate, (500, ypos), font, color_text)
+        render_text_cv(img, current_ship.display_damage, (700, ypos), font, color_text)
+        render_text_cv(img, current_ship.display_xp, (850, ypos), font, color_text)
+        if show_pr:
+            pr_text, pr_color = f"{current_ship.pr.pr_number}", current_ship.pr.pr_color
+        else:
+            pr_text, pr_color = "N/A", (222, 222, 222)
+        render_text_cv(img, pr_text, (1000, ypos), font, pr_color)
+        render_text_cv(img, f"{current_ship.frags}", (1150, ypos), font, color_text)
 
-    # 绘制文本
-    cv.putText(
-        image,
-        text,
-        (x_position, y_position),
-        cv.FONT_HERSHEY_SIMPLEX,
-        font_scale,
-        color,
-        thickness=4,
-        lineType=cv.LINE_AA,
-    )
 
-@async_run_in_executor()
-async def wows_user(user: User, wows_images: list, fonts):
-    main_data_img = wows_images[0].copy()
-    max_data_img = wows_images[2].copy()
-    pr_bar_img = wows_images[1].copy()
-    color_bg = user.pr.color_background[::-1]
-    color_pr = user.pr.pr_color[::-1]
-    pr_bar_img[:, :, 0][pr_bar_img[:, :, 0] == 222] = color_pr[0]
-    pr_bar_img[:, :, 1][pr_bar_img[:, :, 1] == 222] = color_pr[1]
-    pr_bar_img[:, :, 2][pr_bar_img[:, :, 2] == 222] = color_pr[2]
-
-    main_data_img[:, :, 0][main_data_img[:, :, 0] == 222] = color_bg[0]
-    main_data_img[:, :, 1][main_data_img[:, :, 1] == 222] = color_bg[1]
-    main_data_img[:, :, 2][main_data_img[:, :, 2] == 222] = color_bg[2]
-
-    max_data_img[:, :, 0][max_data_img[:, :, 0] == 222] = color_bg[0]
-    max_data_img[:, :, 1][max_data_img[:, :, 1] == 222] = color_bg[1]
-    max_data_img[:, :, 2][max_data_img[:, :, 2] == 222] = color_bg[2]
+def wows_user(user: User, wows_images: list, fonts):
+    color_bg = user.pr.color_background
+    color_pr = user.pr.pr_color
 
     font_medium = fonts[0]
     font_heavy = fonts[1]
 
-    img = np.full((1900, 1242, 3), 255, dtype=np.uint8)
-    img[336 : 336 + 120, :] = pr_bar_img
-    img[483 : 483 + 650, :] = main_data_img
-    img[1160 : 1160 + 650, :] = max_data_img
+    img = card_base(
+        wows_images, fonts, "user", color_pr, color_bg, user.pr.color_text
+    ).copy()
 
-    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, 48, user.pr.color_text)
-    render_text_cv(img, user.nick_name, (621, 152), font_medium, 48, user.pr.color_text)
+    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, user.pr.color_text)
+    render_text_cv(img, user.nick_name, (621, 152), font_medium, user.pr.color_text)
     render_text_cv(
-        img, user.created_at, (310, 295), font_medium, 32, user.pr.color_text
+        img, user.created_at, (310, 295), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.last_battle_time, (931, 295), font_medium, 32, user.pr.color_text
+        img, user.last_battle_time, (931, 295), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, user.display_battles, (270, 776), font_medium, 32, user.pr.color_text
+        img, user.display_battles, (270, 776), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_xp, (270, 1026), font_medium, 32, user.pr.color_text
+        img, user.display_xp, (270, 1026), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, user.display_winrate, (621, 776), font_medium, 32, user.pr.color_text
+        img, user.display_winrate, (621, 776), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_kd, (621, 1026), font_medium, 32, user.pr.color_text
+        img, user.display_kd, (621, 1026), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, f"{user.display_damage}", (970, 776), font_medium, 32, user.pr.color_text
+        img, f"{user.display_damage}", (970, 776), font_medium, user.pr.color_text
     )
     render_text_cv(
         img,
         f"{user.display_accu_rate}",
         (970, 1026),
         font_medium,
-        32,
         user.pr.color_text,
     )
 
@@ -598,7 +572,6 @@ async def wows_user(user: User, wows_images: list, fonts):
         f"{user.max_damage_dealt}",
         (215, 1443),
         font_medium,
-        32,
         user.pr.color_text,
     )
     render_text_cv(
@@ -606,105 +579,75 @@ async def wows_user(user: User, wows_images: list, fonts):
         f"{user.max_planes_killed}",
         (215, 1666),
         font_medium,
-        32,
         user.pr.color_text,
     )
 
     render_text_cv(
-        img, f"{user.max_xp}", (621, 1443), font_medium, 32, user.pr.color_text
+        img, f"{user.max_xp}", (621, 1443), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, f"{user.max_total_agro}", (621, 1666), font_medium, 32, user.pr.color_text
+        img, f"{user.max_total_agro}", (621, 1666), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, f"{user.max_frags}", (1025, 1443), font_medium, 32, user.pr.color_text
+        img, f"{user.max_frags}", (1025, 1443), font_medium, user.pr.color_text
     )
     render_text_cv(
         img,
         f"{user.max_ships_spotted}",
         (1025, 1666),
         font_medium,
-        32,
         user.pr.color_text,
     )
 
-    img = Image.fromarray(img[..., ::-1])
     render_text_pil(
         img,
         f"{user.pr.pr_text} {user.pr.pr_number}",
         (621, 390),
         font_medium,
-        32,
         user.pr.color_text,
     )
-    render_text_pil(
-        img, "账号创建时间", (310, 245), font_medium, 32, user.pr.color_text
-    )
-    render_text_pil(
-        img, "最后战斗时间", (931, 245), font_medium, 32, user.pr.color_text
-    )
-    bytes_io = BytesIO()
-    img.save(bytes_io, format="JPEG")
-    bytes_io.seek(0)
+    return encode_image(img)
     # img.save("TEST.PNG")
-    return bytes_io.getvalue()
 
-@async_run_in_executor()
-async def wows_ship(user: User, ship_id: str, wows_images: list, fonts: list):
-    main_data_img = wows_images[0].copy()
-    max_data_img = wows_images[2].copy()
-    pr_bar_img = wows_images[1].copy()
+def wows_ship(user: User, ship_id: str, wows_images: list, fonts: list):
     ship = user.ship_dic.get(ship_id, None)
     if ship is None:
         raise ("没有该船只")
-    color_bg = ship.pr.color_background[::-1]
-    color_pr = ship.pr.pr_color[::-1]
-    pr_bar_img[:, :, 0][pr_bar_img[:, :, 0] == 222] = color_pr[0]
-    pr_bar_img[:, :, 1][pr_bar_img[:, :, 1] == 222] = color_pr[1]
-    pr_bar_img[:, :, 2][pr_bar_img[:, :, 2] == 222] = color_pr[2]
-
-    main_data_img[:, :, 0][main_data_img[:, :, 0] == 222] = color_bg[0]
-    main_data_img[:, :, 1][main_data_img[:, :, 1] == 222] = color_bg[1]
-    main_data_img[:, :, 2][main_data_img[:, :, 2] == 222] = color_bg[2]
-
-    max_data_img[:, :, 0][max_data_img[:, :, 0] == 222] = color_bg[0]
-    max_data_img[:, :, 1][max_data_img[:, :, 1] == 222] = color_bg[1]
-    max_data_img[:, :, 2][max_data_img[:, :, 2] == 222] = color_bg[2]
+    color_bg = ship.pr.color_background
+    color_pr = ship.pr.pr_color
 
     font_medium = fonts[0]
     font_heavy = fonts[1]
 
-    img = np.full((1900, 1242, 3), 255, dtype=np.uint8)
-    img[336 : 336 + 120, :] = pr_bar_img
-    img[483 : 483 + 650, :] = main_data_img
-    img[1160 : 1160 + 650, :] = max_data_img
-    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, 48, user.pr.color_text)
-    render_text_cv(img, user.nick_name, (621, 152), font_medium, 48, user.pr.color_text)
+    img = card_base(
+        wows_images, fonts, "ship", color_pr, color_bg, ship.pr.color_text
+    ).copy()
+    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, user.pr.color_text)
+    render_text_cv(img, user.nick_name, (621, 152), font_medium, user.pr.color_text)
 
     render_text_cv(
-        img, ship.display_battles, (270, 776), font_medium, 32, ship.pr.color_text
+        img, ship.display_battles, (270, 776), font_medium, ship.pr.color_text
     )
     render_text_cv(
-        img, ship.display_xp, (270, 1026), font_medium, 32, ship.pr.color_text
+        img, ship.display_xp, (270, 1026), font_medium, ship.pr.color_text
     )
 
     render_text_cv(
-        img, ship.display_winrate, (621, 776), font_medium, 32, ship.pr.color_text
+        img, ship.display_winrate, (621, 776), font_medium, ship.pr.color_text
     )
     render_text_cv(
-        img, ship.display_kd, (621, 1026), font_medium, 32, ship.pr.color_text
+        img, ship.display_kd, (621, 1026), font_medium, ship.pr.color_text
     )
 
     render_text_cv(
-        img, f"{ship.display_damage}", (970, 776), font_medium, 32, ship.pr.color_text
+        img, f"{ship.display_damage}", (970, 776), font_medium, ship.pr.color_text
     )
     render_text_cv(
         img,
         f"{ship.display_accu_rate}",
         (970, 1026),
         font_medium,
-        32,
         ship.pr.color_text,
     )
 
@@ -713,7 +656,6 @@ async def wows_ship(user: User, ship_id: str, wows_images: list, fonts: list):
         f"{ship.max_damage_dealt}",
         (215, 1443),
         font_medium,
-        32,
         ship.pr.color_text,
     )
     render_text_cv(
@@ -721,62 +663,53 @@ async def wows_ship(user: User, ship_id: str, wows_images: list, fonts: list):
         f"{ship.max_planes_killed}",
         (215, 1666),
         font_medium,
-        32,
         ship.pr.color_text,
     )
 
     render_text_cv(
-        img, f"{ship.max_xp}", (621, 1443), font_medium, 32, ship.pr.color_text
+        img, f"{ship.max_xp}", (621, 1443), font_medium, ship.pr.color_text
     )
     render_text_cv(
-        img, f"{ship.max_total_agro}", (621, 1666), font_medium, 32, ship.pr.color_text
+        img, f"{ship.max_total_agro}", (621, 1666), font_medium, ship.pr.color_text
     )
 
     render_text_cv(
-        img, f"{ship.max_frags}", (1025, 1443), font_medium, 32, ship.pr.color_text
+        img, f"{ship.max_frags}", (1025, 1443), font_medium, ship.pr.color_text
     )
     render_text_cv(
         img,
         f"{ship.max_ships_spotted}",
         (1025, 1666),
         font_medium,
-        32,
         user.pr.color_text,
     )
 
-    img = Image.fromarray(img[..., ::-1])
     render_text_pil(
-        img, ship.ship_name, (621, 265), font_medium, 48, ship.pr.color_text
+        img, ship.ship_name, (621, 265), font_medium, ship.pr.color_text
     )
     render_text_pil(
         img,
         f"{ship.pr.pr_text} {ship.pr.pr_number}",
         (621, 390),
         font_medium,
-        32,
         ship.pr.color_text,
     )
 
-    bytes_io = BytesIO()
-    img.save(bytes_io, format="JPEG")
-    bytes_io.seek(0)
-    return bytes_io.getvalue()
+    return encode_image(img)
 
-@async_run_in_executor()
-async def wows_recent(
-    user: User, wows_images: list, fonts: list, recents: bool = False
+def wows_recent(
+    user: User,
+    wows_images: list,
+    fonts: list,
+    recents: bool = False,
+    start: int = 0,
+    stop: int = RECENT_ROWS,
 ):
-    main_data_img = wows_images[-1].copy()
-    pr_bar_img = wows_images[1].copy()
-    color_bg = user.pr.color_background[::-1]
-    color_pr = user.pr.pr_color[::-1]
-    pr_bar_img[:, :, 0][pr_bar_img[:, :, 0] == 222] = color_pr[0]
-    pr_bar_img[:, :, 1][pr_bar_img[:, :, 1] == 222] = color_pr[1]
-    pr_bar_img[:, :, 2][pr_bar_img[:, :, 2] == 222] = color_pr[2]
-
-    main_data_img[:, :, 0][main_data_img[:, :, 0] == 222] = color_bg[0]
-    main_data_img[:, :, 1][main_data_img[:, :, 1] == 222] = color_bg[1]
-    main_data_img[:, :, 2][main_data_img[:, :, 2] == 222] = color_bg[2]
+    """
+    渲染近期数据, 只画 ship_list[start:stop] 这些行; start > 0 时是分页的后续页, 不带卡片头部
+    """
+    color_bg = user.pr.color_background
+    color_pr = user.pr.pr_color
 
     font_medium = fonts[-1]
     font_heavy = fonts[1]
@@ -784,266 +717,109 @@ async def wows_recent(
     if recents:
         user.ship_list = user.recent_battles
 
-    len_ship_list = len(user.ship_list)
-    if len_ship_list > 50:
-        len_ship_list = 50
-    img = np.full((1064 + (len_ship_list * 84), 1242, 3), 255, dtype=np.uint8)
-    img[336 : 336 + 120, :] = pr_bar_img
-    img[477 : 477 + 421, :] = main_data_img
-    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, 48, user.pr.color_text)
-    render_text_cv(img, user.nick_name, (621, 152), font_medium, 48, user.pr.color_text)
+    ships = user.ship_list[start:stop]
+    base = card_base(
+        wows_images, fonts, "recent", color_pr, color_bg, user.pr.color_text
+    )
+    img = table_canvas(base, len(ships), start)
+    top = TABLE_TOP if start == 0 else TILE_HEADER
+    render_table_rows(img, ships, top, font_medium, user.pr.color_text, True)
+    if start > 0:
+        return encode_image(img)
+
+    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, user.pr.color_text)
+    render_text_cv(img, user.nick_name, (621, 152), font_medium, user.pr.color_text)
 
     render_text_cv(
-        img, user.display_battles, (110, 780), font_medium, 32, user.pr.color_text
+        img, user.display_battles, (110, 780), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_xp, (301, 780), font_medium, 32, user.pr.color_text
+        img, user.display_xp, (301, 780), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, user.display_winrate, (504, 780), font_medium, 32, user.pr.color_text
+        img, user.display_winrate, (504, 780), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_kd, (707, 780), font_medium, 32, user.pr.color_text
+        img, user.display_kd, (707, 780), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, user.display_damage, (910, 780), font_medium, 32, user.pr.color_text
+        img, user.display_damage, (910, 780), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_accu_rate, (1113, 780), font_medium, 32, user.pr.color_text
+        img, user.display_accu_rate, (1113, 780), font_medium, user.pr.color_text
     )
 
-    for i in range(len_ship_list):
-        current_ship: Ship = user.ship_list[i]
-        ypos = 1119 + i * 83
-        render_text_cv(
-            img,
-            current_ship.display_battles,
-            (350, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            current_ship.display_winrate,
-            (500, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            current_ship.display_damage,
-            (700, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            current_ship.display_xp,
-            (850, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            f"{current_ship.pr.pr_number}",
-            (1000, ypos),
-            font_medium,
-            38,
-            current_ship.pr.pr_color[::-1],
-        )
-        render_text_cv(
-            img,
-            f"{current_ship.frags}",
-            (1150, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-
-    img = Image.fromarray(img[..., ::-1])
-
-    render_text_pil(img, "近期船只数据", (621, 930), font_heavy, 48, user.pr.color_text)
     render_text_pil(
-        img, f"快照时间: {user.date}", (621, 265), font_medium, 40, user.pr.color_text
+        img, f"快照时间: {user.date}", (621, 265), font_medium, user.pr.color_text
     )
     render_text_pil(
         img,
         f"{user.pr.pr_text} {user.pr.pr_number}",
         (621, 390),
         font_medium,
-        32,
         user.pr.color_text,
     )
-    render_text_pil(img, "战舰名称", (130, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "场数", (350, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "胜率", (500, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "场均", (700, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "XP", (850, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "PR", (1000, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "击沉", (1150, 1037), font_medium, 40, user.pr.color_text)
-    for i in range(len_ship_list):
-        current_ship: Ship = user.ship_list[i]
-        ypos = 1119 + i * 83
-        render_text_pil(
-            img,
-            current_ship.ship_name,
-            (130, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-
-    bytes_io = BytesIO()
-    img.save(bytes_io, format="JPEG")
-    bytes_io.seek(0)
-    return bytes_io.getvalue()
+    return encode_image(img)
     # img.save("TEST.PNG")
 
-@async_run_in_executor()
-async def wows_rank(user: User, wows_images: list, fonts: list):
-    main_data_img = wows_images[-1].copy()
-    pr_bar_img = wows_images[1].copy()
-    color_bg = user.pr.color_background[::-1]
+def wows_rank(
+    user: User,
+    wows_images: list,
+    fonts: list,
+    start: int = 0,
+    stop: int = RANK_ROWS,
+):
+    """
+    渲染排位数据, 分页规则与 wows_recent 相同
+    """
+    color_bg = user.pr.color_background
     color_pr = (222, 222, 222)
-    pr_bar_img[:, :, 0][pr_bar_img[:, :, 0] == 222] = color_pr[0]
-    pr_bar_img[:, :, 1][pr_bar_img[:, :, 1] == 222] = color_pr[1]
-    pr_bar_img[:, :, 2][pr_bar_img[:, :, 2] == 222] = color_pr[2]
-
-    main_data_img[:, :, 0][main_data_img[:, :, 0] == 222] = color_bg[0]
-    main_data_img[:, :, 1][main_data_img[:, :, 1] == 222] = color_bg[1]
-    main_data_img[:, :, 2][main_data_img[:, :, 2] == 222] = color_bg[2]
 
     font_medium = fonts[-1]
     font_heavy = fonts[1]
 
-    len_ship_list = len(user.ship_list)
-    if len_ship_list > 20:
-        len_ship_list = 20
-    img = np.full((1064 + (len_ship_list * 84), 1242, 3), 255, dtype=np.uint8)
-    img[336 : 336 + 120, :] = pr_bar_img
-    img[477 : 477 + 421, :] = main_data_img
-    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, 48, user.pr.color_text)
-    render_text_cv(img, user.nick_name, (621, 152), font_medium, 48, user.pr.color_text)
+    ships = user.ship_list[start:stop]
+    base = card_base(
+        wows_images, fonts, "rank", color_pr, color_bg, user.pr.color_text
+    )
+    img = table_canvas(base, len(ships), start)
+    top = TABLE_TOP if start == 0 else TILE_HEADER
+    render_table_rows(img, ships, top, font_medium, user.pr.color_text, False)
+    if start > 0:
+        return encode_image(img)
+
+    render_text_cv(img, user.clan_tag, (621, 66), font_heavy, user.pr.color_text)
+    render_text_cv(img, user.nick_name, (621, 152), font_medium, user.pr.color_text)
 
     render_text_cv(
-        img, user.display_battles, (110, 780), font_medium, 32, user.pr.color_text
+        img, user.display_battles, (110, 780), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_xp, (301, 780), font_medium, 32, user.pr.color_text
+        img, user.display_xp, (301, 780), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, user.display_winrate, (504, 780), font_medium, 32, user.pr.color_text
+        img, user.display_winrate, (504, 780), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_kd, (707, 780), font_medium, 32, user.pr.color_text
+        img, user.display_kd, (707, 780), font_medium, user.pr.color_text
     )
 
     render_text_cv(
-        img, user.display_damage, (910, 780), font_medium, 32, user.pr.color_text
+        img, user.display_damage, (910, 780), font_medium, user.pr.color_text
     )
     render_text_cv(
-        img, user.display_accu_rate, (1113, 780), font_medium, 32, user.pr.color_text
+        img, user.display_accu_rate, (1113, 780), font_medium, user.pr.color_text
     )
 
-    for i in range(len_ship_list):
-        current_ship: Ship = user.ship_list[i]
-        ypos = 1119 + i * 83
-        render_text_cv(
-            img,
-            current_ship.display_battles,
-            (350, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            current_ship.display_winrate,
-            (500, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            current_ship.display_damage,
-            (700, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            current_ship.display_xp,
-            (850, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-        render_text_cv(
-            img,
-            f"N/A",
-            (1000, ypos),
-            font_medium,
-            38,
-            (222, 222, 222),
-        )
-        render_text_cv(
-            img,
-            f"{current_ship.frags}",
-            (1150, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-
-    img = Image.fromarray(img[..., ::-1])
-
-    render_text_pil(img, "船只数据", (621, 930), font_heavy, 48, user.pr.color_text)
     render_text_pil(
         img,
         f"排位赛季: {user.season_id}",
         (621, 265),
         font_medium,
-        40,
         user.pr.color_text,
     )
-    render_text_pil(
-        img,
-        f"PR 不可用",
-        (621, 390),
-        font_medium,
-        32,
-        user.pr.color_text,
-    )
-    render_text_pil(img, "战舰名称", (130, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "场数", (350, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "胜率", (500, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "场均", (700, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "XP", (850, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "PR", (1000, 1037), font_medium, 40, user.pr.color_text)
-    render_text_pil(img, "击沉", (1150, 1037), font_medium, 40, user.pr.color_text)
-    for i in range(len_ship_list):
-        current_ship: Ship = user.ship_list[i]
-        ypos = 1119 + i * 83
-        render_text_pil(
-            img,
-            current_ship.ship_name,
-            (130, ypos),
-            font_medium,
-            38,
-            user.pr.color_text,
-        )
-
-    bytes_io = BytesIO()
-    img.save(bytes_io, format="JPEG")
-    bytes_io.seek(0)
-    return bytes_io.getvalue()
+    return encode_image(img)
     # img.save("TEST.PNG")